@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compression benchmark for the Tabichan Python SDK
+
+Sends start_chat calls with growing conversation histories and a get_image
+call to a local stand-in server, and reports the bytes on the wire: request
+bodies without compression, with gzip and (if zstandard is installed) zstd,
+and the image response with and without Accept-Encoding.
+
+Usage:
+    python scripts/benchmark_compression.py [history turns ...]
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tabichan import TabichanClient
+from tabichan.compression import RequestCompression, zstandard
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    received = 0
+    sent = 0
+    # Random bytes: like a real PNG/JPEG they do not compress, so any saving
+    # comes from the base64 and JSON framing.
+    image = os.urandom(80 * 1024)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        StandInHandler.received += len(body)
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "zstd":
+            body = zstandard.ZstdDecompressor().decompress(body)
+        json.loads(body)
+        self.reply({"task_id": "benchmark-task"})
+
+    def do_GET(self):
+        self.reply({"base64": base64.b64encode(self.image).decode()})
+
+    def reply(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, mtime=0)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        StandInHandler.sent += len(body)
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_history(turns: int) -> list[dict]:
+    history = []
+    for turn in range(turns):
+        history.append(
+            {"role": "user", "content": f"Day {turn}: what should we visit in Kyoto?"}
+        )
+        history.append(
+            {
+                "role": "assistant",
+                "content": "Start at Fushimi Inari early to avoid crowds, then "
+                f"walk to Tofuku-ji and finish in Gion for dinner (turn {turn}).",
+            }
+        )
+    return history
+
+
+def request_bytes(base_url: str, history: list[dict], compression) -> int:
+    StandInHandler.received = 0
+    with TabichanClient("benchmark-key", compression=compression) as client:
+        client.base_url = base_url
+        client.start_chat("Plan the next day", "benchmark-user", history=history)
+    return StandInHandler.received
+
+
+def response_bytes(base_url: str, accept_encoding: str) -> int:
+    StandInHandler.sent = 0
+    with TabichanClient("benchmark-key") as client:
+        client.base_url = base_url
+        client.default_header["Accept-Encoding"] = accept_encoding
+        client.get_image("benchmark-image")
+    return StandInHandler.sent
+
+
+def main():
+    turns = [int(arg) for arg in sys.argv[1:]] or [5, 50, 500]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    encodings = ["gzip"] + (["zstd"] if zstandard is not None else [])
+    try:
+        print("start_chat request body bytes")
+        for count in turns:
+            history = make_history(count)
+            plain = request_bytes(base_url, history, None)
+            line = f"{count:>5} turns: {plain:>9} plain"
+            for encoding in encodings:
+                compressed = request_bytes(
+                    base_url, history, RequestCompression(encoding)
+                )
+                line += f", {compressed:>8} {encoding} ({compressed / plain:.0%})"
+            print(line)
+
+        print("get_image response body bytes")
+        identity = response_bytes(base_url, "identity")
+        encoded = response_bytes(base_url, "gzip, deflate")
+        print(f"  identity: {identity}, gzip: {encoded} ({encoded / identity:.0%})")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Connection reuse benchmark for the Tabichan Python SDK
+
+Runs TabichanClient.poll_chat against a local stand-in server and reports the
+number of TCP connections the server accepted together with the mean latency
+per call, once with the pooled keep-alive session and once with keep-alive
+disabled (a fresh connection for every request, like module-level requests.get).
+
+Usage:
+    python scripts/benchmark_session.py [calls]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tabichan import TabichanClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StandInHandler.connections += 1
+
+    def do_GET(self):
+        body = json.dumps({"status": "running"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(calls: int, keep_alive: bool, base_url: str):
+    StandInHandler.connections = 0
+    with TabichanClient("benchmark-key", keep_alive=keep_alive) as client:
+        client.base_url = base_url
+        start = time.perf_counter()
+        for _ in range(calls):
+            client.poll_chat("benchmark-task")
+        elapsed = time.perf_counter() - start
+
+    label = "pooled session" if keep_alive else "no keep-alive"
+    print(
+        f"{label:>15}: {calls} calls, {StandInHandler.connections} connections, "
+        f"{elapsed / calls * 1000:.3f} ms/call"
+    )
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    try:
+        run(calls, keep_alive=False, base_url=base_url)
+        run(calls, keep_alive=True, base_url=base_url)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,77 @@
 """Tabichan Python SDK - PodTech's Tabichan API SDK."""
 
 from .__version__ import __version__
+from .async_client import AsyncTabichanClient
+from .batch import BatchResult
+from .cache import DiskImageCache, ImageCache
+from .circuit import CircuitBreaker
 from .client import TabichanClient
+from .deadline import Deadline, Timeouts
+from .exceptions import (
+    ChatCancelled,
+    ChatError,
+    ChatFailed,
+    ChatTimeout,
+    CircuitOpenError,
+    DeadlineExceeded,
+    PollError,
+    TabichanError,
+    TransientPollError,
+    UnexpectedChatStatus,
+)
+from .hedging import HedgePolicy
+from .models import Activity, ChatResult, Day, Itinerary
+from .poller import ChatPoller
+from .ratelimit import RateLimiter
+from .result_cache import (
+    DiskResultStore,
+    MemoryResultStore,
+    ResultCache,
+    ResultStore,
+    SQLiteResultStore,
+)
+from .retry import RetryBudget, RetryPolicy
+from .routing import EndpointRouter
+from .polling import BackoffPollStrategy, FixedPollStrategy, PollStrategy
 from .websocket_client import TabichanWebSocket
 
-__all__ = ["TabichanClient", "TabichanWebSocket", "__version__"]
+__all__ = [
+    "Activity",
+    "AsyncTabichanClient",
+    "BackoffPollStrategy",
+    "BatchResult",
+    "ChatCancelled",
+    "ChatError",
+    "ChatFailed",
+    "ChatPoller",
+    "ChatResult",
+    "ChatTimeout",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "Day",
+    "Deadline",
+    "DeadlineExceeded",
+    "DiskImageCache",
+    "DiskResultStore",
+    "EndpointRouter",
+    "FixedPollStrategy",
+    "HedgePolicy",
+    "ImageCache",
+    "Itinerary",
+    "MemoryResultStore",
+    "PollError",
+    "PollStrategy",
+    "RateLimiter",
+    "ResultCache",
+    "ResultStore",
+    "RetryBudget",
+    "RetryPolicy",
+    "SQLiteResultStore",
+    "TabichanError",
+    "Timeouts",
+    "TabichanClient",
+    "TabichanWebSocket",
+    "TransientPollError",
+    "UnexpectedChatStatus",
+    "__version__",
+]
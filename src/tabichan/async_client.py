@@ -0,0 +1,632 @@
+import asyncio
+import binascii
+import os
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Literal, Optional, Union
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without the extra
+    httpx = None
+
+from .__version__ import __version__
+from .batch import BatchResult, abounded_map
+from .codec import JSONCodec, default_codec
+from .compression import UNSUPPORTED_MEDIA_TYPE, RequestCompression
+from .deadline import Deadline, TimeoutSpec, Timeouts
+from .exceptions import (
+    TRANSIENT_STATUS_CODES,
+    ChatTimeout,
+    DeadlineExceeded,
+    PollError,
+    TransientPollError,
+)
+from .circuit import CircuitBreaker
+from .client import _DEFAULT, _choose_base_url, _cut_by_deadline, _leaves_time
+from .models import ChatResult
+from .polling import (
+    BackoffPollStrategy,
+    PollStrategy,
+    parse_poll,
+    parse_retry_after,
+    poll_hint,
+)
+from .cache import DiskImageCache, ImageCache, lookup_image, store_image
+from .hedging import HedgePolicy
+from .images import (
+    Base64FieldDecoder,
+    ImageFormat,
+    activity_image_ids,
+    check_format,
+    convert_image,
+    async_image_sink,
+    extract_base64,
+)
+from .ratelimit import RateLimiter
+from .result_cache import ResultCache
+from .retry import RetryPolicy
+from .routing import EndpointRouter
+from .singleflight import AsyncSingleFlight
+
+
+def is_transient_error(error: "httpx.HTTPError") -> bool:
+    """Whether a failed request is worth retrying"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in TRANSIENT_STATUS_CODES
+    return False
+
+
+def _close_response(task: asyncio.Future):
+    """Close the response of a hedged request that lost but still completed"""
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+class AsyncTabichanClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 5.0,
+        http_client: Optional["httpx.AsyncClient"] = None,
+        poll_strategy: Optional[PollStrategy] = None,
+        max_poll_retries: int = 3,
+        retry_policy: Optional[RetryPolicy] = _DEFAULT,
+        failover: bool = False,
+        endpoint_router: Optional[EndpointRouter] = None,
+        hedging: Optional[HedgePolicy] = None,
+        image_cache: Optional[ImageCache] = None,
+        disk_cache: Optional[DiskImageCache] = None,
+        coalesce: bool = False,
+        result_cache: Optional[ResultCache] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        timeouts: Optional[Timeouts] = None,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "AsyncTabichanClient requires httpx. Install it with `pip install tabichan-python-sdk[async]`."
+            )
+
+        if api_key is None:
+            api_key = os.getenv("TABICHAN_API_KEY")
+
+        if api_key is None:
+            raise ValueError(
+                "API key is not set. Please set the TABICHAN_API_KEY environment variable or pass it as an argument to the AsyncTabichanClient constructor."
+            )
+
+        self.api_key = api_key
+        self.base_url = "https://tourism-api.podtech-ai.com/v1"
+        self.alternative_base_url = "https://tabichan.podtech-ai.com/v1"
+
+        self.default_header = {
+            "User-Agent": f"tabichan-python-sdk/{__version__}",
+            "x-api-key": self.api_key,
+        }
+
+        # All coroutines share one connection pool, so thousands of in-flight
+        # tasks can be tracked from a single event loop.
+        self._owns_http_client = http_client is None
+        if http_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry,
+                )
+            )
+        self.http_client = http_client
+        self.poll_strategy = poll_strategy or BackoffPollStrategy()
+        self.max_poll_retries = max_poll_retries
+        self.retry_policy = RetryPolicy() if retry_policy is _DEFAULT else retry_policy
+        if endpoint_router is None and failover:
+            endpoint_router = EndpointRouter([self.base_url, self.alternative_base_url])
+        self.endpoint_router = endpoint_router
+        self.hedging = hedging
+        self.image_cache = image_cache
+        self.disk_cache = disk_cache
+        self.result_cache = result_cache
+        self.codec = codec or default_codec
+        self.compression = compression
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.timeouts = timeouts or Timeouts()
+        # Concurrent identical polls and image downloads share one request.
+        self._singleflight = AsyncSingleFlight() if coalesce else None
+
+    async def aclose(self):
+        """Release pooled connections held by the client"""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        force_base_url: Optional[str] = None,
+        headers: Optional[dict] = None,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        **kwargs,
+    ) -> "httpx.Response":
+        if idempotent is None:
+            idempotent = method != "POST"
+        retry_policy = self.retry_policy
+        if retry_policy is not None:
+            retry_policy.record_request()
+        # A forced URL (a hedge to the alternative endpoint) skips routing.
+        router = None if force_base_url else self.endpoint_router
+        breaker = self.circuit_breaker
+        if headers:
+            headers = {**self.default_header, **headers}
+        else:
+            headers = self.default_header
+        failed_urls = []
+        timeout = kwargs.pop("timeout", None)
+
+        started_at = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            # Every attempt, retries and hedges included, spends from the budget.
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(path)
+            attempt_timeout = timeout if deadline is None else deadline.clip(timeout)
+            if attempt_timeout is not None:
+                connect, read = attempt_timeout
+                kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+            base_url = _choose_base_url(
+                path, force_base_url or self.base_url, router, breaker, failed_urls
+            )
+            sent_at = time.monotonic()
+            try:
+                request = self.http_client.build_request(
+                    method, base_url + path, headers=headers, **kwargs
+                )
+                response = await self.http_client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                if (
+                    deadline is not None
+                    and isinstance(e, httpx.TimeoutException)
+                    and _cut_by_deadline(
+                        timeout,
+                        attempt_timeout,
+                        connect=isinstance(e, httpx.ConnectTimeout),
+                    )
+                ):
+                    raise DeadlineExceeded("Deadline exceeded") from e
+                if router is not None:
+                    router.record_failure(base_url)
+                    failed_urls.append(base_url)
+                if breaker is not None:
+                    breaker.record_failure(base_url, path)
+                if retry_policy is None:
+                    raise
+                delay = retry_policy.next_delay(
+                    attempts,
+                    time.monotonic() - started_at,
+                    idempotent=idempotent,
+                    sent=not isinstance(
+                        e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+                    ),
+                )
+                if delay is None or not _leaves_time(deadline, delay):
+                    raise
+            else:
+                if router is not None:
+                    if response.status_code >= 500:
+                        router.record_failure(base_url)
+                        failed_urls.append(base_url)
+                    else:
+                        router.record_success(base_url, time.monotonic() - sent_at)
+                if breaker is not None:
+                    if response.status_code >= 500:
+                        breaker.record_failure(base_url, path)
+                    else:
+                        breaker.record_success(
+                            base_url, path, time.monotonic() - sent_at
+                        )
+                if response.is_success or retry_policy is None:
+                    if not response.is_success:
+                        await response.aclose()
+                    response.raise_for_status()
+                    return response
+                delay = retry_policy.next_delay(
+                    attempts,
+                    time.monotonic() - started_at,
+                    idempotent=idempotent,
+                    status=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
+                await response.aclose()
+                if delay is None or not _leaves_time(deadline, delay):
+                    response.raise_for_status()
+
+            # Fail over to a healthy endpoint right away instead of backing off.
+            if router is not None and router.has_alternative(failed_urls):
+                delay = 0.0
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def _hedged_get(self, path: str, **kwargs) -> "httpx.Response":
+        """GET that sends a backup request if the first one is slow
+
+        The first successful response wins and the other request is cancelled.
+        """
+        hedging = self.hedging
+        if hedging is None:
+            return await self._request("GET", path, **kwargs)
+
+        hedging.record_request()
+        started_at = time.monotonic()
+
+        def record_latency(task: asyncio.Future):
+            if not task.cancelled() and task.exception() is None:
+                hedging.record_latency(time.monotonic() - started_at)
+
+        primary = asyncio.ensure_future(self._request("GET", path, **kwargs))
+        primary.add_done_callback(record_latency)
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedging.delay())
+            if done or not hedging.allow_hedge():
+                pending = set()
+                return await primary
+
+            hedge_url = self.alternative_base_url if hedging.to_alternative else None
+            hedge = asyncio.ensure_future(
+                self._request("GET", path, force_base_url=hedge_url, **kwargs)
+            )
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is hedge:
+                            hedging.record_hedge_win()
+                        for other in done - {task}:
+                            _close_response(other)
+                        return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_close_response)
+
+    def _decode(self, response: "httpx.Response"):
+        """Parse a JSON response body with the client's codec"""
+        try:
+            return self.codec.loads(response.content)
+        except ValueError as e:
+            # An httpx.HTTPError, so wait_for_chat reports it as a PollError.
+            raise httpx.DecodingError(
+                f"Invalid JSON in response: {e}", request=response.request
+            ) from e
+
+    async def _post_json(self, path: str, data: bytes, **kwargs) -> "httpx.Response":
+        """POST a JSON body, compressed when the client is set up for it"""
+        headers = {"Content-Type": "application/json"}
+        compression = self.compression
+        payload, encoding = compression.compress(data) if compression else (data, None)
+        if encoding is None:
+            return await self._request(
+                "POST", path, content=data, headers=headers, **kwargs
+            )
+
+        try:
+            return await self._request(
+                "POST",
+                path,
+                content=payload,
+                headers={**headers, "Content-Encoding": encoding},
+                **kwargs,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response is None or e.response.status_code != UNSUPPORTED_MEDIA_TYPE:
+                raise
+        # The server cannot read the encoding: stop compressing and resend.
+        compression.disable()
+        return await self._request(
+            "POST", path, content=data, headers=headers, **kwargs
+        )
+
+    async def start_chat(
+        self,
+        user_query: str,
+        user_id: str,
+        country: Literal["japan", "france"] = "japan",
+        history: list[dict] = None,
+        additional_inputs: dict = None,
+        timeout: Optional[TimeoutSpec] = None,
+        deadline: Union[float, Deadline, None] = None,
+    ) -> str:
+        body = {
+            "user_query": user_query,
+            "user_id": user_id,
+            "country": country,
+            "history": history or [],
+            "additional_inputs": additional_inputs or {},
+        }
+        response_chat = await self._post_json(
+            "/chat",
+            self.codec.dumps(body),
+            timeout=self.timeouts.resolve("chat", timeout),
+            deadline=Deadline.coerce(deadline),
+        )
+        return self._decode(response_chat)["task_id"]
+
+    def start_chats(
+        self,
+        chat_requests: Union[Iterable[dict], AsyncIterable[dict]],
+        concurrency: int = 64,
+        ordered: bool = True,
+    ) -> AsyncIterator[BatchResult]:
+        """Submit many chats with at most concurrency start_chat calls in flight
+
+        Async counterpart of TabichanClient.start_chats; chat_requests may also
+        be an async iterable. Use with ``async for``.
+        """
+
+        async def start(request: dict) -> str:
+            return await self.start_chat(**request)
+
+        return abounded_map(start, chat_requests, concurrency, ordered)
+
+    async def _poll(
+        self,
+        task_id: str,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[TimeoutSpec] = None,
+    ) -> tuple[dict, Optional[float]]:
+        if self._singleflight is None:
+            return await self._request_poll(task_id, deadline, timeout)
+        try:
+            return await self._singleflight.do(
+                ("poll", task_id, timeout),
+                lambda: self._request_poll(task_id, deadline, timeout),
+                timeout=None if deadline is None else deadline.remaining(),
+            )
+        except DeadlineExceeded:
+            if deadline is not None and deadline.expired:
+                raise
+            # The shared poll was cut short by another caller's deadline.
+            return await self._request_poll(task_id, deadline, timeout)
+        except asyncio.TimeoutError as e:
+            # The deadline passed while waiting for another caller's poll.
+            raise DeadlineExceeded("Deadline exceeded") from e
+
+    async def _request_poll(
+        self,
+        task_id: str,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[TimeoutSpec] = None,
+    ) -> tuple[dict, Optional[float]]:
+        response_poll = await self._hedged_get(
+            f"/chat/poll?task_id={task_id}",
+            timeout=self.timeouts.resolve("poll", timeout),
+            deadline=deadline,
+        )
+        poll_data = self._decode(response_poll)
+        return poll_data, poll_hint(response_poll.headers, poll_data)
+
+    async def poll_chat(
+        self, task_id: str, timeout: Optional[TimeoutSpec] = None
+    ) -> dict:
+        return (await self._poll(task_id, timeout=timeout))[0]
+
+    async def wait_for_chat(
+        self,
+        task_id: str,
+        verbose: bool = False,
+        poll_strategy: Optional[PollStrategy] = None,
+        typed: bool = False,
+        deadline: Union[float, Deadline, None] = None,
+    ) -> Union[dict, ChatResult]:
+        """Poll a chat task until it completes and return its result
+
+        Same retry, deadline and error behaviour as
+        TabichanClient.wait_for_chat. Cancel the awaiting task to stop
+        waiting: the poll in flight is cancelled with it and its connection
+        released, unless other coalesced callers still wait for it.
+        """
+        poll_strategy = poll_strategy or self.poll_strategy
+        deadline = Deadline.coerce(deadline)
+        started_at = time.monotonic()
+        attempts = 0
+        poll_errors = 0
+
+        while True:
+            try:
+                poll_data, hint = await self._poll(task_id, deadline)
+            except DeadlineExceeded as e:
+                raise ChatTimeout(task_id, "Deadline exceeded") from e
+            except httpx.HTTPError as e:
+                if not is_transient_error(e):
+                    raise PollError(task_id, f"Failed to poll status: {e}") from e
+                poll_errors += 1
+                if poll_errors > self.max_poll_retries:
+                    raise TransientPollError(
+                        task_id, f"Failed to poll status after {poll_errors} tries: {e}"
+                    ) from e
+                if verbose:
+                    print(f"⚠️ Transient poll error, retrying: {e}")
+                hint = None
+            else:
+                poll_errors = 0
+                done, result = parse_poll(task_id, poll_data)
+                if done:
+                    if verbose:
+                        print("✅ Generation complete!")
+
+                    return ChatResult(result) if typed else result
+
+            attempts += 1
+            delay = poll_strategy.next_delay(
+                attempts, time.monotonic() - started_at, hint
+            )
+            if delay is None:
+                raise ChatTimeout(task_id)
+            if not _leaves_time(deadline, delay):
+                raise ChatTimeout(task_id, "Deadline exceeded")
+
+            if verbose and not poll_errors:
+                print(
+                    f"⏳ Generation still running... (attempt {attempts}, next poll in {delay:.1f}s)"
+                )
+            await asyncio.sleep(delay)
+
+    async def run_chat(
+        self,
+        user_query: str,
+        user_id: str,
+        country: Literal["japan", "france"] = "japan",
+        history: list[dict] = None,
+        additional_inputs: dict = None,
+        verbose: bool = False,
+        deadline: Union[float, Deadline, None] = None,
+    ) -> dict:
+        """Start a chat and wait for its result, going through result_cache
+
+        Async counterpart of TabichanClient.run_chat; cache lookups run in a
+        thread since the store may be on disk.
+        """
+        deadline = Deadline.coerce(deadline)
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.key(user_query, user_id, country, history, additional_inputs)
+            result = await asyncio.to_thread(cache.get, key)
+            if result is not None:
+                return result
+
+        task_id = await self.start_chat(
+            user_query, user_id, country, history, additional_inputs, deadline=deadline
+        )
+        result = await self.wait_for_chat(task_id, verbose=verbose, deadline=deadline)
+        if cache is not None:
+            await asyncio.to_thread(cache.set, key, result)
+        return result
+
+    async def get_image(
+        self,
+        id: str,
+        country: Literal["japan", "france"] = "japan",
+        format: ImageFormat = "base64",
+        timeout: Optional[TimeoutSpec] = None,
+    ):
+        check_format(format)
+        if self._singleflight is None:
+            return await self._get_image(id, country, format, timeout)
+        return await self._singleflight.do(
+            ("image", id, country, format, timeout),
+            lambda: self._get_image(id, country, format, timeout),
+        )
+
+    async def _get_image(
+        self,
+        id: str,
+        country: str,
+        format: ImageFormat,
+        timeout: Optional[TimeoutSpec] = None,
+    ):
+        key = (id, country)
+        caches = (self.image_cache, self.disk_cache)
+        # Disk reads and writes run in a thread to keep the event loop free.
+        if self.disk_cache is not None:
+            data = await asyncio.to_thread(lookup_image, *caches, key)
+        else:
+            data = lookup_image(*caches, key)
+        if data is None:
+            response_image = await self._hedged_get(
+                f"/image?id={id}&country={country}",
+                timeout=self.timeouts.resolve("image", timeout),
+            )
+            encoded = extract_base64(response_image.content)
+            uncached = self.image_cache is None and self.disk_cache is None
+            if format == "base64" and uncached:
+                return str(encoded, "ascii")
+            data = binascii.a2b_base64(encoded)
+            if self.disk_cache is not None:
+                await asyncio.to_thread(store_image, *caches, key, data)
+            else:
+                store_image(*caches, key, data)
+        return convert_image(data, format)
+
+    async def prefetch_images(
+        self,
+        result: dict,
+        country: Literal["japan", "france"] = "japan",
+        concurrency: int = 16,
+        format: ImageFormat = "base64",
+    ) -> dict:
+        """Fetch the images of every activity in a chat result concurrently
+
+        Async counterpart of TabichanClient.prefetch_images.
+        """
+        check_format(format)
+
+        async def fetch(id: str):
+            return await self.get_image(id, country, format)
+
+        images = {}
+        async for image in abounded_map(
+            fetch, activity_image_ids(result), concurrency, ordered=False
+        ):
+            if image.ok:
+                images[image.request] = image.value
+        return images
+
+    async def save_image(
+        self,
+        id: str,
+        dest,
+        country: Literal["japan", "france"] = "japan",
+        chunk_size: int = 64 * 1024,
+        timeout: Optional[TimeoutSpec] = None,
+    ) -> int:
+        """Stream the decoded image to a path, file object, callable or async writer"""
+        key = (id, country)
+        caches = (self.image_cache, self.disk_cache)
+        if self.disk_cache is not None:
+            data = await asyncio.to_thread(lookup_image, *caches, key)
+        else:
+            data = lookup_image(*caches, key)
+        if data is not None:
+            async with async_image_sink(dest) as write:
+                await write(data)
+            return len(data)
+
+        response_image = await self._hedged_get(
+            f"/image?id={id}&country={country}",
+            timeout=self.timeouts.resolve("image", timeout),
+            stream=True,
+        )
+        decoder = Base64FieldDecoder()
+        written = 0
+        try:
+            async with async_image_sink(dest) as write:
+                async for chunk in response_image.aiter_bytes(chunk_size):
+                    data = decoder.feed(chunk)
+                    if data:
+                        await write(data)
+                        written += len(data)
+        finally:
+            await response_image.aclose()
+        decoder.finish()
+        return written
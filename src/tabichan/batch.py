@@ -0,0 +1,180 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one item of a batch call, in input order via index"""
+
+    index: int
+    request: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Results finished ahead of an unfinished earlier item that ordered batches
+# may hold back, per unit of concurrency.
+REORDER_BUFFER_FACTOR = 16
+
+
+def _pop_ready(finished: dict, ordered: bool, next_index: int) -> tuple[list, int]:
+    """Take the finished results that can be yielded now
+
+    Unordered, that is all of them; ordered, the run starting at next_index.
+    Returns them with the index the next ordered result must have.
+    """
+    if not ordered:
+        ready = list(finished.values())
+        finished.clear()
+        return ready, next_index
+    ready = []
+    while next_index in finished:
+        ready.append(finished.pop(next_index))
+        next_index += 1
+    return ready, next_index
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    concurrency: int,
+    ordered: bool = True,
+) -> Iterator[BatchResult]:
+    """Run fn over items on a thread pool with at most concurrency calls in flight
+
+    items is consumed lazily, so generators of any size are never held in
+    memory. Failures are reported per item instead of aborting the batch.
+    With ordered=True, results that finish early wait (up to
+    REORDER_BUFFER_FACTOR * concurrency of them) until every earlier item is
+    yielded, so one slow item does not leave the other workers idle.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    iterator = enumerate(items)
+    max_pending = concurrency * REORDER_BUFFER_FACTOR
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="tabichan-batch"
+    ) as executor:
+        running = {}
+        finished = {}
+        next_index = 0
+        exhausted = False
+
+        def refill():
+            nonlocal exhausted
+            while (
+                not exhausted
+                and len(running) < concurrency
+                and len(running) + len(finished) < max_pending
+            ):
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    return
+                running[executor.submit(fn, item)] = (index, item)
+
+        refill()
+        while running or finished:
+            ready, next_index = _pop_ready(finished, ordered, next_index)
+            if not ready:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, item = running.pop(future)
+                    error = future.exception()
+                    value = None if error is not None else future.result()
+                    finished[index] = BatchResult(index, item, value, error)
+                refill()
+                continue
+            refill()
+            yield from ready
+
+
+async def abounded_map(
+    fn: Callable[[T], Awaitable[R]],
+    items: Union[Iterable[T], AsyncIterable[T]],
+    concurrency: int,
+    ordered: bool = True,
+) -> AsyncIterator[BatchResult]:
+    """Async counterpart of bounded_map, running fn as tasks on the event loop"""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    if hasattr(items, "__aiter__"):
+        iterator = items.__aiter__()
+
+        async def next_item():
+            return await iterator.__anext__()
+
+    else:
+        sync_iterator = iter(items)
+
+        async def next_item():
+            try:
+                return next(sync_iterator)
+            except StopIteration:
+                raise StopAsyncIteration from None
+
+    running = {}
+    finished = {}
+    index = 0
+    next_index = 0
+    exhausted = False
+    max_pending = concurrency * REORDER_BUFFER_FACTOR
+
+    async def refill():
+        nonlocal index, exhausted
+        while (
+            not exhausted
+            and len(running) < concurrency
+            and len(running) + len(finished) < max_pending
+        ):
+            try:
+                item = await next_item()
+            except StopAsyncIteration:
+                exhausted = True
+                return
+            running[asyncio.ensure_future(fn(item))] = (index, item)
+            index += 1
+
+    try:
+        await refill()
+        while running or finished:
+            ready, next_index = _pop_ready(finished, ordered, next_index)
+            if not ready:
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    item_index, item = running.pop(task)
+                    error = task.exception()
+                    value = None if error is not None else task.result()
+                    finished[item_index] = BatchResult(item_index, item, value, error)
+                await refill()
+                continue
+            await refill()
+            for result in ready:
+                yield result
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,323 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Optional, Union
+
+
+class ImageCache:
+    """In-memory LRU cache for get_image results, bounded by total size
+
+    Entries are decoded image bytes keyed by (id, country) and count their
+    length against max_bytes; the least recently used entries are evicted to
+    make room. Entries older than ttl seconds are treated as missing (ttl=None
+    keeps them until evicted). A single value larger than max_bytes is not
+    cached at all.
+    """
+
+    def __init__(
+        self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = 3600.0
+    ):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total bytes currently held"""
+        return self._size
+
+    def get(self, key: Hashable):
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value):
+        size = len(value)
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, expires_at)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest, (_, oldest_size, _) = next(iter(self._entries.items()))
+                self._remove(oldest, oldest_size)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(key, entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: Hashable, size: int):
+        del self._entries[key]
+        self._size -= size
+
+    def stats(self) -> dict:
+        """Hit, miss and eviction counters plus current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+class DiskImageCache:
+    """Persistent image cache storing decoded image bytes on disk
+
+    Images are stored once per content hash under blobs/, and refs/ maps each
+    (id, country) key to its blob, so identical images shared by several
+    activities take the space of one. Every file is written to a temporary
+    file and moved into place with os.replace, so several worker processes
+    can share the directory without seeing partial files. Reads are memory
+    mapped and returned as a memoryview.
+
+    The directory is scanned on start-up, so a restarted process reuses what
+    earlier runs downloaded. When the blobs exceed max_bytes, the least
+    recently read ones are deleted until usage is back under 90% of the
+    limit. Keys older than ttl seconds count as missing (ttl=None keeps them
+    until evicted).
+
+    Refs whose blob is gone and temporary files older than stale_tmp_age
+    seconds, left behind by writers that crashed, are removed on start-up and
+    after every eviction.
+    """
+
+    # Writers move their temporary file into place within seconds.
+    stale_tmp_age = 3600.0
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._blobs = self.directory / "blobs"
+        self._refs = self.directory / "refs"
+        self._tmp = self.directory / "tmp"
+        for path in (self._blobs, self._refs, self._tmp):
+            path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        blobs = list(self._scan())
+        self._size = sum(size for _, size, _ in blobs)
+        self._prune(blobs)
+
+    @property
+    def size(self) -> int:
+        """Bytes used by blobs, as last counted by this process"""
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[memoryview]:
+        """Return the cached image bytes, or None on a miss"""
+        ref = self._ref_path(key)
+        try:
+            digest = ref.read_text()
+            if self.ttl is not None and time.time() - ref.stat().st_mtime >= self.ttl:
+                raise FileNotFoundError(ref)
+            blob = self._blob_path(digest)
+            with open(blob, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    data = memoryview(b"")
+                else:
+                    data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            # The blob's mtime is its last use, which drives eviction order.
+            os.utime(blob)
+        except (FileNotFoundError, ValueError):
+            self._unlink(ref)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def set(self, key: Hashable, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest)
+        try:
+            os.utime(blob)
+        except FileNotFoundError:
+            # Not stored yet, or another process evicted it since.
+            blob.parent.mkdir(exist_ok=True)
+            self._write(blob, data)
+            with self._lock:
+                self._size += len(data)
+        self._write(self._ref_path(key), digest.encode())
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def delete(self, key: Hashable):
+        self._unlink(self._ref_path(key))
+
+    def evict(self):
+        """Delete least recently read blobs until usage is under 90% of the limit
+
+        The directory is rescanned first, so blobs written by other processes
+        are counted too. Refs to deleted blobs are pruned afterwards.
+        """
+        with self._lock:
+            blobs = sorted(self._scan(), key=lambda blob: blob[2])
+            size = sum(blob_size for _, blob_size, _ in blobs)
+            target = self.max_bytes * 0.9
+            evicted = 0
+            for path, blob_size, _ in blobs:
+                if size <= target:
+                    break
+                if self._unlink(path):
+                    self.evictions += 1
+                size -= blob_size
+                evicted += 1
+            self._size = size
+            self._prune(blobs[evicted:])
+
+    def clear(self):
+        with self._lock:
+            for directory in (self._refs, self._blobs):
+                for path in directory.rglob("*"):
+                    if path.is_file():
+                        self._unlink(path)
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._size,
+            }
+
+    def _scan(self):
+        """Yield (path, size, mtime) for every blob on disk"""
+        for path in self._blobs.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def _prune(self, blobs):
+        """Delete refs to missing blobs and temporary files of crashed writers"""
+        live = {path.name for path, _, _ in blobs}
+        for ref in self._refs.iterdir():
+            try:
+                digest = ref.read_text()
+                if digest in live or self._blob_path(digest).exists():
+                    continue
+            except FileNotFoundError:
+                continue
+            except ValueError:
+                pass
+            self._unlink(ref)
+        cutoff = time.time() - self.stale_tmp_age
+        for path in self._tmp.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    self._unlink(path)
+            except FileNotFoundError:
+                continue
+
+    def _ref_path(self, key: Hashable) -> Path:
+        return self._refs / hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def _blob_path(self, digest: str) -> Path:
+        if len(digest) != 64:
+            raise ValueError(f"invalid blob reference: {digest!r}")
+        return self._blobs / digest[:2] / digest
+
+    def _write(self, path: Path, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._unlink(Path(tmp_path))
+            raise
+
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+
+def lookup_image(
+    memory: Optional[ImageCache], disk: Optional[DiskImageCache], key: Hashable
+) -> Optional[Union[bytes, memoryview]]:
+    """Find decoded image bytes in the memory cache, then on disk"""
+    if memory is not None:
+        data = memory.get(key)
+        if data is not None:
+            return data
+    if disk is not None:
+        data = disk.get(key)
+        if data is not None:
+            if memory is not None:
+                memory.set(key, bytes(data))
+            return data
+    return None
+
+
+def store_image(
+    memory: Optional[ImageCache],
+    disk: Optional[DiskImageCache],
+    key: Hashable,
+    data: bytes,
+):
+    if disk is not None:
+        disk.set(key, data)
+    if memory is not None:
+        memory.set(key, data)
@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# (base_url, endpoint, old_state, new_state)
+StateListener = Callable[[str, str, str, str], None]
+
+
+def endpoint_of(path: str) -> str:
+    """The endpoint a request path belongs to, without its query string"""
+    return path.split("?", 1)[0]
+
+
+class Circuit:
+    """State and recent outcomes of one (base_url, endpoint) pair"""
+
+    __slots__ = (
+        "base_url",
+        "endpoint",
+        "state",
+        "outcomes",
+        "changed_at",
+        "probes",
+        "probe_successes",
+    )
+
+    def __init__(self, base_url: str, endpoint: str, window: int):
+        self.base_url = base_url
+        self.endpoint = endpoint
+        self.state = CLOSED
+        # (failed, slow) for the last window calls
+        self.outcomes = deque(maxlen=window)
+        self.changed_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+
+
+class CircuitBreaker:
+    """Fail fast while an endpoint of a base URL is unhealthy
+
+    Every (base_url, endpoint) pair has its own circuit. While closed, the
+    outcomes of the last window calls are kept; once at least min_calls are
+    in, the circuit opens when the share of failures (connection errors,
+    timeouts and 5xx responses) reaches failure_rate, or when the share of
+    calls slower than slow_call_duration seconds reaches slow_call_rate.
+    An open circuit refuses calls with CircuitOpenError for open_duration
+    seconds, then half-opens and lets half_open_calls probes through: if
+    they all succeed quickly it closes, otherwise it opens again.
+
+    on_state_change is called as (base_url, endpoint, old_state, new_state)
+    on every transition; add_listener registers more callbacks.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 1.0,
+        slow_call_duration: Optional[float] = None,
+        window: int = 20,
+        min_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_calls: int = 1,
+        on_state_change: Optional[StateListener] = None,
+    ):
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate must be in (0, 1]")
+        if not 0 < slow_call_rate <= 1:
+            raise ValueError("slow_call_rate must be in (0, 1]")
+        if not 1 <= min_calls <= window:
+            raise ValueError("min_calls must be between 1 and window")
+        if half_open_calls < 1:
+            raise ValueError("half_open_calls must be at least 1")
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.window = window
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self._listeners = [on_state_change] if on_state_change else []
+        self._circuits: dict = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: StateListener):
+        self._listeners.append(listener)
+
+    def state(self, base_url: str, path: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get((base_url, endpoint_of(path)))
+            if circuit is None:
+                return CLOSED
+            if (
+                circuit.state == OPEN
+                and time.monotonic() - circuit.changed_at >= self.open_duration
+            ):
+                return HALF_OPEN
+            return circuit.state
+
+    def allow(self, base_url: str, path: str) -> bool:
+        """Whether a call may be sent now; half-open circuits admit probes"""
+        changes = []
+        with self._lock:
+            circuit = self._circuit(base_url, path)
+            if circuit.state == OPEN:
+                if time.monotonic() - circuit.changed_at < self.open_duration:
+                    return False
+                self._transition(circuit, HALF_OPEN, changes)
+            if circuit.state == HALF_OPEN:
+                now = time.monotonic()
+                if now - circuit.changed_at >= self.open_duration:
+                    # Probes that never reported back do not hold the slots.
+                    circuit.probes = 0
+                    circuit.changed_at = now
+                allowed = circuit.probes < self.half_open_calls
+                if allowed:
+                    circuit.probes += 1
+            else:
+                allowed = True
+        self._notify(changes)
+        return allowed
+
+    def retry_after(self, base_url: str, path: str) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        with self._lock:
+            circuit = self._circuits.get((base_url, endpoint_of(path)))
+            if circuit is None or circuit.state != OPEN:
+                return 0.0
+            elapsed = time.monotonic() - circuit.changed_at
+            return max(self.open_duration - elapsed, 0.0)
+
+    def record_success(self, base_url: str, path: str, duration: float):
+        slow = (
+            self.slow_call_duration is not None and duration >= self.slow_call_duration
+        )
+        self._record(base_url, path, failed=False, slow=slow)
+
+    def record_failure(self, base_url: str, path: str):
+        self._record(base_url, path, failed=True, slow=False)
+
+    def _record(self, base_url: str, path: str, failed: bool, slow: bool):
+        changes = []
+        with self._lock:
+            circuit = self._circuit(base_url, path)
+            if circuit.state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(circuit, OPEN, changes)
+                else:
+                    circuit.probe_successes += 1
+                    if circuit.probe_successes >= self.half_open_calls:
+                        self._transition(circuit, CLOSED, changes)
+            elif circuit.state == CLOSED:
+                circuit.outcomes.append((failed, slow))
+                if self._should_open(circuit):
+                    self._transition(circuit, OPEN, changes)
+        self._notify(changes)
+
+    def _should_open(self, circuit: Circuit) -> bool:
+        calls = len(circuit.outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for failed, _ in circuit.outcomes if failed)
+        slow = sum(1 for _, is_slow in circuit.outcomes if is_slow)
+        return (
+            failures / calls >= self.failure_rate or slow / calls >= self.slow_call_rate
+        )
+
+    def _circuit(self, base_url: str, path: str) -> Circuit:
+        key = (base_url, endpoint_of(path))
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = Circuit(*key, self.window)
+        return circuit
+
+    def _transition(self, circuit: Circuit, state: str, changes: list):
+        changes.append((circuit.base_url, circuit.endpoint, circuit.state, state))
+        circuit.state = state
+        circuit.probes = 0
+        circuit.probe_successes = 0
+        circuit.changed_at = time.monotonic()
+        if state == CLOSED:
+            circuit.outcomes.clear()
+
+    def _notify(self, changes: list):
+        # Called outside the lock so listeners may query the breaker.
+        for change in changes:
+            for listener in self._listeners:
+                try:
+                    listener(*change)
+                except Exception as e:
+                    print(f"Error in circuit state listener: {e}")
+
+    def stats(self) -> dict:
+        """State and recent failure counts per (base_url, endpoint)"""
+        with self._lock:
+            return {
+                key: {
+                    "state": circuit.state,
+                    "calls": len(circuit.outcomes),
+                    "failures": sum(1 for failed, _ in circuit.outcomes if failed),
+                    "slow_calls": sum(1 for _, slow in circuit.outcomes if slow),
+                }
+                for key, circuit in self._circuits.items()
+            }
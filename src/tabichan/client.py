@@ -1,14 +1,158 @@
+import binascii
 import os
-import sys
+import threading
 import time
-from typing import Literal, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Iterable, Iterator, Literal, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.request import ACCEPT_ENCODING
 
 from .__version__ import __version__
+from .batch import BatchResult, bounded_map
+from .codec import JSONCodec, default_codec
+from .circuit import CircuitBreaker, endpoint_of
+from .compression import UNSUPPORTED_MEDIA_TYPE, RequestCompression
+from .deadline import Deadline, TimeoutSpec, Timeouts
+from .exceptions import (
+    TRANSIENT_STATUS_CODES,
+    ChatCancelled,
+    ChatTimeout,
+    CircuitOpenError,
+    DeadlineExceeded,
+    PollError,
+    TransientPollError,
+)
+from .models import ChatResult
+from .polling import (
+    BackoffPollStrategy,
+    PollStrategy,
+    parse_poll,
+    parse_retry_after,
+    poll_hint,
+)
+from .cache import DiskImageCache, ImageCache, lookup_image, store_image
+from .hedging import HedgePolicy
+from .images import (
+    Base64FieldDecoder,
+    ImageFormat,
+    activity_image_ids,
+    check_format,
+    convert_image,
+    extract_base64,
+    image_sink,
+    write_image,
+)
+from .ratelimit import RateLimiter
+from .result_cache import ResultCache
+from .retry import RetryPolicy
+from .routing import EndpointRouter
+from .singleflight import SingleFlight
+
+# Sentinel telling "use the default" apart from an explicit None (disabled).
+_DEFAULT = object()
+
+
+def is_transient_error(error: requests.exceptions.RequestException) -> bool:
+    """Whether a failed request is worth retrying"""
+    if isinstance(
+        error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in TRANSIENT_STATUS_CODES
+
+
+def is_connect_error(error: requests.exceptions.RequestException) -> bool:
+    """Whether the request failed before it could reach the server"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def _choose_base_url(
+    path: str,
+    default_url: str,
+    router: Optional[EndpointRouter],
+    breaker: Optional[CircuitBreaker],
+    failed_urls: list,
+) -> str:
+    """Base URL for the next attempt, skipping endpoints whose circuit is open
+
+    An open circuit counts as a failed endpoint, so the router fails over to
+    another one; CircuitOpenError is raised when none is left.
+    """
+    while True:
+        base_url = default_url if router is None else router.choose(exclude=failed_urls)
+        if breaker is None or breaker.allow(base_url, path):
+            return base_url
+        if router is None or base_url in failed_urls:
+            raise CircuitOpenError(
+                base_url, endpoint_of(path), breaker.retry_after(base_url, path)
+            )
+        failed_urls.append(base_url)
+
+
+class _RequestCancelled(Exception):
+    """The caller's cancel event was set while a request was backing off"""
+
+
+def _cut_by_deadline(
+    timeout: Optional[tuple], attempt_timeout: tuple, connect: bool
+) -> bool:
+    """Whether the deadline shortened the part of a timeout that expired
+
+    Such a timeout says the caller ran out of time, not that the endpoint is
+    unhealthy, so it must not count against the endpoint.
+    """
+    part = 0 if connect else 1
+    return timeout is None or attempt_timeout[part] < timeout[part]
+
+
+def _leaves_time(deadline: Optional[Deadline], delay: float) -> bool:
+    """Whether a retry after delay seconds can still meet the deadline"""
+    return deadline is None or deadline.allows(delay)
+
+
+def _discard(future: Future):
+    """Drop the losing request of a hedged call and release its connection"""
+
+    def close_response(done: Future):
+        if not done.cancelled() and done.exception() is None:
+            done.result().close()
+
+    future.cancel()
+    future.add_done_callback(close_response)
 
 
 class TabichanClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        *,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        session: Optional[requests.Session] = None,
+        poll_strategy: Optional[PollStrategy] = None,
+        max_poll_retries: int = 3,
+        retry_policy: Optional[RetryPolicy] = _DEFAULT,
+        failover: bool = False,
+        endpoint_router: Optional[EndpointRouter] = None,
+        hedging: Optional[HedgePolicy] = None,
+        image_cache: Optional[ImageCache] = None,
+        disk_cache: Optional[DiskImageCache] = None,
+        coalesce: bool = False,
+        result_cache: Optional[ResultCache] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        timeouts: Optional[Timeouts] = None,
+    ):
         if api_key is None:
             api_key = os.getenv("TABICHAN_API_KEY")
 
@@ -24,7 +168,267 @@ class TabichanClient:
         self.default_header = {
             "User-Agent": f"tabichan-python-sdk/{__version__}",
             "x-api-key": self.api_key,
+            # Every response encoding urllib3 can decode here: gzip and
+            # deflate, plus br and zstd when brotli or zstandard is installed.
+            "Accept-Encoding": ACCEPT_ENCODING,
         }
+        if not keep_alive:
+            self.default_header["Connection"] = "close"
+
+        # One pooled session per client so consecutive calls reuse the
+        # TCP/TLS connection instead of paying a new handshake every time.
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.poll_strategy = poll_strategy or BackoffPollStrategy()
+        self.max_poll_retries = max_poll_retries
+        self.retry_policy = RetryPolicy() if retry_policy is _DEFAULT else retry_policy
+        if endpoint_router is None and failover:
+            endpoint_router = EndpointRouter([self.base_url, self.alternative_base_url])
+        self.endpoint_router = endpoint_router
+        self.hedging = hedging
+        self.image_cache = image_cache
+        self.disk_cache = disk_cache
+        self.result_cache = result_cache
+        self.codec = codec or default_codec
+        self.compression = compression
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.timeouts = timeouts or Timeouts()
+        # Concurrent identical polls and image downloads share one request.
+        self._singleflight = SingleFlight() if coalesce else None
+        # Hedged calls run on a small pool; the primary and the hedge each
+        # hold a worker while the caller waits for the first answer.
+        self._hedge_workers = max(pool_maxsize * 2, 4)
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
+        # Background poller behind submit(), started on first use.
+        self._poller = None
+        self._poller_lock = threading.Lock()
+
+    def close(self):
+        """Release pooled connections held by the client
+
+        Chats submitted with submit() that have not finished are cancelled.
+        """
+        with self._poller_lock:
+            poller, self._poller = self._poller, None
+        if poller is not None:
+            poller.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        idempotent: Optional[bool] = None,
+        force_base_url: Optional[str] = None,
+        headers: Optional[dict] = None,
+        deadline: Optional[Deadline] = None,
+        cancel: Optional[threading.Event] = None,
+        **kwargs,
+    ) -> requests.Response:
+        if idempotent is None:
+            idempotent = method != "POST"
+        retry_policy = self.retry_policy
+        if retry_policy is not None:
+            retry_policy.record_request()
+        # A forced URL (a hedge to the alternative endpoint) skips routing.
+        router = None if force_base_url else self.endpoint_router
+        breaker = self.circuit_breaker
+        if headers:
+            headers = {**self.default_header, **headers}
+        else:
+            headers = self.default_header
+        failed_urls = []
+        timeout = kwargs.pop("timeout", None)
+
+        started_at = time.monotonic()
+        attempts = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise _RequestCancelled(path)
+            attempts += 1
+            # Every attempt, retries and hedges included, spends from the budget.
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            attempt_timeout = timeout if deadline is None else deadline.clip(timeout)
+            if attempt_timeout is not None:
+                kwargs["timeout"] = attempt_timeout
+            base_url = _choose_base_url(
+                path, force_base_url or self.base_url, router, breaker, failed_urls
+            )
+            sent_at = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, base_url + path, headers=headers, **kwargs
+                )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as e:
+                if (
+                    deadline is not None
+                    and isinstance(e, requests.exceptions.Timeout)
+                    and _cut_by_deadline(
+                        timeout,
+                        attempt_timeout,
+                        connect=isinstance(e, requests.exceptions.ConnectTimeout),
+                    )
+                ):
+                    raise DeadlineExceeded("Deadline exceeded") from e
+                if router is not None:
+                    router.record_failure(base_url)
+                    failed_urls.append(base_url)
+                if breaker is not None:
+                    breaker.record_failure(base_url, path)
+                if retry_policy is None:
+                    raise
+                delay = retry_policy.next_delay(
+                    attempts,
+                    time.monotonic() - started_at,
+                    idempotent=idempotent,
+                    sent=not is_connect_error(e),
+                )
+                if delay is None or not _leaves_time(deadline, delay):
+                    raise
+            else:
+                if router is not None:
+                    if response.status_code >= 500:
+                        router.record_failure(base_url)
+                        failed_urls.append(base_url)
+                    else:
+                        router.record_success(base_url, time.monotonic() - sent_at)
+                if breaker is not None:
+                    if response.status_code >= 500:
+                        breaker.record_failure(base_url, path)
+                    else:
+                        breaker.record_success(
+                            base_url, path, time.monotonic() - sent_at
+                        )
+                if response.ok or retry_policy is None:
+                    if not response.ok:
+                        response.close()
+                    response.raise_for_status()
+                    return response
+                delay = retry_policy.next_delay(
+                    attempts,
+                    time.monotonic() - started_at,
+                    idempotent=idempotent,
+                    status=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
+                response.close()
+                if delay is None or not _leaves_time(deadline, delay):
+                    response.raise_for_status()
+
+            # Fail over to a healthy endpoint right away instead of backing off.
+            if router is not None and router.has_alternative(failed_urls):
+                delay = 0.0
+            if delay:
+                if cancel is None:
+                    time.sleep(delay)
+                elif cancel.wait(delay):
+                    raise _RequestCancelled(path)
+
+    def _hedged_get(self, path: str, **kwargs) -> requests.Response:
+        """GET that sends a backup request if the first one is slow
+
+        The first successful response wins. A running requests call cannot be
+        aborted, so the loser's connection is released once it finishes.
+        """
+        hedging = self.hedging
+        if hedging is None:
+            return self._request("GET", path, **kwargs)
+
+        hedging.record_request()
+        executor = self._get_hedge_executor()
+        started_at = time.monotonic()
+
+        def record_latency(future: Future):
+            if not future.cancelled() and future.exception() is None:
+                hedging.record_latency(time.monotonic() - started_at)
+
+        primary = executor.submit(self._request, "GET", path, **kwargs)
+        primary.add_done_callback(record_latency)
+        done, _ = wait([primary], timeout=hedging.delay())
+        if done or not hedging.allow_hedge():
+            return primary.result()
+
+        hedge_url = self.alternative_base_url if hedging.to_alternative else None
+        hedge = executor.submit(
+            self._request, "GET", path, force_base_url=hedge_url, **kwargs
+        )
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is hedge:
+                        hedging.record_hedge_win()
+                    for loser in (done | pending) - {future}:
+                        _discard(loser)
+                    return future.result()
+        raise error
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self._hedge_workers,
+                    thread_name_prefix="tabichan-hedge",
+                )
+            return self._hedge_executor
+
+    def _decode(self, response: requests.Response):
+        """Parse a JSON response body with the client's codec"""
+        try:
+            return self.codec.loads(response.content)
+        except ValueError as e:
+            # Same error type response.json() raised, so callers keep working.
+            raise requests.exceptions.InvalidJSONError(
+                f"Invalid JSON in response: {e}", response=response
+            ) from e
+
+    def _post_json(self, path: str, data: bytes, **kwargs) -> requests.Response:
+        """POST a JSON body, compressed when the client is set up for it"""
+        headers = {"Content-Type": "application/json"}
+        compression = self.compression
+        payload, encoding = compression.compress(data) if compression else (data, None)
+        if encoding is None:
+            return self._request("POST", path, data=data, headers=headers, **kwargs)
+
+        try:
+            return self._request(
+                "POST",
+                path,
+                data=payload,
+                headers={**headers, "Content-Encoding": encoding},
+                **kwargs,
+            )
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != UNSUPPORTED_MEDIA_TYPE:
+                raise
+        # The server cannot read the encoding: stop compressing and resend.
+        compression.disable()
+        return self._request("POST", path, data=data, headers=headers, **kwargs)
 
     def start_chat(
         self,
@@ -33,7 +437,14 @@ class TabichanClient:
         country: Literal["japan", "france"] = "japan",
         history: list[dict] = None,
         additional_inputs: dict = None,
+        timeout: Optional[TimeoutSpec] = None,
+        deadline: Union[float, Deadline, None] = None,
     ) -> str:
+        """Submit a chat and return its task_id
+
+        timeout overrides the client's timeouts for this call. deadline, a
+        Deadline or seconds from now, bounds the call including retries.
+        """
         body = {
             "user_query": user_query,
             "user_id": user_id,
@@ -41,72 +452,337 @@ class TabichanClient:
             "history": history or [],
             "additional_inputs": additional_inputs or {},
         }
-        response_chat = requests.post(
-            self.base_url + "/chat",
-            headers=self.default_header,
-            json=body,
-            timeout=3,
+        response_chat = self._post_json(
+            "/chat",
+            self.codec.dumps(body),
+            timeout=self.timeouts.resolve("chat", timeout),
+            deadline=Deadline.coerce(deadline),
         )
-        response_chat.raise_for_status()
-        return response_chat.json()["task_id"]
-
-    def poll_chat(self, task_id: str) -> dict:
-        response_poll = requests.get(
-            self.base_url + f"/chat/poll?task_id={task_id}",
-            headers=self.default_header,
-            timeout=5,
+        return self._decode(response_chat)["task_id"]
+
+    def start_chats(
+        self,
+        chat_requests: Iterable[dict],
+        concurrency: int = 8,
+        ordered: bool = True,
+    ) -> Iterator[BatchResult]:
+        """Submit many chats with at most concurrency start_chat calls in flight
+
+        Each request is a dict of start_chat keyword arguments. Yields one
+        BatchResult per request whose value is the task_id, in input order or,
+        with ordered=False, as submissions complete. A failed submission is
+        reported on its own result and does not stop the batch.
+        """
+        return bounded_map(
+            lambda request: self.start_chat(**request),
+            chat_requests,
+            concurrency,
+            ordered,
+        )
+
+    def _poll(
+        self,
+        task_id: str,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[TimeoutSpec] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> tuple[dict, Optional[float]]:
+        # A cancellable caller polls on its own so it never waits on a shared
+        # poll it cannot interrupt.
+        if self._singleflight is None or cancel is not None:
+            return self._request_poll(task_id, deadline, timeout, cancel)
+        try:
+            return self._singleflight.do(
+                ("poll", task_id, timeout),
+                lambda: self._request_poll(task_id, deadline, timeout),
+                timeout=None if deadline is None else deadline.remaining(),
+            )
+        except DeadlineExceeded:
+            if deadline is not None and deadline.expired:
+                raise
+            # The shared poll was cut short by another caller's deadline.
+            return self._request_poll(task_id, deadline, timeout)
+        except FutureTimeoutError as e:
+            # The deadline passed while waiting for another caller's poll.
+            raise DeadlineExceeded("Deadline exceeded") from e
+
+    def _request_poll(
+        self,
+        task_id: str,
+        deadline: Optional[Deadline] = None,
+        timeout: Optional[TimeoutSpec] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> tuple[dict, Optional[float]]:
+        response_poll = self._hedged_get(
+            f"/chat/poll?task_id={task_id}",
+            timeout=self.timeouts.resolve("poll", timeout),
+            deadline=deadline,
+            cancel=cancel,
         )
-        response_poll.raise_for_status()
-        return response_poll.json()
+        poll_data = self._decode(response_poll)
+        return poll_data, poll_hint(response_poll.headers, poll_data)
+
+    def poll_chat(self, task_id: str, timeout: Optional[TimeoutSpec] = None) -> dict:
+        return self._poll(task_id, timeout=timeout)[0]
+
+    def wait_for_chat(
+        self,
+        task_id: str,
+        verbose: bool = False,
+        poll_strategy: Optional[PollStrategy] = None,
+        typed: bool = False,
+        deadline: Union[float, Deadline, None] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Union[dict, ChatResult]:
+        """Poll a chat task until it completes and return its result
+
+        Transient poll errors (connection errors, timeouts, 429 and 5xx) are
+        retried on the poll schedule up to max_poll_retries times in a row.
+        Raises ChatFailed, UnexpectedChatStatus, ChatTimeout, PollError or
+        TransientPollError instead of exiting the process. With typed=True
+        the result is wrapped in a ChatResult.
 
-    def wait_for_chat(self, task_id: str, verbose: bool = False) -> dict:
-        status = "running"
-        max_attempts = 30  # Maximum 5 minutes (30 * 10 seconds)
+        deadline, a Deadline or seconds from now, caps the whole wait: poll
+        timeouts are cut to the time left, and ChatTimeout is raised as soon
+        as the next poll could not be sent before it.
+
+        Setting cancel, a threading.Event, stops the wait: a sleeping wait or
+        a poll backing off before a retry wakes up at once, and a poll in
+        flight is not followed by another. ChatCancelled is raised; the task
+        itself keeps running server-side.
+        """
+        poll_strategy = poll_strategy or self.poll_strategy
+        deadline = Deadline.coerce(deadline)
+        started_at = time.monotonic()
         attempts = 0
+        poll_errors = 0
 
-        while status != "completed" and attempts < max_attempts:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise ChatCancelled(task_id)
             try:
-                poll_data = self.poll_chat(task_id)
-                status = poll_data["status"]
-
-                if status == "completed":
+                poll_data, hint = self._poll(task_id, deadline, cancel=cancel)
+            except _RequestCancelled as e:
+                raise ChatCancelled(task_id) from e
+            except DeadlineExceeded as e:
+                raise ChatTimeout(task_id, "Deadline exceeded") from e
+            except requests.exceptions.RequestException as e:
+                if not is_transient_error(e):
+                    raise PollError(task_id, f"Failed to poll status: {e}") from e
+                poll_errors += 1
+                if poll_errors > self.max_poll_retries:
+                    raise TransientPollError(
+                        task_id, f"Failed to poll status after {poll_errors} tries: {e}"
+                    ) from e
+                if verbose:
+                    print(f"⚠️ Transient poll error, retrying: {e}")
+                hint = None
+            else:
+                poll_errors = 0
+                done, result = parse_poll(task_id, poll_data)
+                if done:
                     if verbose:
                         print("✅ Generation complete!")
 
-                    return poll_data["result"]
+                    return ChatResult(result) if typed else result
 
-                elif status == "running":
-                    if verbose:
-                        print(
-                            f"⏳ Generation still running... (attempt {attempts + 1}/{max_attempts})"
-                        )
+            attempts += 1
+            delay = poll_strategy.next_delay(
+                attempts, time.monotonic() - started_at, hint
+            )
+            if delay is None:
+                raise ChatTimeout(task_id)
+            if not _leaves_time(deadline, delay):
+                raise ChatTimeout(task_id, "Deadline exceeded")
 
-                elif status == "failed":
-                    print(
-                        f"❌ Generation failed: {poll_data.get('error', 'Unknown error')}"
-                    )
-                    sys.exit(1)
-                else:
-                    print(f"⚠️ Unexpected status: {status}")
-                    sys.exit(1)
+            if verbose and not poll_errors:
+                print(
+                    f"⏳ Generation still running... (attempt {attempts}, next poll in {delay:.1f}s)"
+                )
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                raise ChatCancelled(task_id)
 
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Failed to poll status: {e}")
-                sys.exit(1)
+    def run_chat(
+        self,
+        user_query: str,
+        user_id: str,
+        country: Literal["japan", "france"] = "japan",
+        history: list[dict] = None,
+        additional_inputs: dict = None,
+        verbose: bool = False,
+        deadline: Union[float, Deadline, None] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> dict:
+        """Start a chat and wait for its result, going through result_cache
 
-            attempts += 1
-            if attempts < max_attempts:
-                time.sleep(10)
-
-        if attempts >= max_attempts:
-            print("❌ Timeout: Generation took too long")
-            sys.exit(1)
-
-    def get_image(self, id: str, country: Literal["japan", "france"] = "japan"):
-        response_image = requests.get(
-            self.base_url + f"/image?id={id}&country={country}",
-            headers=self.default_header,
-            timeout=30,
+        A cached result for the same normalized request is returned without
+        starting a generation; otherwise the new result is cached. deadline
+        covers both the submission and the wait; cancel stops the wait.
+        """
+        deadline = Deadline.coerce(deadline)
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.key(user_query, user_id, country, history, additional_inputs)
+            result = cache.get(key)
+            if result is not None:
+                return result
+
+        task_id = self.start_chat(
+            user_query, user_id, country, history, additional_inputs, deadline=deadline
+        )
+        result = self.wait_for_chat(
+            task_id, verbose=verbose, deadline=deadline, cancel=cancel
+        )
+        if cache is not None:
+            cache.set(key, result)
+        return result
+
+    def submit(
+        self,
+        user_query: str,
+        user_id: str,
+        country: Literal["japan", "france"] = "japan",
+        history: list[dict] = None,
+        additional_inputs: dict = None,
+    ) -> Future:
+        """Start a chat and return a Future for its result
+
+        The chat is started in the calling thread, so submission errors are
+        raised here. Polling runs on one background ChatPoller shared by every
+        submitted chat, and the future resolves with the result or with the
+        exception wait_for_chat would raise. Use it with add_done_callback,
+        concurrent.futures.as_completed or wait. result_cache is used as in
+        run_chat.
+        """
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.key(user_query, user_id, country, history, additional_inputs)
+            result = cache.get(key)
+            if result is not None:
+                future = Future()
+                future.set_result(result)
+                return future
+
+        task_id = self.start_chat(
+            user_query, user_id, country, history, additional_inputs
+        )
+        future = self._get_poller().track(task_id)
+        if cache is not None:
+
+            def store(done: Future):
+                if not done.cancelled() and done.exception() is None:
+                    cache.set(key, done.result())
+
+            future.add_done_callback(store)
+        return future
+
+    def _get_poller(self):
+        # Imported here: the poller module imports this one.
+        from .poller import ChatPoller
+
+        with self._poller_lock:
+            if self._poller is None:
+                self._poller = ChatPoller(self)
+            return self._poller
+
+    def get_image(
+        self,
+        id: str,
+        country: Literal["japan", "france"] = "japan",
+        format: ImageFormat = "base64",
+        timeout: Optional[TimeoutSpec] = None,
+    ):
+        """Download an image as a base64 str, or decoded bytes or memoryview
+
+        With format="bytes" or "memoryview" the base64 payload is decoded
+        straight from the response body, without building a str first.
+        """
+        check_format(format)
+        if self._singleflight is None:
+            return self._get_image(id, country, format, timeout)
+        return self._singleflight.do(
+            ("image", id, country, format, timeout),
+            lambda: self._get_image(id, country, format, timeout),
+        )
+
+    def _get_image(
+        self,
+        id: str,
+        country: str,
+        format: ImageFormat,
+        timeout: Optional[TimeoutSpec] = None,
+    ):
+        key = (id, country)
+        data = lookup_image(self.image_cache, self.disk_cache, key)
+        if data is None:
+            response_image = self._hedged_get(
+                f"/image?id={id}&country={country}",
+                timeout=self.timeouts.resolve("image", timeout),
+            )
+            encoded = extract_base64(response_image.content)
+            uncached = self.image_cache is None and self.disk_cache is None
+            if format == "base64" and uncached:
+                return str(encoded, "ascii")
+            data = binascii.a2b_base64(encoded)
+            store_image(self.image_cache, self.disk_cache, key, data)
+        return convert_image(data, format)
+
+    def prefetch_images(
+        self,
+        result: dict,
+        country: Literal["japan", "france"] = "japan",
+        concurrency: int = 8,
+        format: ImageFormat = "base64",
+    ) -> dict:
+        """Fetch the images of every activity in a chat result in parallel
+
+        Activity ids are deduplicated and fetched with at most concurrency
+        get_image calls in flight over the client's pooled connections.
+        Returns a dict of activity id to image; images that fail to download
+        are left out.
+        """
+        check_format(format)
+        images = bounded_map(
+            lambda id: self.get_image(id, country, format),
+            activity_image_ids(result),
+            concurrency,
+            ordered=False,
+        )
+        return {image.request: image.value for image in images if image.ok}
+
+    def save_image(
+        self,
+        id: str,
+        dest,
+        country: Literal["japan", "france"] = "japan",
+        chunk_size: int = 64 * 1024,
+        timeout: Optional[TimeoutSpec] = None,
+    ) -> int:
+        """Stream the decoded image to a path, file object, socket or callable
+
+        The response is read chunk_size bytes at a time and decoded on the
+        fly, so the whole body is never held in memory. A cached image is
+        written from the cache; a streamed one is not added to it.
+        Returns the number of bytes written.
+        """
+        data = lookup_image(self.image_cache, self.disk_cache, (id, country))
+        if data is not None:
+            return write_image(data, dest)
+
+        response_image = self._hedged_get(
+            f"/image?id={id}&country={country}",
+            timeout=self.timeouts.resolve("image", timeout),
+            stream=True,
         )
-        response_image.raise_for_status()
-        return response_image.json()["base64"]
+        decoder = Base64FieldDecoder()
+        written = 0
+        with response_image, image_sink(dest) as write:
+            for chunk in response_image.iter_content(chunk_size):
+                data = decoder.feed(chunk)
+                if data:
+                    write(data)
+                    written += len(data)
+        decoder.finish()
+        return written
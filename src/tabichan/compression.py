@@ -0,0 +1,71 @@
+import gzip
+import threading
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# The server's answer when it cannot read a Content-Encoding.
+UNSUPPORTED_MEDIA_TYPE = 415
+
+
+class RequestCompression:
+    """Compress large request bodies with gzip or zstd
+
+    Bodies of at least min_size bytes are compressed and sent with a
+    Content-Encoding header; smaller ones, or ones that do not shrink, go
+    out as they are. zstd needs the zstandard package. If the server answers
+    415 Unsupported Media Type the client calls disable() and resends the
+    body uncompressed, and later requests skip compression.
+    """
+
+    ENCODINGS = ("gzip", "zstd")
+
+    def __init__(
+        self,
+        encoding: str = "gzip",
+        min_size: int = 1024,
+        level: Optional[int] = None,
+    ):
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"encoding must be one of {', '.join(self.ENCODINGS)}")
+        if encoding == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        self.encoding = encoding
+        self.min_size = min_size
+        self.level = level
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, body: bytes) -> tuple[bytes, Optional[str]]:
+        """Return the body to send and its Content-Encoding (None if unchanged)"""
+        if not self.enabled or len(body) < self.min_size:
+            return body, None
+        if self.encoding == "zstd":
+            level = 3 if self.level is None else self.level
+            compressed = zstandard.ZstdCompressor(level=level).compress(body)
+        else:
+            level = 6 if self.level is None else self.level
+            compressed = gzip.compress(body, compresslevel=level, mtime=0)
+        if len(compressed) >= len(body):
+            return body, None
+        with self._lock:
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return compressed, self.encoding
+
+    def disable(self):
+        """Stop compressing, e.g. after the server rejected an encoding"""
+        self.enabled = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
@@ -0,0 +1,92 @@
+import time
+from typing import Optional, Tuple, Union
+
+from .exceptions import DeadlineExceeded
+
+# A number (connect and read) or a (connect, read) pair, as in requests.
+TimeoutSpec = Union[float, Tuple[float, float]]
+
+
+class Timeouts:
+    """Connect and read timeouts of the client's requests, in seconds
+
+    chat, poll and image are the read timeouts of start_chat, polls and
+    image downloads. connect bounds opening a connection for all of them;
+    left as None, each request uses its read timeout for both.
+    """
+
+    def __init__(
+        self,
+        *,
+        connect: Optional[float] = None,
+        chat: float = 3.0,
+        poll: float = 5.0,
+        image: float = 30.0,
+    ):
+        for name, value in (
+            ("connect", connect),
+            ("chat", chat),
+            ("poll", poll),
+            ("image", image),
+        ):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} timeout must be positive")
+        self.connect = connect
+        self.chat = chat
+        self.poll = poll
+        self.image = image
+
+    def resolve(
+        self, name: str, timeout: Optional[TimeoutSpec] = None
+    ) -> Tuple[float, float]:
+        """(connect, read) for one request; timeout overrides the defaults"""
+        if timeout is None:
+            read = getattr(self, name)
+            return (read if self.connect is None else self.connect, read)
+        if isinstance(timeout, tuple):
+            return timeout
+        return (timeout, timeout)
+
+
+class Deadline:
+    """Point in time after which a call gives up
+
+    Pass one to several calls to give them a single budget: every request
+    timeout is cut to the time left and no retry or poll is started once
+    it has passed.
+    """
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def coerce(cls, deadline: Union[float, "Deadline", None]) -> Optional["Deadline"]:
+        """Accept a Deadline or a number of seconds from now"""
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def allows(self, delay: float) -> bool:
+        """Whether waiting delay seconds still leaves time for a request"""
+        return time.monotonic() + delay < self.expires_at
+
+    def clip(self, timeout: Optional[Tuple[float, float]]) -> Tuple[float, float]:
+        """Shorten a (connect, read) timeout to the time left
+
+        Raises DeadlineExceeded once no time is left.
+        """
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        if timeout is None:
+            return (remaining, remaining)
+        return (min(timeout[0], remaining), min(timeout[1], remaining))
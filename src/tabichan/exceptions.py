@@ -0,0 +1,72 @@
+from typing import Optional
+
+# Statuses worth retrying: the server is overloaded or briefly unavailable.
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class TabichanError(Exception):
+    """Base class for errors raised by the Tabichan SDK"""
+
+
+class ChatError(TabichanError):
+    """A chat task could not be completed"""
+
+    def __init__(self, task_id: str, message: str):
+        super().__init__(message)
+        self.task_id = task_id
+
+
+class ChatFailed(ChatError):
+    """The server reported the generation as failed"""
+
+    def __init__(self, task_id: str, error: Optional[str] = None):
+        self.error = error or "Unknown error"
+        super().__init__(task_id, f"Generation failed: {self.error}")
+
+
+class ChatTimeout(ChatError, TimeoutError):
+    """The generation did not finish within the polling schedule"""
+
+    def __init__(self, task_id: str, message: str = "Generation took too long"):
+        super().__init__(task_id, message)
+
+
+class UnexpectedChatStatus(ChatError):
+    """The poll endpoint returned a status the SDK does not know"""
+
+    def __init__(self, task_id: str, status):
+        self.status = status
+        super().__init__(task_id, f"Unexpected status: {status}")
+
+
+class ChatCancelled(ChatError):
+    """The caller cancelled the wait; the task itself may still be running"""
+
+    def __init__(
+        self, task_id: str, message: str = "Waiting for the chat was cancelled"
+    ):
+        super().__init__(task_id, message)
+
+
+class PollError(ChatError):
+    """Polling the task failed with an error that is not worth retrying"""
+
+
+class TransientPollError(PollError):
+    """Polling kept failing with transient errors until retries ran out"""
+
+
+class CircuitOpenError(TabichanError):
+    """A request was refused without being sent because its circuit is open"""
+
+    def __init__(self, base_url: str, endpoint: str, retry_after: float):
+        self.base_url = base_url
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit open for {base_url}{endpoint}, retry in {retry_after:.1f}s"
+        )
+
+
+class DeadlineExceeded(TabichanError, TimeoutError):
+    """The caller's deadline passed before the request could be sent"""
@@ -0,0 +1,84 @@
+import math
+import threading
+from collections import deque
+
+from .retry import RetryBudget
+
+
+class HedgePolicy:
+    """When to send a backup copy of a slow idempotent request
+
+    If a request has not answered after the percentile latency of recent
+    requests (p95 by default), a duplicate is sent, to alternative_base_url
+    when to_alternative is set, and whichever answers first wins. Until
+    min_samples latencies have been seen, initial_delay is used instead.
+    Hedges spend tokens from a budget refilled by max_extra_load per request,
+    so they add at most that fraction of extra load. stats() reports how often
+    hedges were sent and how often they beat the original request.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.01,
+        min_samples: int = 20,
+        window: int = 500,
+        max_extra_load: float = 0.1,
+        to_alternative: bool = True,
+    ):
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be in (0, 1)")
+        if not 0 <= max_extra_load <= 1:
+            raise ValueError("max_extra_load must be in [0, 1]")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.to_alternative = to_alternative
+        self.budget = RetryBudget(
+            ratio=max_extra_load, reserve=max(1.0, 10 * max_extra_load)
+        )
+
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for the original request before hedging"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        rank = math.ceil(self.percentile * len(ordered)) - 1
+        return max(ordered[min(max(rank, 0), len(ordered) - 1)], self.min_delay)
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+        self.budget.deposit()
+
+    def record_latency(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def allow_hedge(self) -> bool:
+        if not self.budget.withdraw():
+            return False
+        with self._lock:
+            self.hedges_sent += 1
+        return True
+
+    def record_hedge_win(self):
+        with self._lock:
+            self.hedges_won += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+            }
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import inspect
+import json
+import re
+from contextlib import asynccontextmanager, contextmanager
+from typing import Literal, Mapping, Union
+
+ImageFormat = Literal["base64", "bytes", "memoryview"]
+IMAGE_FORMATS = ("base64", "bytes", "memoryview")
+
+_BASE64_FIELD = re.compile(rb'"base64"\s*:\s*"')
+
+
+def activity_image_ids(result: Mapping) -> list[str]:
+    """Distinct activity ids of an itinerary result, in itinerary order
+
+    Walks itinerary -> days -> activities -> activity -> id and skips
+    anything missing along the way.
+    """
+    ids = {}
+    itinerary = result.get("itinerary") or {}
+    for day in itinerary.get("days") or ():
+        for entry in day.get("activities") or ():
+            activity_id = (entry.get("activity") or {}).get("id")
+            if activity_id is not None:
+                ids[activity_id] = None
+    return list(ids)
+
+
+def check_format(format: str):
+    if format not in IMAGE_FORMATS:
+        raise ValueError(
+            f"format must be one of {', '.join(IMAGE_FORMATS)}, got {format!r}"
+        )
+
+
+def extract_base64(content: bytes) -> memoryview:
+    """Return the base64 field of an /image response body without parsing it
+
+    The value is sliced out of the raw body, so no str copy of the whole
+    payload is made. Anything unusual (escapes other than "\\/", a missing
+    field) falls back to a regular JSON parse.
+    """
+    match = _BASE64_FIELD.search(content)
+    if match is not None:
+        start = match.end()
+        end = content.find(b'"', start)
+        if end != -1:
+            if content.find(b"\\", start, end) == -1:
+                return memoryview(content)[start:end]
+            # JSON encoders may escape "/" as "\/"; nothing else is valid base64.
+            unescaped = content[start:end].replace(b"\\/", b"/")
+            if b"\\" not in unescaped:
+                return memoryview(unescaped)
+    return memoryview(json.loads(content)["base64"].encode("ascii"))
+
+
+def convert_image(data: Union[bytes, memoryview], format: ImageFormat):
+    """Return decoded image bytes in the format requested from get_image"""
+    if format == "base64":
+        return base64.b64encode(data).decode("ascii")
+    if format == "bytes":
+        return data if isinstance(data, bytes) else bytes(data)
+    return memoryview(data)
+
+
+class Base64FieldDecoder:
+    """Decode the base64 field of an /image response body chunk by chunk
+
+    feed() takes raw body chunks and returns the image bytes they complete;
+    finish() checks that the body held the whole field. Only the undecoded
+    tail (under 4 bytes) and a short window for finding the field name are
+    kept between chunks, so memory stays proportional to the chunk size.
+    """
+
+    # Enough to find '"base64": "' split across two chunks.
+    _SEARCH_WINDOW = 64
+
+    def __init__(self):
+        self._pending = b""
+        self._in_value = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._done:
+            return b""
+        if not self._in_value:
+            buffer = self._pending + chunk
+            match = _BASE64_FIELD.search(buffer)
+            if match is None:
+                self._pending = buffer[-self._SEARCH_WINDOW :]
+                return b""
+            self._in_value = True
+            self._pending = b""
+            chunk = buffer[match.end() :]
+
+        end = chunk.find(b'"')
+        if end != -1:
+            self._done = True
+            chunk = chunk[:end]
+        pending = self._pending + chunk
+        # Hold back a trailing backslash until the escape it starts is complete.
+        keep = 1 if pending.endswith(b"\\") and not self._done else 0
+        if keep:
+            pending = pending[:-1]
+        if b"\\" in pending:
+            # JSON encoders may escape "/" as "\/"; nothing else is valid base64.
+            pending = pending.replace(b"\\/", b"/")
+            if b"\\" in pending:
+                raise ValueError("unexpected escape in base64 field")
+
+        usable = len(pending) if self._done else len(pending) - len(pending) % 4
+        self._pending = pending[usable:] + (b"\\" if keep else b"")
+        return binascii.a2b_base64(pending[:usable])
+
+    def finish(self):
+        """Raise if the body ended before the whole field was seen"""
+        if not self._in_value:
+            raise KeyError("base64")
+        if not self._done:
+            raise ValueError("response ended inside the base64 field")
+
+
+@contextmanager
+def image_sink(dest):
+    """Yield a function writing bytes to a path, file object, socket or callable"""
+    if hasattr(dest, "write"):
+        yield dest.write
+    elif hasattr(dest, "sendall"):
+        yield dest.sendall
+    elif callable(dest):
+        yield dest
+    else:
+        with open(dest, "wb") as f:
+            yield f.write
+
+
+@asynccontextmanager
+async def async_image_sink(dest):
+    """Like image_sink, but awaits async writers
+
+    A write() or callable returning an awaitable is awaited, and a writer
+    with drain() (asyncio.StreamWriter) is drained after every chunk.
+    """
+    if hasattr(dest, "sendall") or not (hasattr(dest, "write") or callable(dest)):
+        with image_sink(dest) as sync_write:
+
+            async def write(data: bytes):
+                sync_write(data)
+
+            yield write
+        return
+
+    write_fn = dest.write if hasattr(dest, "write") else dest
+    drain = getattr(dest, "drain", None)
+
+    async def write(data: bytes):
+        result = write_fn(data)
+        if inspect.isawaitable(result):
+            await result
+        if drain is not None:
+            await drain()
+
+    yield write
+
+
+def write_image(data: Union[bytes, memoryview], dest) -> int:
+    """Write image bytes to a path, file object, socket or callable"""
+    with image_sink(dest) as write:
+        write(data)
+    return len(data)
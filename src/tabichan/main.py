@@ -1,6 +1,307 @@
-def main():
-    print("Hello from tabichan-python-sdk!")
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Iterator, Optional
+
+from .__version__ import __version__
+from .batch import bounded_map
+from .client import TabichanClient
+from .poller import ChatPoller
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = math.ceil(fraction * len(values)) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+class Checkpoint:
+    """Append-only journal of submitted and finished batch items
+
+    Each line is {"index": i, "task_id": ...} once a chat has been submitted
+    and {"index": i, "done": true|false} once its result or error was written.
+    A resumed run skips completed items, re-polls submitted ones without
+    resubmitting them and submits failed ones again. Input lines that are not
+    a JSON object are written as done: true, since retrying cannot fix them.
+    A retried item appends a new output record, so the last record for an
+    index wins.
+    """
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.done: set[int] = set()
+        self.submitted: dict[int, str] = {}
+
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a torn last line behind.
+                        continue
+                    if entry.get("done"):
+                        self.done.add(entry["index"])
+                    elif "done" in entry:
+                        self.submitted.pop(entry["index"], None)
+                    elif "task_id" in entry:
+                        self.submitted[entry["index"]] = entry["task_id"]
+
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def record(self, entry: dict):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class BatchRun:
+    """Submit, poll and record the chats of one JSONL input file"""
+
+    def __init__(
+        self,
+        client: TabichanClient,
+        input_path: str,
+        output_path: str,
+        checkpoint_path: str,
+        concurrency: int,
+        max_pending: int,
+        max_requests_per_second: Optional[float],
+        resume: bool,
+    ):
+        self.client = client
+        self.input_path = input_path
+        self.concurrency = concurrency
+        self.checkpoint = Checkpoint(checkpoint_path, resume)
+        self.output = open(output_path, "a" if resume else "w", encoding="utf-8")
+        self.poller = ChatPoller(
+            client,
+            max_workers=concurrency,
+            max_requests_per_second=max_requests_per_second,
+        )
+
+        self._lock = threading.Lock()
+        # Items submitted but not yet handed to the poller hold a slot too, so
+        # leave room for a full submission window to avoid starving it.
+        self._pending = threading.BoundedSemaphore(max(max_pending, concurrency + 1))
+        self._outstanding = 0
+        self._all_done = threading.Condition(self._lock)
+        self.latencies: list[float] = []
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _read_requests(self) -> Iterator[tuple[int, dict]]:
+        with open(self.input_path, encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                if not line.strip():
+                    continue
+                if index in self.checkpoint.done:
+                    self.skipped += 1
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    # JSONDecodeError is a ValueError too.
+                    self._acquire()
+                    record = {
+                        "index": index,
+                        "id": None,
+                        "status": "error",
+                        "error": f"invalid request line: {e}",
+                    }
+                    self._write(index, record, time.monotonic(), False, retryable=False)
+                    continue
+                task_id = self.checkpoint.submitted.get(index)
+                self._acquire()
+                if task_id is not None:
+                    self._track(index, request, task_id, time.monotonic())
+                    continue
+                yield index, request
+
+    def _acquire(self):
+        self._pending.acquire()
+        with self._lock:
+            self._outstanding += 1
+
+    def _submit(self, item: tuple[int, dict]) -> tuple[float, str]:
+        _, request = item
+        started_at = time.monotonic()
+        chat_args = {k: v for k, v in request.items() if k != "id"}
+        return started_at, self.client.start_chat(**chat_args)
+
+    def _track(self, index: int, request: dict, task_id: str, started_at: float):
+        future = self.poller.track(task_id)
+        future.add_done_callback(
+            lambda f: self._finish(index, request, task_id, started_at, f)
+        )
+
+    def _finish(self, index, request, task_id, started_at, future):
+        if future.cancelled():
+            self._release()
+            return
+        error = future.exception()
+        record = {"index": index, "id": request.get("id"), "task_id": task_id}
+        if error is None:
+            record.update(status="completed", result=future.result())
+        else:
+            record.update(status="error", error=str(error))
+        self._write(index, record, started_at, error is None)
+
+    def _write(self, index, record, started_at, ok, retryable=True):
+        with self._lock:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+            self.checkpoint.record({"index": index, "done": ok or not retryable})
+            if ok:
+                self.completed += 1
+                self.latencies.append(time.monotonic() - started_at)
+            else:
+                self.failed += 1
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            self._outstanding -= 1
+            self._all_done.notify_all()
+        self._pending.release()
+
+    def run(self) -> int:
+        started_at = time.monotonic()
+        try:
+            results = bounded_map(
+                self._submit, self._read_requests(), self.concurrency, ordered=False
+            )
+            for item in results:
+                index, request = item.request
+                if item.ok:
+                    submitted_at, task_id = item.value
+                    self.checkpoint.record({"index": index, "task_id": task_id})
+                    self._track(index, request, task_id, submitted_at)
+                else:
+                    record = {
+                        "index": index,
+                        "id": request.get("id"),
+                        "status": "error",
+                        "error": str(item.error),
+                    }
+                    self._write(index, record, time.monotonic(), False)
+
+            with self._all_done:
+                while self._outstanding:
+                    self._all_done.wait()
+        finally:
+            self.poller.close()
+            self.output.close()
+            self.checkpoint.close()
+
+        self.report(time.monotonic() - started_at)
+        return 1 if self.failed else 0
+
+    def report(self, elapsed: float):
+        latencies = sorted(self.latencies)
+        finished = self.completed + self.failed
+        throughput = finished / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Finished {finished} chats ({self.completed} completed, {self.failed} failed, "
+            f"{self.skipped} skipped) in {elapsed:.1f}s - {throughput:.2f} chats/s",
+            file=sys.stderr,
+        )
+        if latencies:
+            print(
+                "Latency p50={:.2f}s p90={:.2f}s p99={:.2f}s max={:.2f}s".format(
+                    percentile(latencies, 0.50),
+                    percentile(latencies, 0.90),
+                    percentile(latencies, 0.99),
+                    latencies[-1],
+                ),
+                file=sys.stderr,
+            )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="tabichan", description="PodTech's Tabichan API command line client"
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser(
+        "batch",
+        help="run every chat request of a JSONL file",
+        description=(
+            "Submit and poll the chat requests of a JSONL file concurrently. "
+            "Each line holds start_chat arguments (user_query, user_id, country, "
+            "history, additional_inputs) and an optional id echoed in the output."
+        ),
+    )
+    batch.add_argument("input", help="input JSONL file")
+    batch.add_argument("-o", "--output", required=True, help="output JSONL file")
+    batch.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="concurrent HTTP requests for submitting and polling (default: 16)",
+    )
+    batch.add_argument(
+        "--max-pending",
+        type=int,
+        default=1000,
+        help="chats submitted but not yet finished (default: 1000)",
+    )
+    batch.add_argument(
+        "--max-rps",
+        type=float,
+        default=None,
+        help="cap on poll requests per second across all chats",
+    )
+    batch.add_argument(
+        "--checkpoint",
+        default=None,
+        help="checkpoint file (default: <output>.checkpoint)",
+    )
+    batch.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip finished items and re-poll submitted ones from the checkpoint",
+    )
+    batch.add_argument("--api-key", default=None, help="defaults to TABICHAN_API_KEY")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command != "batch":
+        parser.print_help()
+        return 2
+
+    client = TabichanClient(args.api_key, pool_maxsize=max(args.concurrency, 10))
+    with client:
+        return BatchRun(
+            client,
+            input_path=args.input,
+            output_path=args.output,
+            checkpoint_path=args.checkpoint or f"{args.output}.checkpoint",
+            concurrency=args.concurrency,
+            max_pending=args.max_pending,
+            max_requests_per_second=args.max_rps,
+            resume=args.resume,
+        ).run()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,138 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional, Union
+
+from .codec import JSONCodec, default_codec
+from .images import activity_image_ids
+
+
+class _Model(Mapping):
+    """Read-only typed view over one section of a raw result dict
+
+    Models behave as the mapping they wrap, so result["itinerary"]["days"]
+    keeps working. Nested models are only built when their property is first
+    read and are then reused. Instances use __slots__ and hold no copy of
+    the data.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw: Mapping):
+        self._raw = raw
+
+    @property
+    def raw(self) -> Mapping:
+        """The wrapped dict, as returned by the API"""
+        return self._raw
+
+    def __getitem__(self, key: str) -> Any:
+        return self.raw[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class Activity(_Model):
+    """One entry of a day's activities"""
+
+    __slots__ = ()
+
+    @property
+    def activity(self) -> Mapping:
+        return self.raw.get("activity") or {}
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.activity.get("id")
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.activity.get("name")
+
+
+class Day(_Model):
+    """One day of an itinerary"""
+
+    __slots__ = ("_activities",)
+
+    def __init__(self, raw: Mapping):
+        super().__init__(raw)
+        self._activities = None
+
+    @property
+    def activities(self) -> tuple[Activity, ...]:
+        if self._activities is None:
+            self._activities = tuple(
+                Activity(entry) for entry in self.raw.get("activities") or ()
+            )
+        return self._activities
+
+
+class Itinerary(_Model):
+    """The itinerary section of a chat result"""
+
+    __slots__ = ("_days",)
+
+    def __init__(self, raw: Mapping):
+        super().__init__(raw)
+        self._days = None
+
+    @property
+    def days(self) -> tuple[Day, ...]:
+        if self._days is None:
+            self._days = tuple(Day(day) for day in self.raw.get("days") or ())
+        return self._days
+
+    def activities(self) -> Iterator[Activity]:
+        """Every activity of every day, in order"""
+        for day in self.days:
+            yield from day.activities
+
+    def activity_ids(self) -> list[str]:
+        """Distinct activity ids, in itinerary order"""
+        return activity_image_ids({"itinerary": self.raw})
+
+
+class ChatResult(_Model):
+    """Typed view of a completed chat result
+
+    Wrap the dict returned by wait_for_chat, or raw result bytes with
+    from_json: those are only decoded when the result is first read.
+    """
+
+    __slots__ = ("_data", "_codec", "_itinerary")
+
+    def __init__(self, raw: Mapping):
+        super().__init__(raw)
+        self._data = None
+        self._codec = None
+        self._itinerary = None
+
+    @classmethod
+    def from_json(
+        cls, data: Union[bytes, str], codec: Optional[JSONCodec] = None
+    ) -> "ChatResult":
+        result = cls(None)
+        result._data = data
+        result._codec = codec or default_codec
+        return result
+
+    @property
+    def raw(self) -> Mapping:
+        if self._raw is None:
+            self._raw = self._codec.loads(self._data)
+            self._data = self._codec = None
+        return self._raw
+
+    @property
+    def itinerary(self) -> Optional[Itinerary]:
+        if self._itinerary is None:
+            raw = self.raw.get("itinerary")
+            if raw is not None:
+                self._itinerary = Itinerary(raw)
+        return self._itinerary
@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from concurrent.futures import as_completed as futures_as_completed
+from typing import Iterable, Iterator, Optional
+
+import requests
+
+from .client import TabichanClient, is_transient_error
+from .exceptions import ChatTimeout, PollError, TransientPollError
+from .polling import PollStrategy, parse_poll
+from .ratelimit import TokenBucket
+
+
+class _TrackedTask:
+    __slots__ = ("task_id", "future", "started_at", "attempts", "poll_errors")
+
+    def __init__(self, task_id: str, future: Future):
+        self.task_id = task_id
+        self.future = future
+        self.started_at = time.monotonic()
+        self.attempts = 0
+        self.poll_errors = 0
+
+
+class ChatPoller:
+    """Track many chat tasks from a single scheduler thread
+
+    Polls for every tracked task are ordered on one timer heap and sent by a
+    small worker pool over the client's pooled session, so N tasks cost
+    max_workers threads instead of N. max_requests_per_second caps the poll
+    rate across all tasks. Each tracked task gets a concurrent.futures.Future
+    that resolves with the chat result, or with the same exceptions
+    TabichanClient.wait_for_chat raises.
+    """
+
+    def __init__(
+        self,
+        client: TabichanClient,
+        *,
+        max_workers: int = 10,
+        max_requests_per_second: Optional[float] = None,
+        poll_strategy: Optional[PollStrategy] = None,
+    ):
+        self.client = client
+        self.poll_strategy = poll_strategy or client.poll_strategy
+        self._budget = (
+            TokenBucket(max_requests_per_second)
+            if max_requests_per_second is not None
+            else None
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tabichan-poll"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._condition = threading.Condition()
+        self._heap: list[tuple[float, int, _TrackedTask]] = []
+        self._sequence = itertools.count()
+        self._futures: dict[str, Future] = {}
+        self._closed = False
+
+        self._thread = threading.Thread(
+            target=self._run, name="tabichan-poller", daemon=True
+        )
+        self._thread.start()
+
+    def track(self, task_id: str) -> Future:
+        """Start tracking a task and return a future for its result"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ChatPoller is closed")
+            future = self._futures.get(task_id)
+            if future is not None:
+                return future
+
+            future = Future()
+            self._futures[task_id] = future
+            future.add_done_callback(lambda _: self._forget(task_id))
+            self._schedule(_TrackedTask(task_id, future), 0.0)
+            return future
+
+    def track_many(self, task_ids: Iterable[str]) -> list[Future]:
+        """Track several tasks at once"""
+        return [self.track(task_id) for task_id in task_ids]
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[Future]:
+        """Yield the currently tracked futures as they finish"""
+        with self._condition:
+            futures = list(self._futures.values())
+        return futures_as_completed(futures, timeout=timeout)
+
+    def pending(self) -> int:
+        """Number of tasks still being tracked"""
+        with self._condition:
+            return len(self._futures)
+
+    def close(self):
+        """Stop polling and cancel every task that has not finished yet"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            futures = list(self._futures.values())
+            self._heap.clear()
+            self._condition.notify_all()
+
+        for future in futures:
+            future.cancel()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _forget(self, task_id: str):
+        with self._condition:
+            self._futures.pop(task_id, None)
+
+    def _schedule(self, task: _TrackedTask, delay: float):
+        heapq.heappush(
+            self._heap, (time.monotonic() + delay, next(self._sequence), task)
+        )
+        self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                _, _, task = heapq.heappop(self._heap)
+
+            if task.future.cancelled():
+                continue
+
+            if self._budget is not None:
+                self._budget.acquire()
+
+            self._slots.acquire()
+            try:
+                self._executor.submit(self._poll_once, task)
+            except RuntimeError:
+                # The executor was shut down by close() while we waited.
+                self._slots.release()
+                return
+
+    def _poll_once(self, task: _TrackedTask):
+        try:
+            if task.future.cancelled():
+                return
+            try:
+                poll_data, hint = self.client._poll(task.task_id)
+            except requests.exceptions.RequestException as e:
+                if not is_transient_error(e):
+                    raise PollError(task.task_id, f"Failed to poll status: {e}") from e
+                task.poll_errors += 1
+                if task.poll_errors > self.client.max_poll_retries:
+                    raise TransientPollError(
+                        task.task_id,
+                        f"Failed to poll status after {task.poll_errors} tries: {e}",
+                    ) from e
+                hint = None
+            else:
+                task.poll_errors = 0
+                done, result = parse_poll(task.task_id, poll_data)
+                if done:
+                    self._resolve(task, result=result)
+                    return
+
+            task.attempts += 1
+            delay = self.poll_strategy.next_delay(
+                task.attempts, time.monotonic() - task.started_at, hint
+            )
+            if delay is None:
+                raise ChatTimeout(task.task_id)
+
+            with self._condition:
+                if not self._closed:
+                    self._schedule(task, delay)
+        except Exception as e:
+            self._resolve(task, exception=e)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _resolve(task: _TrackedTask, result=None, exception=None):
+        try:
+            if exception is not None:
+                task.future.set_exception(exception)
+            else:
+                task.future.set_result(result)
+        except InvalidStateError:
+            # The caller cancelled the future while its poll was in flight.
+            pass
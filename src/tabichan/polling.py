@@ -0,0 +1,143 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
+
+from .exceptions import ChatFailed, UnexpectedChatStatus
+
+
+class PollStrategy:
+    """Decides how long to wait between two polls of a chat task"""
+
+    def next_delay(
+        self, attempt: int, elapsed: float, hint: Optional[float] = None
+    ) -> Optional[float]:
+        """Return the delay before the next poll, or None to give up
+
+        attempt is the number of polls already made, elapsed the seconds since
+        the first poll and hint an optional server suggestion in seconds.
+        """
+        raise NotImplementedError
+
+
+class FixedPollStrategy(PollStrategy):
+    """Poll every interval seconds, at most max_attempts times"""
+
+    def __init__(self, interval: float = 10.0, max_attempts: int = 30):
+        self.interval = interval
+        self.max_attempts = max_attempts
+
+    def next_delay(
+        self, attempt: int, elapsed: float, hint: Optional[float] = None
+    ) -> Optional[float]:
+        if attempt >= self.max_attempts:
+            return None
+        return self.interval
+
+
+class BackoffPollStrategy(PollStrategy):
+    """Poll quickly at first, then back off exponentially up to max_interval
+
+    Each delay is randomised by +/- jitter (a fraction of the delay) so that
+    many tasks started together do not poll in lockstep. When the server sends
+    a Retry-After or ETA hint it is used instead of the computed delay, kept
+    between initial and max_interval so an ETA of 0 cannot cause a tight poll
+    loop. Polling stops once deadline seconds have elapsed, or after
+    max_attempts polls.
+    """
+
+    def __init__(
+        self,
+        initial: float = 1.0,
+        multiplier: float = 1.5,
+        max_interval: float = 10.0,
+        jitter: float = 0.1,
+        deadline: Optional[float] = 300.0,
+        max_attempts: Optional[int] = None,
+        use_server_hint: bool = True,
+    ):
+        if initial <= 0 or multiplier < 1 or max_interval < initial:
+            raise ValueError(
+                "initial must be positive, multiplier at least 1 and max_interval at least initial"
+            )
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be in [0, 1)")
+
+        self.initial = initial
+        self.multiplier = multiplier
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.use_server_hint = use_server_hint
+
+    def next_delay(
+        self, attempt: int, elapsed: float, hint: Optional[float] = None
+    ) -> Optional[float]:
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        if self.deadline is not None and elapsed >= self.deadline:
+            return None
+
+        if self.use_server_hint and hint is not None:
+            delay = min(max(hint, self.initial), self.max_interval)
+        else:
+            # Cap the exponent so long waits cannot overflow the float.
+            exponent = min(max(attempt - 1, 0), 64)
+            delay = min(self.initial * self.multiplier**exponent, self.max_interval)
+            if self.jitter:
+                delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+                delay = min(delay, self.max_interval)
+
+        if self.deadline is not None:
+            # Land the last poll on the deadline rather than overshooting it.
+            delay = min(delay, self.deadline - elapsed)
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def poll_hint(headers: Mapping[str, str], data: Any) -> Optional[float]:
+    """Extract the server's suggested delay before the next poll, if any
+
+    The Retry-After header wins; otherwise a numeric "retry_after" or "eta"
+    field (in seconds) in the poll payload is used.
+    """
+    hint = parse_retry_after(headers.get("Retry-After"))
+    if hint is not None:
+        return hint
+
+    if isinstance(data, dict):
+        for field in ("retry_after", "eta"):
+            value = data.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return max(float(value), 0.0)
+    return None
+
+
+def parse_poll(task_id: str, poll_data: dict) -> tuple[bool, Any]:
+    """Return (True, result) for a completed task and (False, None) while running
+
+    Raises ChatFailed or UnexpectedChatStatus for any other status.
+    """
+    status = poll_data["status"]
+    if status == "completed":
+        return True, poll_data["result"]
+    if status == "failed":
+        raise ChatFailed(task_id, poll_data.get("error"))
+    if status != "running":
+        raise UnexpectedChatStatus(task_id, status)
+    return False, None
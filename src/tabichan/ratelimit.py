@@ -0,0 +1,170 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Mapping, Optional, Tuple, Union
+
+# Endpoints with their own budget; request paths are matched on these.
+ENDPOINTS = ("/chat", "/chat/poll", "/image", "/ws/chat")
+
+
+class TokenBucket:
+    """Token bucket for one process, safe to share between threads
+
+    Tokens refill at rate per second up to burst (default: one second's worth,
+    at least 1). reserve() always takes its token and returns how long the
+    caller must wait before using it, so waiting callers are served in order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens and return how long to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in SQLite, shared by every process on a host
+
+    Each reservation is one IMMEDIATE transaction, so concurrent processes
+    take turns on the row. Time is wall-clock (time.time) because monotonic
+    clocks are not comparable across processes.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        name: str,
+        rate: float,
+        burst: Optional[float] = None,
+    ):
+        super().__init__(rate, burst)
+        self.path = str(path)
+        self.name = name
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (name, self.capacity, time.time()),
+            )
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored, updated_at = self._conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                now = time.time()
+                # max() guards against the wall clock stepping backwards.
+                elapsed = max(now - updated_at, 0.0)
+                available = min(self.capacity, stored + elapsed * self.rate)
+                available -= tokens
+                self._conn.execute(
+                    "UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                    (available, max(now, updated_at), self.name),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return 0.0 if available >= 0 else -available / self.rate
+
+    async def aacquire(self, tokens: float = 1.0):
+        # The transaction may wait on other processes' locks; keep it off the loop.
+        wait = await asyncio.to_thread(self.reserve, tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+RateSpec = Union[float, Tuple[float, float]]
+
+
+class RateLimiter:
+    """Per-endpoint request budgets for the clients and the WebSocket
+
+    rates maps an endpoint ("/chat", "/chat/poll", "/image", "/ws/chat") to
+    requests per second, or to a (rate, burst) pair. Endpoints without an
+    entry use default_rate, or are not limited when it is None. With
+    shared_path, budgets are kept in that SQLite file so every process using
+    the same file shares them, e.g. all workers on a host with one API key.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Mapping[str, RateSpec]] = None,
+        *,
+        default_rate: Optional[RateSpec] = None,
+        shared_path: Optional[Union[str, os.PathLike]] = None,
+    ):
+        rates = dict(rates or {})
+        unknown = set(rates) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"unknown endpoints: {', '.join(sorted(unknown))}")
+        self.shared_path = shared_path
+        self.buckets: dict = {}
+        for endpoint in ENDPOINTS:
+            spec = rates.get(endpoint, default_rate)
+            if spec is not None:
+                self.buckets[endpoint] = self._make_bucket(endpoint, spec)
+
+    def _make_bucket(self, endpoint: str, spec: RateSpec) -> TokenBucket:
+        rate, burst = spec if isinstance(spec, tuple) else (spec, None)
+        if self.shared_path is not None:
+            return SQLiteTokenBucket(self.shared_path, endpoint, rate, burst)
+        return TokenBucket(rate, burst)
+
+    def bucket_for(self, path: str) -> Optional[TokenBucket]:
+        """Bucket of the endpoint a request path belongs to, if limited"""
+        path = path.split("?", 1)[0]
+        if path.startswith("/ws/chat"):
+            path = "/ws/chat"
+        return self.buckets.get(path)
+
+    def acquire(self, path: str):
+        """Block until a request to path fits the budget"""
+        bucket = self.bucket_for(path)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def aacquire(self, path: str):
+        """Wait without blocking the event loop until a request to path fits"""
+        bucket = self.bucket_for(path)
+        if bucket is not None:
+            await bucket.aacquire()
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+
+def result_key(
+    user_query: str,
+    country: str,
+    history: Optional[list] = None,
+    additional_inputs: Optional[dict] = None,
+    user_id: Optional[str] = None,
+) -> str:
+    """Canonical hash of a chat request
+
+    Whitespace in the query is collapsed and dicts are serialised with
+    sorted keys, so requests that differ only in formatting share a key.
+    user_id only takes part when it is passed.
+    """
+    request = {
+        "user_query": " ".join(user_query.split()),
+        "country": country,
+        "history": history or [],
+        "additional_inputs": additional_inputs or {},
+    }
+    if user_id is not None:
+        request["user_id"] = user_id
+    canonical = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """Storage backend of a ResultCache
+
+    get returns the stored result or None when it is missing or expired;
+    set stores a result for ttl seconds (None keeps it until removed).
+    """
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryResultStore(ResultStore):
+    """Results kept in process, evicting the least recently used past max_entries"""
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskResultStore(ResultStore):
+    """One JSON file per result, written atomically so processes can share it"""
+
+    def __init__(self, directory: Union[str, os.PathLike]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            self.delete(key)
+            return None
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and time.time() >= expires_at:
+            self.delete(key)
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        entry = {
+            "expires_at": None if ttl is None else time.time() + ttl,
+            "value": value,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self, key: str):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+class SQLiteResultStore(ResultStore):
+    """Results in a SQLite database, shareable between processes"""
+
+    def __init__(self, path: Union[str, os.PathLike] = "tabichan-results.sqlite3"):
+        self.path = str(path)
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and time.time() >= expires_at:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+        return json.loads(value)
+
+    def set(self, key: str, value: dict, ttl: Optional[float]):
+        expires_at = None if ttl is None else time.time() + ttl
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, data, expires_at),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResultCache:
+    """Completed chat results keyed on the normalized request
+
+    Used by run_chat to skip generation for a request already answered
+    within ttl seconds. user_id is part of the key by default, since results
+    may be personalised; set include_user_id=False to let users asking the
+    same question share a result. store defaults to a MemoryResultStore.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ResultStore] = None,
+        ttl: Optional[float] = 3600.0,
+        include_user_id: bool = True,
+    ):
+        self.store = store if store is not None else MemoryResultStore()
+        self.ttl = ttl
+        self.include_user_id = include_user_id
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        user_query: str,
+        user_id: str,
+        country: str = "japan",
+        history: Optional[list] = None,
+        additional_inputs: Optional[dict] = None,
+    ) -> str:
+        return result_key(
+            user_query,
+            country,
+            history,
+            additional_inputs,
+            user_id if self.include_user_id else None,
+        )
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.store.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: dict):
+        self.store.set(key, value, self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,122 @@
+import random
+import threading
+from typing import Optional
+
+from .exceptions import TRANSIENT_STATUS_CODES
+
+# Statuses meaning the server turned the request away without processing it,
+# so even a non-idempotent POST /chat can safely be sent again.
+REJECTED_STATUS_CODES = frozenset({429, 503})
+
+
+class RetryBudget:
+    """Caps retries to a fraction of the requests sent, shared across calls
+
+    Every request deposits ratio tokens and every retry spends one, starting
+    from (and capped at) reserve tokens. When upstream is failing hard the
+    budget runs dry and retries stop instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0):
+        if ratio < 0 or reserve < 0:
+            raise ValueError("ratio and reserve must not be negative")
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """When and how long to wait before resending a failed HTTP request
+
+    Idempotent requests (GET) are retried on transport errors and on
+    retry_statuses. Non-idempotent ones (POST /chat) are only retried when the
+    request never reached the server or was explicitly rejected (429/503), so a
+    retry cannot start the same chat twice. Delays use exponential backoff with
+    full jitter unless the server sends Retry-After. deadline bounds the total
+    time spent on one call, retries included.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        retry_statuses: frozenset = TRANSIENT_STATUS_CODES,
+        respect_retry_after: bool = True,
+        deadline: Optional[float] = 60.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.deadline = deadline
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def record_request(self):
+        """Account for a new call (not a retry) in the retry budget"""
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff after the given attempt number"""
+        exponent = min(max(attempt - 1, 0), 32)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**exponent))
+
+    def next_delay(
+        self,
+        attempt: int,
+        elapsed: float,
+        *,
+        idempotent: bool,
+        status: Optional[int] = None,
+        sent: bool = True,
+        retry_after: Optional[float] = None,
+    ) -> Optional[float]:
+        """Return the delay before retrying, or None if the call should fail
+
+        attempt is the number of attempts made so far. status is the HTTP
+        status of the failed attempt, or None for a transport error, in which
+        case sent tells whether the request may have reached the server.
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        if status is not None:
+            retryable = status in self.retry_statuses and (
+                idempotent or status in REJECTED_STATUS_CODES
+            )
+        else:
+            retryable = idempotent or not sent
+        if not retryable:
+            return None
+
+        if self.respect_retry_after and retry_after is not None:
+            delay = retry_after
+        else:
+            delay = self.backoff(attempt)
+
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+        return delay
@@ -0,0 +1,157 @@
+import threading
+import time
+from typing import Iterable, Optional, Sequence
+
+
+class EndpointStats:
+    """Health and latency bookkeeping for one base URL"""
+
+    __slots__ = (
+        "url",
+        "latency",
+        "consecutive_failures",
+        "healthy",
+        "retry_at",
+        "last_used",
+        "requests",
+        "failures",
+    )
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+
+
+class EndpointRouter:
+    """Route requests to the fastest healthy base URL
+
+    Latency is tracked as an exponentially weighted moving average (alpha is
+    the weight of the newest sample). An endpoint is marked unhealthy after
+    failure_threshold consecutive failures and gets a probe request again
+    after cooldown seconds; one success brings it back. A healthy endpoint
+    that has not been used for probe_interval seconds also receives the next
+    request so its latency estimate stays current. Endpoints earlier in the
+    list win ties, which keeps the primary URL preferred until measurements
+    say otherwise.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        *,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        probe_interval: float = 60.0,
+    ):
+        if not urls:
+            raise ValueError("at least one endpoint URL is required")
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.endpoints = [EndpointStats(url) for url in urls]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> list[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def choose(self, exclude: Iterable[str] = ()) -> str:
+        """Pick the endpoint for the next request
+
+        exclude lists endpoints that already failed during the current call;
+        they are only returned when nothing else is left.
+        """
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.url not in exclude]
+            if not candidates:
+                candidates = self.endpoints
+
+            chosen = self._due_for_probe(candidates, now)
+            if chosen is None:
+                healthy = [e for e in candidates if e.healthy]
+                if healthy:
+                    chosen = min(
+                        healthy,
+                        key=lambda e: float("inf") if e.latency is None else e.latency,
+                    )
+                else:
+                    # Everything is down: try whichever comes back soonest.
+                    chosen = min(candidates, key=lambda e: e.retry_at)
+                    chosen.retry_at = now + self.cooldown
+
+            chosen.last_used = now
+            return chosen.url
+
+    def _due_for_probe(
+        self, candidates: list[EndpointStats], now: float
+    ) -> Optional[EndpointStats]:
+        for endpoint in candidates:
+            if not endpoint.healthy and now >= endpoint.retry_at:
+                # Half-open: let one request through, hold the rest back.
+                endpoint.retry_at = now + self.cooldown
+                return endpoint
+
+        healthy = [e for e in candidates if e.healthy]
+        if len(healthy) > 1:
+            for endpoint in healthy:
+                if now - endpoint.last_used >= self.probe_interval:
+                    return endpoint
+        return None
+
+    def record_success(self, url: str, latency: float):
+        with self._lock:
+            endpoint = self._by_url.get(url)
+            if endpoint is None:
+                return
+            endpoint.requests += 1
+            endpoint.consecutive_failures = 0
+            endpoint.healthy = True
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.alpha * (latency - endpoint.latency)
+
+    def record_failure(self, url: str):
+        with self._lock:
+            endpoint = self._by_url.get(url)
+            if endpoint is None:
+                return
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                if endpoint.healthy:
+                    endpoint.retry_at = time.monotonic() + self.cooldown
+                endpoint.healthy = False
+
+    def has_alternative(self, exclude: Iterable[str]) -> bool:
+        """Whether a healthy endpoint outside exclude is available"""
+        exclude = set(exclude)
+        with self._lock:
+            return any(e.healthy and e.url not in exclude for e in self.endpoints)
+
+    def stats(self) -> dict:
+        """Snapshot of per-endpoint health, latency and request counts"""
+        with self._lock:
+            return {
+                e.url: {
+                    "healthy": e.healthy,
+                    "latency": e.latency,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                }
+                for e in self.endpoints
+            }
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one
+
+    The first caller for a key runs fn; callers arriving while it is still
+    running wait for it and get the same result or exception. Once the call
+    finishes the key is forgotten, so later calls run fn again. Results are
+    shared, not copied, so callers must not mutate them.
+
+    timeout bounds how long a caller waits for a call already in flight;
+    concurrent.futures.TimeoutError is raised once it passes.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(
+        self, key: Hashable, fn: Callable[[], T], timeout: Optional[float] = None
+    ) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Async counterpart of SingleFlight for use on one event loop
+
+    The shared call runs as its own task, so a caller being cancelled does
+    not cancel the call for the others waiting on it. When the last waiter
+    is cancelled, or gives up after timeout seconds with asyncio.TimeoutError,
+    the shared call is cancelled too, so no request keeps running for nobody.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda done: self._forget(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled.
+        if not call.task.cancelled():
+            call.task.exception()
@@ -1,13 +1,21 @@
 import os
-import json
 import asyncio
 from typing import Optional, Dict, List, Any, Callable
 import websockets
 from websockets.exceptions import ConnectionClosed
 
+from .codec import JSONCodec, default_codec
+from .ratelimit import RateLimiter
+
 
 class TabichanWebSocket:
-    def __init__(self, user_id: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        user_id: str,
+        api_key: Optional[str] = None,
+        codec: Optional[JSONCodec] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         if not user_id:
             raise ValueError("user_id is required")
 
@@ -26,6 +34,9 @@ class TabichanWebSocket:
         self.current_question_id = None
         self.base_url = "wss://tabichan.podtech-ai.com/v1"
         self.connection_task = None
+        self.codec = codec or default_codec
+        # Sends spend from the limiter's "/ws/chat" budget.
+        self.rate_limiter = rate_limiter
 
         # Event handlers
         self.event_handlers: Dict[str, List[Callable]] = {}
@@ -95,10 +106,11 @@ class TabichanWebSocket:
         try:
             async for message in self.ws:
                 try:
-                    data = json.loads(message)
-                    self.handle_message(data)
-                except json.JSONDecodeError as e:
+                    data = self.codec.loads(message)
+                except ValueError as e:
                     self.emit("error", Exception(f"Failed to parse message: {e}"))
+                    continue
+                self.handle_message(data)
         except ConnectionClosed as e:
             self.is_connected = False
             self.current_question_id = None
@@ -173,8 +185,12 @@ class TabichanWebSocket:
         if not self.ws or (hasattr(self.ws, "closed") and self.ws.closed):
             raise Exception("WebSocket is not open")
 
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(f"/ws/chat/{self.user_id}")
+
         try:
-            await self.ws.send(json.dumps(message))
+            # Text frame: the server expects JSON as text, not binary frames.
+            await self.ws.send(self.codec.dumps(message).decode("utf-8"))
         except Exception as e:
             raise Exception(f"Failed to send message: {e}")
 
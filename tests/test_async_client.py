@@ -0,0 +1,607 @@
+import asyncio
+import base64
+import gzip
+import json
+import os
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from tabichan.async_client import AsyncTabichanClient
+from tabichan.cache import DiskImageCache, ImageCache
+from tabichan.circuit import CircuitBreaker
+from tabichan.compression import RequestCompression
+from tabichan.deadline import Deadline, Timeouts
+from tabichan.ratelimit import RateLimiter
+from tabichan.exceptions import (
+    ChatFailed,
+    ChatTimeout,
+    CircuitOpenError,
+    DeadlineExceeded,
+    PollError,
+    TransientPollError,
+)
+from tabichan.hedging import HedgePolicy
+from tabichan.polling import FixedPollStrategy
+from tabichan.result_cache import ResultCache
+
+
+def make_client(handler, api_key="test-api-key", **kwargs):
+    """Build a client whose pool is backed by an in-memory transport"""
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncTabichanClient(api_key, http_client=http_client, **kwargs)
+
+
+def poll_sequence(*payloads):
+    """Return a handler answering successive requests with the given payloads"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        payload = payloads[min(len(calls), len(payloads)) - 1]
+        return httpx.Response(200, json=payload)
+
+    return handler, calls
+
+
+class TestAsyncTabichanClient:
+    def test_client_initialization_with_api_key(self):
+        """Test client initialization with direct API key"""
+        client = AsyncTabichanClient("test-api-key")
+        assert client.api_key == "test-api-key"
+        assert client.base_url == "https://tourism-api.podtech-ai.com/v1"
+        assert client.alternative_base_url == "https://tabichan.podtech-ai.com/v1"
+        assert isinstance(client.http_client, httpx.AsyncClient)
+
+    @patch.dict(os.environ, {"TABICHAN_API_KEY": "env-api-key"})
+    def test_client_initialization_with_env_var(self):
+        """Test client initialization using API key from environment variable"""
+        client = AsyncTabichanClient()
+        assert client.api_key == "env-api-key"
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_client_initialization_missing_env_var(self):
+        """Test client initialization when environment variable is not set"""
+        with pytest.raises(ValueError):
+            AsyncTabichanClient()
+
+    @pytest.mark.asyncio
+    async def test_start_chat(self):
+        """Test start_chat sends the same body and headers as the sync client"""
+        handler, calls = poll_sequence({"task_id": "async-task"})
+        client = make_client(handler)
+
+        task_id = await client.start_chat(
+            "Test query", "user123", country="france", history=[{"role": "user"}]
+        )
+
+        assert task_id == "async-task"
+        assert len(calls) == 1
+        request = calls[0]
+        assert request.method == "POST"
+        assert str(request.url) == "https://tourism-api.podtech-ai.com/v1/chat"
+        assert request.headers["x-api-key"] == "test-api-key"
+        assert request.headers["User-Agent"].startswith("tabichan-python-sdk/")
+        assert json.loads(request.content) == {
+            "user_query": "Test query",
+            "user_id": "user123",
+            "country": "france",
+            "history": [{"role": "user"}],
+            "additional_inputs": {},
+        }
+
+    @pytest.mark.asyncio
+    async def test_poll_chat(self):
+        """Test poll_chat returns the decoded poll payload"""
+        handler, calls = poll_sequence({"status": "running"})
+        client = make_client(handler)
+
+        result = await client.poll_chat("test-task")
+
+        assert result == {"status": "running"}
+        assert (
+            str(calls[0].url)
+            == "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=test-task"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_image(self):
+        """Test get_image returns the base64 payload"""
+        handler, calls = poll_sequence({"base64": "image-data"})
+        client = make_client(handler)
+
+        image = await client.get_image("img-1", country="france")
+
+        assert image == "image-data"
+        assert (
+            str(calls[0].url)
+            == "https://tourism-api.podtech-ai.com/v1/image?id=img-1&country=france"
+        )
+
+    @pytest.mark.asyncio
+    async def test_http_error_is_raised(self):
+        """Test that HTTP errors surface as httpx.HTTPStatusError"""
+        client = make_client(lambda request: httpx.Response(503), retry_policy=None)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.poll_chat("test-task")
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_wait_for_chat_running_then_completed(self, mock_sleep):
+        """Test wait_for_chat with running status then completed"""
+        handler, calls = poll_sequence(
+            {"status": "running"},
+            {"status": "completed", "result": {"answer": "Final answer"}},
+        )
+        client = make_client(handler)
+
+        result = await client.wait_for_chat("running-task", verbose=True)
+
+        assert result["answer"] == "Final answer"
+        assert len(calls) == 2
+        assert mock_sleep.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_wait_for_chat_failed_status(self):
+        """Test wait_for_chat with failed status"""
+        handler, _ = poll_sequence({"status": "failed", "error": "Test error"})
+        client = make_client(handler)
+
+        with pytest.raises(ChatFailed, match="Test error"):
+            await client.wait_for_chat("failed-task")
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_wait_for_chat_timeout(self, mock_sleep):
+        """Test wait_for_chat timeout scenario"""
+        handler, calls = poll_sequence({"status": "running"})
+        client = make_client(handler)
+
+        with pytest.raises(ChatTimeout):
+            await client.wait_for_chat(
+                "timeout-task", poll_strategy=FixedPollStrategy(10, 30)
+            )
+
+        assert len(calls) == 30
+        assert mock_sleep.await_count == 29
+
+    @pytest.mark.asyncio
+    async def test_context_manager_closes_pool(self):
+        """Test that leaving the context manager closes the owned pool"""
+        client = AsyncTabichanClient("test-api-key")
+        async with client as entered:
+            assert entered is client
+        assert client.http_client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_aclose_keeps_external_pool_open(self):
+        """Test that aclose() leaves a caller-provided pool alone"""
+        http_client = httpx.AsyncClient()
+        client = AsyncTabichanClient("test-api-key", http_client=http_client)
+
+        await client.aclose()
+
+        assert not http_client.is_closed
+        await http_client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_start_chats(self):
+        """Test that start_chats streams task_ids and isolates failures"""
+
+        def handler(request):
+            query = json.loads(request.content)["user_query"]
+            if query == "bad":
+                return httpx.Response(503)
+            return httpx.Response(200, json={"task_id": f"task-{query}"})
+
+        client = make_client(handler, retry_policy=None)
+        chat_requests = [
+            {"user_query": query, "user_id": "user123"} for query in ["a", "bad", "c"]
+        ]
+
+        results = [r async for r in client.start_chats(chat_requests, concurrency=2)]
+
+        assert [r.value for r in results] == ["task-a", None, "task-c"]
+        assert isinstance(results[1].error, httpx.HTTPStatusError)
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_wait_for_chat_retries_transient_poll_errors(self, mock_sleep):
+        """Test that transient poll errors are retried until they run out"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("reset", request=request)
+
+        client = make_client(handler, retry_policy=None)
+        with pytest.raises(TransientPollError):
+            await client.wait_for_chat("flaky-task")
+
+        assert len(calls) == 4
+        assert mock_sleep.await_count == 3
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_request_retries_transient_errors(self, mock_sleep):
+        """Test that idempotent requests are retried with backoff"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            if len(calls) == 2:
+                return httpx.Response(502)
+            return httpx.Response(200, json={"status": "running"})
+
+        client = make_client(handler)
+        assert await client.poll_chat("retry-task") == {"status": "running"}
+        assert len(calls) == 3
+        assert mock_sleep.await_count == 2
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_post_not_retried_on_read_timeout(self, mock_sleep):
+        """Test that start_chat is not resent once the request was sent"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ReadTimeout("slow", request=request)
+
+        client = make_client(handler)
+        with pytest.raises(httpx.ReadTimeout):
+            await client.start_chat("Test query", "user123")
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_failover_to_alternative_base_url(self, mock_sleep):
+        """Test that the async client fails over on a 5xx from the primary"""
+
+        def handler(request):
+            if request.url.host == "tourism-api.podtech-ai.com":
+                return httpx.Response(502)
+            return httpx.Response(200, json={"base64": "from-alternative"})
+
+        client = make_client(handler, failover=True)
+        assert await client.get_image("img") == "from-alternative"
+        mock_sleep.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_hedged_get_image_cancels_slow_primary(self):
+        """Test that a slow request is hedged and the loser is cancelled"""
+        cancelled = []
+
+        async def handler(request):
+            if request.url.host == "tourism-api.podtech-ai.com":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(request)
+                    raise
+            return httpx.Response(200, json={"base64": request.url.host})
+
+        hedging = HedgePolicy(initial_delay=0.01)
+        client = make_client(handler, hedging=hedging)
+        assert await client.get_image("img") == "tabichan.podtech-ai.com"
+        await asyncio.sleep(0)
+        assert len(cancelled) == 1
+        assert hedging.stats() == {"requests": 1, "hedges_sent": 1, "hedges_won": 1}
+
+    @pytest.mark.asyncio
+    async def test_hedging_respects_load_budget(self):
+        """Test that no hedge is sent once the extra-load budget is spent"""
+        calls = []
+
+        async def slow_handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json={"status": "running"})
+
+        hedging = HedgePolicy(initial_delay=0.001, max_extra_load=0)
+        client = make_client(slow_handler, hedging=hedging)
+        for _ in range(3):
+            await client.poll_chat("budget-task")
+        assert hedging.stats()["hedges_sent"] == 1
+        assert len(calls) == 4
+
+    @pytest.mark.asyncio
+    async def test_get_image_uses_cache(self):
+        """Test that the async client serves repeated images from the cache"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"base64": "aGVsbG8="})
+
+        client = make_client(handler, image_cache=ImageCache())
+        assert await client.get_image("img") == "aGVsbG8="
+        assert await client.get_image("img", format="bytes") == b"hello"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_get_image_uses_disk_cache(self, tmp_path):
+        """Test that the async client stores and reads images on disk"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"base64": "aGVsbG8="})
+
+        disk = DiskImageCache(tmp_path)
+        client = make_client(handler, disk_cache=disk)
+        assert await client.get_image("img") == "aGVsbG8="
+        assert await client.get_image("img") == "aGVsbG8="
+        assert len(calls) == 1
+        assert bytes(disk.get(("img", "japan"))) == b"hello"
+
+    @pytest.mark.asyncio
+    async def test_get_image_as_bytes_and_save(self, tmp_path):
+        """Test that the async client decodes and saves images"""
+
+        def handler(request):
+            return httpx.Response(200, json={"base64": "aGVsbG8="})
+
+        client = make_client(handler)
+        assert await client.get_image("img", format="bytes") == b"hello"
+        assert await client.save_image("img", tmp_path / "img.png") == 5
+        assert (tmp_path / "img.png").read_bytes() == b"hello"
+
+    @pytest.mark.asyncio
+    async def test_save_image_streams_to_stream_writer(self):
+        """Test that the async client streams into an asyncio-style writer"""
+        image = bytes(range(256)) * 100
+
+        def handler(request):
+            return httpx.Response(
+                200, json={"base64": base64.b64encode(image).decode()}
+            )
+
+        class Writer:
+            def __init__(self):
+                self.buffer = bytearray()
+                self.drains = 0
+
+            def write(self, data):
+                self.buffer += data
+
+            async def drain(self):
+                self.drains += 1
+
+        writer = Writer()
+        client = make_client(handler)
+        assert await client.save_image("img", writer, chunk_size=1000) == len(image)
+        assert bytes(writer.buffer) == image
+        assert writer.drains > 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_images(self):
+        """Test that the async client fetches distinct activity images"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            id = request.url.params["id"]
+            return httpx.Response(
+                200, json={"base64": base64.b64encode(id.encode()).decode()}
+            )
+
+        result = {
+            "itinerary": {
+                "days": [
+                    {
+                        "activities": [
+                            {"activity": {"id": "a"}},
+                            {"activity": {"id": "b"}},
+                        ]
+                    },
+                    {"activities": [{"activity": {"id": "b"}}]},
+                ]
+            }
+        }
+        client = make_client(handler)
+        images = await client.prefetch_images(result, concurrency=2)
+        assert images == {"a": "YQ==", "b": "Yg=="}
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_coalesce_concurrent_polls(self):
+        """Test that concurrent polls of one task share a request"""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"status": "running"})
+
+        client = make_client(handler, coalesce=True)
+        results = await asyncio.gather(*(client.poll_chat("hot") for _ in range(20)))
+        assert results == [{"status": "running"}] * 20
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_coalesced_poll_keeps_each_callers_deadline(self):
+        """Test that joining another caller's poll does not outlast the deadline"""
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(
+                200, json={"status": "completed", "result": {"text": "plan"}}
+            )
+
+        client = make_client(handler, coalesce=True)
+        leader = asyncio.ensure_future(client.wait_for_chat("t", deadline=10))
+        await asyncio.sleep(0.01)
+        started_at = asyncio.get_running_loop().time()
+        with pytest.raises(ChatTimeout):
+            await client.wait_for_chat("t", deadline=0.2)
+        assert asyncio.get_running_loop().time() - started_at < 0.9
+        assert await leader == {"text": "plan"}
+
+    @pytest.mark.asyncio
+    async def test_coalesced_poll_does_not_share_a_clipped_timeout(self):
+        """Test that a joiner with time left is not failed by the leader's deadline"""
+
+        async def one_second_poll(request):
+            read_timeout = request.extensions["timeout"]["read"]
+            if read_timeout < 1:
+                await asyncio.sleep(read_timeout)
+                raise httpx.ReadTimeout("read timeout", request=request)
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={"status": "running"})
+
+        breaker = CircuitBreaker(min_calls=1, window=1)
+        client = make_client(one_second_poll, coalesce=True, circuit_breaker=breaker)
+        leader = asyncio.ensure_future(client._poll("t", Deadline(0.3)))
+        await asyncio.sleep(0.01)
+        assert (await client._poll("t", Deadline(30)))[0] == {"status": "running"}
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        # Running out of the leader's time is not the endpoint's fault.
+        assert all(stats["failures"] == 0 for stats in breaker.stats().values())
+
+    @pytest.mark.asyncio
+    async def test_invalid_poll_json_is_a_poll_error(self):
+        """Test that a malformed poll body surfaces as PollError like the sync client"""
+        client = make_client(lambda request: httpx.Response(200, content=b"<html>"))
+        with pytest.raises(PollError):
+            await client.wait_for_chat("bad-json")
+
+    @pytest.mark.asyncio
+    async def test_run_chat_uses_result_cache(self):
+        """Test that the async client answers repeats from the result cache"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if request.method == "POST":
+                return httpx.Response(200, json={"task_id": "t"})
+            return httpx.Response(
+                200, json={"status": "completed", "result": {"text": "plan"}}
+            )
+
+        client = make_client(handler, result_cache=ResultCache())
+        assert await client.run_chat("q", "u1") == {"text": "plan"}
+        assert await client.run_chat("q", "u1") == {"text": "plan"}
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_start_chat_compression_fallback(self):
+        """Test that the async client compresses and falls back on 415"""
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            if request.headers.get("Content-Encoding") == "gzip":
+                gzip.decompress(request.content)
+                return httpx.Response(415)
+            return httpx.Response(200, json={"task_id": "t"})
+
+        compression = RequestCompression(min_size=0)
+        client = make_client(handler, compression=compression)
+        assert await client.start_chat("query " * 100, "user") == "t"
+        assert [r.headers.get("Content-Encoding") for r in requests_seen] == [
+            "gzip",
+            None,
+        ]
+        assert compression.enabled is False
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_waits_on_the_event_loop(self):
+        """Test that requests over the budget wait with asyncio.sleep"""
+
+        def handler(request):
+            return httpx.Response(200, json={"task_id": "t"})
+
+        limiter = RateLimiter({"/chat": (1, 1)})
+        client = make_client(handler, rate_limiter=limiter)
+        with patch("asyncio.sleep") as sleep:
+            await client.start_chat("q", "u")
+            sleep.assert_not_called()
+            await client.start_chat("q", "u")
+        sleep.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        """Test that the async client refuses calls while the circuit is open"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        breaker = CircuitBreaker(min_calls=2, window=2)
+        client = make_client(handler, retry_policy=None, circuit_breaker=breaker)
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.start_chat("q", "u")
+
+        with pytest.raises(CircuitOpenError):
+            await client.start_chat("q", "u")
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_timeouts_reach_httpx(self):
+        """Test that connect and read timeouts are passed to each request"""
+        seen = []
+
+        def handler(request):
+            seen.append(request.extensions["timeout"])
+            return httpx.Response(200, json={"status": "running"})
+
+        client = make_client(handler, timeouts=Timeouts(connect=1.0, poll=2.0))
+        await client.poll_chat("t1")
+        await client.poll_chat("t1", timeout=7.0)
+        assert seen[0]["connect"] == 1.0
+        assert seen[0]["read"] == 2.0
+        assert seen[1]["connect"] == seen[1]["read"] == 7.0
+
+    @pytest.mark.asyncio
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    async def test_wait_for_chat_stops_at_the_deadline(self, mock_sleep):
+        """Test that the async client gives up as soon as the deadline allows no poll"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"status": "running"})
+
+        client = make_client(handler)
+        with pytest.raises(ChatTimeout, match="Deadline exceeded"):
+            await client.wait_for_chat(
+                "slow", poll_strategy=FixedPollStrategy(1.0, 30), deadline=0.5
+            )
+        mock_sleep.assert_not_awaited()
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("coalesce", [False, True])
+    async def test_cancelling_wait_for_chat_cancels_the_poll(self, coalesce):
+        """Test that a cancelled wait does not leave its poll running"""
+        started = asyncio.Event()
+        cancelled = []
+
+        async def handler(request):
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(request)
+                raise
+            return httpx.Response(200, json={"status": "running"})
+
+        client = make_client(handler, coalesce=coalesce)
+        wait = asyncio.ensure_future(client.wait_for_chat("t1"))
+        await started.wait()
+        wait.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await wait
+        await asyncio.sleep(0)
+
+        assert len(cancelled) == 1
+        if coalesce:
+            assert len(client._singleflight) == 0
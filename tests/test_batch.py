@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tabichan.batch import (
+    REORDER_BUFFER_FACTOR,
+    BatchResult,
+    abounded_map,
+    bounded_map,
+)
+
+
+def square_or_fail(value):
+    if value == 3:
+        raise ValueError("three")
+    time.sleep(0.01 * (5 - value))
+    return value * value
+
+
+class TestBoundedMap:
+    def test_ordered_results_with_per_item_errors(self):
+        """Test that results keep input order and failures stay per item"""
+        results = list(bounded_map(square_or_fail, range(5), concurrency=3))
+
+        assert [r.index for r in results] == [0, 1, 2, 3, 4]
+        assert [r.value for r in results if r.ok] == [0, 1, 4, 16]
+        assert isinstance(results[3].error, ValueError)
+        assert not results[3].ok
+
+    def test_unordered_yields_every_item(self):
+        """Test that unordered mode yields each item exactly once"""
+        results = list(
+            bounded_map(square_or_fail, range(5), concurrency=5, ordered=False)
+        )
+        assert sorted(r.index for r in results) == [0, 1, 2, 3, 4]
+
+    def test_concurrency_bound_and_lazy_input(self):
+        """Test that no more than concurrency items run and input is read lazily"""
+        pulled = []
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def source():
+            for i in range(200):
+                pulled.append(i)
+                yield i
+
+        def work(value):
+            with lock:
+                running.append(value)
+                peak.append(len(running))
+            time.sleep(0.005)
+            with lock:
+                running.remove(value)
+            return value
+
+        results = bounded_map(work, source(), concurrency=4)
+        first = next(results)
+        assert first == BatchResult(0, 0, 0, None)
+        # At most the reorder buffer is read ahead of the first result.
+        assert len(pulled) <= 4 * REORDER_BUFFER_FACTOR + 1
+
+        list(results)
+        assert max(peak) <= 4
+
+    def test_slow_item_does_not_idle_the_other_workers(self):
+        """Test that ordered mode keeps refilling while the head item is slow"""
+
+        def work(value):
+            time.sleep(0.5 if value == 0 else 0.02)
+            return value
+
+        started_at = time.monotonic()
+        results = list(bounded_map(work, range(200), concurrency=8))
+        elapsed = time.monotonic() - started_at
+
+        assert [r.value for r in results] == list(range(200))
+        # 7 workers get through the fast items in ~0.57s. Waiting for the slow
+        # item before refilling would take ~0.98s.
+        assert elapsed < 0.85
+
+    def test_invalid_concurrency(self):
+        """Test that concurrency must be positive"""
+        with pytest.raises(ValueError):
+            list(bounded_map(square_or_fail, [1], concurrency=0))
+
+
+class TestAsyncBoundedMap:
+    @pytest.mark.asyncio
+    async def test_ordered_results_with_per_item_errors(self):
+        """Test async ordering and per-item errors"""
+
+        async def work(value):
+            await asyncio.sleep(0.001 * (5 - value))
+            return square_or_fail(value)
+
+        results = [r async for r in abounded_map(work, range(5), concurrency=2)]
+
+        assert [r.index for r in results] == [0, 1, 2, 3, 4]
+        assert isinstance(results[3].error, ValueError)
+        assert results[4].value == 16
+
+    @pytest.mark.asyncio
+    async def test_slow_item_does_not_idle_the_other_tasks(self):
+        """Test that async ordered mode keeps refilling behind a slow head item"""
+
+        async def work(value):
+            await asyncio.sleep(0.5 if value == 0 else 0.02)
+            return value
+
+        started_at = time.monotonic()
+        results = [r async for r in abounded_map(work, range(200), concurrency=8)]
+        elapsed = time.monotonic() - started_at
+
+        assert [r.value for r in results] == list(range(200))
+        assert elapsed < 0.85
+
+    @pytest.mark.asyncio
+    async def test_async_iterable_input_unordered(self):
+        """Test that async iterables are accepted and consumed lazily"""
+
+        async def source():
+            for i in range(6):
+                yield i
+
+        async def work(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = [
+            r async for r in abounded_map(work, source(), concurrency=3, ordered=False)
+        ]
+        assert sorted(r.value for r in results) == list(range(6))
@@ -0,0 +1,225 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.cache import DiskImageCache, ImageCache, lookup_image, store_image
+
+
+class TestImageCache:
+    def test_hit_and_miss(self):
+        """Test that stored images are returned and counted"""
+        cache = ImageCache()
+        assert cache.get(("img", "japan")) is None
+        cache.set(("img", "japan"), "aGVsbG8=")
+        assert cache.get(("img", "japan")) == "aGVsbG8="
+        assert cache.get(("img", "france")) is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["entries"] == 1
+        assert stats["bytes"] == 8
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Test that the byte budget evicts the least recently used entries"""
+        cache = ImageCache(max_bytes=10)
+        cache.set("a", "aaaa")
+        cache.set("b", "bbbb")
+        cache.get("a")
+        cache.set("c", "cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaaa"
+        assert cache.get("c") == "cccc"
+        assert cache.size == 8
+        assert cache.stats()["evictions"] == 1
+
+    def test_replacing_an_entry_updates_size(self):
+        """Test that overwriting a key does not leak its old size"""
+        cache = ImageCache(max_bytes=10)
+        cache.set("a", "aaaaaaaa")
+        cache.set("a", "aa")
+        assert cache.size == 2
+        assert len(cache) == 1
+
+    def test_oversized_value_is_not_cached(self):
+        """Test that a value larger than the whole cache is skipped"""
+        cache = ImageCache(max_bytes=4)
+        cache.set("small", "ab")
+        cache.set("big", "abcdef")
+        assert cache.get("big") is None
+        assert cache.get("small") == "ab"
+
+    def test_entries_expire(self):
+        """Test that entries older than the TTL are dropped"""
+        cache = ImageCache(ttl=60)
+        with patch("time.monotonic", return_value=1000.0):
+            cache.set("a", "aaaa")
+        with patch("time.monotonic", return_value=1059.0):
+            assert cache.get("a") == "aaaa"
+        with patch("time.monotonic", return_value=1060.0):
+            assert cache.get("a") is None
+        assert cache.size == 0
+        assert cache.stats()["expirations"] == 1
+
+    def test_delete_and_clear(self):
+        """Test that entries can be removed individually or all at once"""
+        cache = ImageCache()
+        cache.set("a", "aaaa")
+        cache.set("b", "bbbb")
+        cache.delete("a")
+        assert cache.get("a") is None
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.size == 0
+
+    def test_invalid_size(self):
+        """Test that a non-positive budget is rejected"""
+        with pytest.raises(ValueError):
+            ImageCache(max_bytes=0)
+
+
+class TestDiskImageCache:
+    def test_round_trip_returns_memoryview(self, tmp_path):
+        """Test that stored bytes come back as a memory-mapped buffer"""
+        cache = DiskImageCache(tmp_path)
+        cache.set(("img", "japan"), b"\x89PNG data")
+
+        data = cache.get(("img", "japan"))
+        assert isinstance(data, memoryview)
+        assert bytes(data) == b"\x89PNG data"
+        assert cache.get(("img", "france")) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_empty_image(self, tmp_path):
+        """Test that an empty payload can be cached even though it cannot be mapped"""
+        cache = DiskImageCache(tmp_path)
+        cache.set("empty", b"")
+        assert bytes(cache.get("empty")) == b""
+
+    def test_identical_images_share_a_blob(self, tmp_path):
+        """Test that content addressing stores duplicate images once"""
+        cache = DiskImageCache(tmp_path)
+        cache.set(("a", "japan"), b"same image")
+        cache.set(("b", "japan"), b"same image")
+
+        assert len(list((tmp_path / "blobs").glob("*/*"))) == 1
+        assert cache.size == len(b"same image")
+        assert bytes(cache.get(("b", "japan"))) == b"same image"
+
+    def test_warm_start(self, tmp_path):
+        """Test that a new instance reuses images written by an earlier one"""
+        DiskImageCache(tmp_path).set("img", b"persisted")
+
+        cache = DiskImageCache(tmp_path)
+        assert cache.size == len(b"persisted")
+        assert bytes(cache.get("img")) == b"persisted"
+
+    def test_evicts_least_recently_read(self, tmp_path):
+        """Test that the size limit deletes the blobs read longest ago"""
+        cache = DiskImageCache(tmp_path, max_bytes=25)
+        cache.set("old", b"o" * 10)
+        cache.set("new", b"n" * 10)
+        blobs = sorted((tmp_path / "blobs").glob("*/*"))
+        for blob in blobs:
+            os.utime(blob, (1000, 1000))
+        cache.get("old")
+
+        cache.set("third", b"t" * 10)
+        assert cache.get("new") is None
+        assert bytes(cache.get("old")) == b"o" * 10
+        assert bytes(cache.get("third")) == b"t" * 10
+        assert cache.stats()["evictions"] == 1
+        assert cache.size == 20
+
+    def test_set_rewrites_a_blob_evicted_concurrently(self, tmp_path):
+        """Test that set survives another process deleting the blob it reuses"""
+        cache = DiskImageCache(tmp_path)
+        cache.set("a", b"shared")
+        blob = next((tmp_path / "blobs").glob("*/*"))
+        utime = os.utime
+
+        def evicted_first(path, *args, **kwargs):
+            if path == blob and blob.exists():
+                blob.unlink()
+            return utime(path, *args, **kwargs)
+
+        with patch("os.utime", side_effect=evicted_first):
+            cache.set("b", b"shared")
+        assert bytes(cache.get("b")) == b"shared"
+
+    def test_eviction_prunes_dangling_refs(self, tmp_path):
+        """Test that refs to evicted blobs do not pile up"""
+        cache = DiskImageCache(tmp_path, max_bytes=15)
+        cache.set("old", b"o" * 10)
+        for blob in (tmp_path / "blobs").glob("*/*"):
+            os.utime(blob, (1000, 1000))
+        cache.set("new", b"n" * 10)
+        assert len(list((tmp_path / "refs").iterdir())) == 1
+        assert bytes(cache.get("new")) == b"n" * 10
+
+    def test_warm_start_prunes_leftovers(self, tmp_path):
+        """Test that start-up removes dangling refs and stale temporary files"""
+        DiskImageCache(tmp_path).set("img", b"data")
+        for blob in (tmp_path / "blobs").glob("*/*"):
+            blob.unlink()
+        stale = tmp_path / "tmp" / "stale"
+        stale.write_bytes(b"partial")
+        os.utime(stale, (1000, 1000))
+        fresh = tmp_path / "tmp" / "fresh"
+        fresh.write_bytes(b"in progress")
+
+        DiskImageCache(tmp_path)
+        assert not any((tmp_path / "refs").iterdir())
+        assert not stale.exists()
+        assert fresh.exists()
+
+    def test_entries_expire(self, tmp_path):
+        """Test that keys older than the TTL are treated as missing"""
+        cache = DiskImageCache(tmp_path, ttl=60)
+        cache.set("img", b"data")
+        with patch("time.time", return_value=os.path.getmtime(tmp_path) + 3600):
+            assert cache.get("img") is None
+        assert not any((tmp_path / "refs").iterdir())
+
+    def test_writes_leave_no_temporary_files(self, tmp_path):
+        """Test that atomic writes clean up after themselves"""
+        cache = DiskImageCache(tmp_path)
+        cache.set("img", b"data")
+        cache.set("img", b"other data")
+        assert bytes(cache.get("img")) == b"other data"
+        assert not any((tmp_path / "tmp").iterdir())
+
+    def test_corrupt_ref_is_a_miss(self, tmp_path):
+        """Test that a damaged ref file is dropped instead of raising"""
+        cache = DiskImageCache(tmp_path)
+        cache.set("img", b"data")
+        ref = next((tmp_path / "refs").iterdir())
+        ref.write_text("garbage")
+        assert cache.get("img") is None
+        assert not ref.exists()
+
+    def test_clear(self, tmp_path):
+        """Test that clear removes every image"""
+        cache = DiskImageCache(tmp_path)
+        cache.set("img", b"data")
+        cache.clear()
+        assert cache.get("img") is None
+        assert cache.size == 0
+
+
+class TestImageTiers:
+    def test_disk_hit_fills_memory(self, tmp_path):
+        """Test that images found on disk are promoted to the memory cache"""
+        memory = ImageCache()
+        disk = DiskImageCache(tmp_path)
+        store_image(None, disk, "img", b"hello")
+
+        assert bytes(lookup_image(memory, disk, "img")) == b"hello"
+        assert memory.get("img") == b"hello"
+
+    def test_miss_in_both_tiers(self, tmp_path):
+        """Test that a miss everywhere returns None"""
+        assert lookup_image(ImageCache(), DiskImageCache(tmp_path), "img") is None
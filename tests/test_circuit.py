@@ -0,0 +1,146 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tabichan.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+BASE_URL = "https://tourism-api.podtech-ai.com/v1"
+
+
+def tripped(breaker, path="/chat"):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow(BASE_URL, path)
+        breaker.record_failure(BASE_URL, path)
+
+
+class TestCircuitBreaker:
+    def test_opens_when_failure_rate_is_reached(self):
+        """Test that the circuit opens once enough calls have failed"""
+        breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4)
+        for _ in range(2):
+            breaker.record_success(BASE_URL, "/chat", 0.1)
+        breaker.record_failure(BASE_URL, "/chat")
+        assert breaker.state(BASE_URL, "/chat") == CLOSED
+        breaker.record_failure(BASE_URL, "/chat")
+        assert breaker.state(BASE_URL, "/chat") == OPEN
+        assert not breaker.allow(BASE_URL, "/chat")
+
+    def test_waits_for_min_calls(self):
+        """Test that a few early failures do not open the circuit"""
+        breaker = CircuitBreaker(min_calls=5)
+        for _ in range(4):
+            breaker.record_failure(BASE_URL, "/chat")
+        assert breaker.allow(BASE_URL, "/chat")
+
+    def test_opens_on_slow_calls(self):
+        """Test that successful but slow calls can open the circuit"""
+        breaker = CircuitBreaker(
+            slow_call_duration=2.0, slow_call_rate=0.5, window=4, min_calls=4
+        )
+        for duration in (0.1, 0.1, 2.5, 3.0):
+            breaker.record_success(BASE_URL, "/chat/poll", duration)
+        assert breaker.state(BASE_URL, "/chat/poll") == OPEN
+
+    def test_circuits_are_per_endpoint_and_base_url(self):
+        """Test that one unhealthy endpoint does not block the others"""
+        breaker = CircuitBreaker(min_calls=2, window=2)
+        tripped(breaker, "/chat")
+        assert not breaker.allow(BASE_URL, "/chat")
+        assert breaker.allow(BASE_URL, "/chat/poll?task_id=t1")
+        assert breaker.allow("https://tabichan.podtech-ai.com/v1", "/chat")
+
+    def test_query_string_is_ignored(self):
+        """Test that polls for different tasks share the poll circuit"""
+        breaker = CircuitBreaker(min_calls=2, window=2)
+        breaker.record_failure(BASE_URL, "/chat/poll?task_id=a")
+        breaker.record_failure(BASE_URL, "/chat/poll?task_id=b")
+        assert breaker.state(BASE_URL, "/chat/poll") == OPEN
+
+    def test_half_open_probe_closes_the_circuit(self):
+        """Test that a successful probe after open_duration closes the circuit"""
+        breaker = CircuitBreaker(min_calls=2, window=2, open_duration=30)
+        with patch("time.monotonic", return_value=100.0):
+            tripped(breaker)
+            assert breaker.retry_after(BASE_URL, "/chat") == 30.0
+        with patch("time.monotonic", return_value=131.0):
+            assert breaker.state(BASE_URL, "/chat") == HALF_OPEN
+            assert breaker.allow(BASE_URL, "/chat")
+            # Only one probe at a time while half-open.
+            assert not breaker.allow(BASE_URL, "/chat")
+            breaker.record_success(BASE_URL, "/chat", 0.1)
+            assert breaker.state(BASE_URL, "/chat") == CLOSED
+            assert breaker.allow(BASE_URL, "/chat")
+
+    def test_failed_probe_reopens_the_circuit(self):
+        """Test that a failing probe opens the circuit for another period"""
+        breaker = CircuitBreaker(min_calls=2, window=2, open_duration=30)
+        with patch("time.monotonic", return_value=100.0):
+            tripped(breaker)
+        with patch("time.monotonic", return_value=131.0):
+            assert breaker.allow(BASE_URL, "/chat")
+            breaker.record_failure(BASE_URL, "/chat")
+            assert breaker.state(BASE_URL, "/chat") == OPEN
+        with patch("time.monotonic", return_value=150.0):
+            assert not breaker.allow(BASE_URL, "/chat")
+
+    def test_lost_probe_does_not_hold_the_circuit(self):
+        """Test that a probe that never reports back is replaced"""
+        breaker = CircuitBreaker(min_calls=2, window=2, open_duration=30)
+        with patch("time.monotonic", return_value=100.0):
+            tripped(breaker)
+        with patch("time.monotonic", return_value=131.0):
+            assert breaker.allow(BASE_URL, "/chat")
+        with patch("time.monotonic", return_value=162.0):
+            assert breaker.allow(BASE_URL, "/chat")
+
+    def test_state_changes_are_reported(self):
+        """Test that listeners see every transition"""
+        listener = Mock()
+        breaker = CircuitBreaker(
+            min_calls=2, window=2, open_duration=30, on_state_change=listener
+        )
+        other = Mock()
+        breaker.add_listener(other)
+        with patch("time.monotonic", return_value=100.0):
+            tripped(breaker)
+        with patch("time.monotonic", return_value=131.0):
+            breaker.allow(BASE_URL, "/chat")
+            breaker.record_success(BASE_URL, "/chat", 0.1)
+
+        assert [c.args for c in listener.call_args_list] == [
+            (BASE_URL, "/chat", CLOSED, OPEN),
+            (BASE_URL, "/chat", OPEN, HALF_OPEN),
+            (BASE_URL, "/chat", HALF_OPEN, CLOSED),
+        ]
+        assert other.call_count == 3
+
+    def test_failing_listener_does_not_break_calls(self):
+        """Test that an exception in a listener is reported and swallowed"""
+        breaker = CircuitBreaker(
+            min_calls=1, window=1, on_state_change=Mock(side_effect=RuntimeError)
+        )
+        breaker.record_failure(BASE_URL, "/chat")
+        assert breaker.state(BASE_URL, "/chat") == OPEN
+
+    def test_stats(self):
+        """Test that stats report state and recent outcomes per circuit"""
+        breaker = CircuitBreaker(slow_call_duration=1.0)
+        breaker.record_success(BASE_URL, "/image?id=a", 2.0)
+        breaker.record_failure(BASE_URL, "/image?id=b")
+        assert breaker.stats() == {
+            (BASE_URL, "/image"): {
+                "state": CLOSED,
+                "calls": 2,
+                "failures": 1,
+                "slow_calls": 1,
+            }
+        }
+
+    def test_invalid_settings(self):
+        """Test that out-of-range settings are rejected"""
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_rate=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker(min_calls=30, window=20)
+        with pytest.raises(ValueError):
+            CircuitBreaker(half_open_calls=0)
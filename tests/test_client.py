@@ -1,9 +1,37 @@
+import base64
+import gzip
+import io
+import json
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import pytest
 import requests
 import responses
 from unittest.mock import patch
-from tabichan.client import TabichanClient
+from tabichan.cache import DiskImageCache, ImageCache
+from tabichan.circuit import OPEN, CircuitBreaker
+from tabichan.client import TabichanClient, is_connect_error
+from tabichan.codec import JSONCodec
+from tabichan.compression import RequestCompression
+from tabichan.deadline import Deadline, Timeouts
+from tabichan.ratelimit import RateLimiter
+from tabichan.exceptions import (
+    ChatCancelled,
+    ChatFailed,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ChatTimeout,
+    PollError,
+    TransientPollError,
+    UnexpectedChatStatus,
+)
+from tabichan.hedging import HedgePolicy
+from tabichan.models import ChatResult
+from tabichan.polling import BackoffPollStrategy, FixedPollStrategy
+from tabichan.result_cache import ResultCache
+from tabichan.retry import RetryBudget, RetryPolicy
 
 
 class TestTabichanClient:
@@ -158,7 +186,7 @@ class TestTabichanClient:
         api_key = os.getenv("TABICHAN_API_KEY")
         client = TabichanClient(api_key)
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(ChatFailed, match="Test error message"):
             client.wait_for_chat("failed-task")
 
     @responses.activate
@@ -175,7 +203,7 @@ class TestTabichanClient:
         api_key = os.getenv("TABICHAN_API_KEY")
         client = TabichanClient(api_key)
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(ChatFailed, match="Unknown error"):
             client.wait_for_chat("failed-task-no-error")
 
     @responses.activate
@@ -192,12 +220,16 @@ class TestTabichanClient:
         api_key = os.getenv("TABICHAN_API_KEY")
         client = TabichanClient(api_key)
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(UnexpectedChatStatus) as exc_info:
             client.wait_for_chat("unexpected-task")
 
+        assert exc_info.value.status == "unknown_status"
+        assert exc_info.value.task_id == "unexpected-task"
+
     @responses.activate
     @patch.dict(os.environ, {"TABICHAN_API_KEY": "env-key"})
-    def test_wait_for_chat_request_exception(self):
+    @patch("time.sleep")
+    def test_wait_for_chat_request_exception(self, mock_sleep):
         """Test wait_for_chat method with request exception"""
         responses.add(
             responses.GET,
@@ -206,11 +238,15 @@ class TestTabichanClient:
         )
 
         api_key = os.getenv("TABICHAN_API_KEY")
-        client = TabichanClient(api_key)
+        client = TabichanClient(api_key, retry_policy=None)
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(TransientPollError) as exc_info:
             client.wait_for_chat("exception-task")
 
+        # The first poll plus max_poll_retries retries
+        assert len(responses.calls) == 4
+        assert isinstance(exc_info.value.__cause__, requests.exceptions.ConnectionError)
+
     @responses.activate
     @patch.dict(os.environ, {"TABICHAN_API_KEY": "env-key"})
     @patch("time.sleep")
@@ -226,8 +262,10 @@ class TestTabichanClient:
         api_key = os.getenv("TABICHAN_API_KEY")
         client = TabichanClient(api_key)
 
-        with pytest.raises(SystemExit):
-            client.wait_for_chat("timeout-task")
+        with pytest.raises(ChatTimeout):
+            client.wait_for_chat(
+                "timeout-task", poll_strategy=FixedPollStrategy(10, 30)
+            )
 
         # Should have made 30 attempts (max_attempts)
         assert len(responses.calls) == 30
@@ -313,3 +351,1041 @@ class TestTabichanClient:
         assert result["answer"] == "Verbose running answer"
         assert len(responses.calls) == 2
         assert mock_sleep.call_count == 1
+
+    def test_client_uses_pooled_session(self):
+        """Test that the client owns a pooled requests.Session"""
+        client = TabichanClient("test-key", pool_connections=4, pool_maxsize=32)
+
+        assert isinstance(client.session, requests.Session)
+        adapter = client.session.get_adapter("https://tourism-api.podtech-ai.com")
+        assert adapter._pool_connections == 4
+        assert adapter._pool_maxsize == 32
+        assert "Connection" not in client.default_header
+
+    @responses.activate
+    def test_calls_share_session(self):
+        """Test that all calls go through the same session"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "pooled-task"},
+            status=200,
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=pooled-task",
+            json={"status": "running"},
+            status=200,
+        )
+
+        client = TabichanClient("test-key")
+        with patch.object(
+            client.session, "request", wraps=client.session.request
+        ) as mock_request:
+            client.start_chat("Test query", "user123")
+            client.poll_chat("pooled-task")
+
+        assert mock_request.call_count == 2
+        assert len(responses.calls) == 2
+
+    def test_keep_alive_disabled(self):
+        """Test that disabling keep-alive asks the server to close connections"""
+        client = TabichanClient("test-key", keep_alive=False)
+        assert client.default_header["Connection"] == "close"
+
+    def test_context_manager_closes_session(self):
+        """Test that leaving the context manager closes the owned session"""
+        client = TabichanClient("test-key")
+        with patch.object(client.session, "close") as mock_close:
+            with client as entered:
+                assert entered is client
+        mock_close.assert_called_once()
+
+    def test_close_keeps_external_session_open(self):
+        """Test that close() leaves a caller-provided session alone"""
+        session = requests.Session()
+        client = TabichanClient("test-key", session=session)
+        assert client.session is session
+
+        with patch.object(session, "close") as mock_close:
+            client.close()
+        mock_close.assert_not_called()
+
+    @responses.activate
+    def test_wait_for_chat_default_backoff_deadline(self):
+        """Test that the default schedule polls fast first and stops at the deadline"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=backoff-task",
+            json={"status": "running"},
+            status=200,
+        )
+        clock = [0.0]
+        delays = []
+
+        def fake_sleep(delay):
+            delays.append(delay)
+            clock[0] += delay
+
+        client = TabichanClient(
+            "test-key", poll_strategy=BackoffPollStrategy(jitter=0, deadline=60)
+        )
+        monotonic = patch("time.monotonic", side_effect=lambda: clock[0])
+        sleep = patch("time.sleep", side_effect=fake_sleep)
+        with monotonic, sleep:
+            with pytest.raises(ChatTimeout):
+                client.wait_for_chat("backoff-task")
+
+        assert delays[:3] == [1.0, 1.5, 2.25]
+        assert max(delays) == 10.0
+        assert clock[0] == pytest.approx(60.0)
+        assert len(responses.calls) == len(delays) + 1
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_wait_for_chat_uses_retry_after_hint(self, mock_sleep):
+        """Test that a Retry-After header on the poll response sets the next delay"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=hint-task",
+            json={"status": "running"},
+            headers={"Retry-After": "4"},
+            status=200,
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=hint-task",
+            json={"status": "completed", "result": {"answer": "Hinted"}},
+            status=200,
+        )
+
+        client = TabichanClient("test-key")
+        result = client.wait_for_chat("hint-task")
+
+        assert result["answer"] == "Hinted"
+        mock_sleep.assert_called_once_with(4.0)
+
+    @responses.activate
+    def test_start_chats_reports_failures_per_item(self):
+        """Test that start_chats returns task_ids in order and isolates failures"""
+
+        def chat_callback(request):
+            query = json.loads(request.body)["user_query"]
+            if query == "bad":
+                return (503, {}, "")
+            return (200, {}, json.dumps({"task_id": f"task-{query}"}))
+
+        responses.add_callback(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            callback=chat_callback,
+        )
+
+        client = TabichanClient("test-key", retry_policy=None)
+        chat_requests = (
+            {"user_query": query, "user_id": "user123"} for query in ["a", "bad", "c"]
+        )
+        results = list(client.start_chats(chat_requests, concurrency=2))
+
+        assert [r.value for r in results] == ["task-a", None, "task-c"]
+        assert isinstance(results[1].error, requests.exceptions.HTTPError)
+        assert results[1].request == {"user_query": "bad", "user_id": "user123"}
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_wait_for_chat_retries_transient_poll_errors(self, mock_sleep):
+        """Test that transient poll errors are retried in-process"""
+        url = "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=flaky-task"
+        responses.add(responses.GET, url, status=503)
+        responses.add(
+            responses.GET, url, body=requests.exceptions.ConnectionError("reset")
+        )
+        responses.add(
+            responses.GET,
+            url,
+            json={"status": "completed", "result": {"answer": "Recovered"}},
+        )
+
+        client = TabichanClient("test-key", retry_policy=None)
+        result = client.wait_for_chat("flaky-task")
+
+        assert result["answer"] == "Recovered"
+        assert len(responses.calls) == 3
+        assert mock_sleep.call_count == 2
+
+    @responses.activate
+    def test_wait_for_chat_does_not_retry_client_errors(self):
+        """Test that a non-transient HTTP error fails without retrying"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=missing-task",
+            status=404,
+        )
+
+        client = TabichanClient("test-key")
+        with pytest.raises(PollError) as exc_info:
+            client.wait_for_chat("missing-task")
+
+        assert not isinstance(exc_info.value, TransientPollError)
+        assert exc_info.value.task_id == "missing-task"
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_get_is_retried_on_transient_status(self, mock_sleep):
+        """Test that idempotent calls are retried on 503 and connection errors"""
+        url = "https://tourism-api.podtech-ai.com/v1/image?id=retry-id&country=japan"
+        responses.add(responses.GET, url, status=503)
+        responses.add(
+            responses.GET, url, body=requests.exceptions.ConnectionError("reset")
+        )
+        responses.add(responses.GET, url, json={"base64": "retried"})
+
+        client = TabichanClient("test-key", retry_policy=RetryPolicy(max_attempts=3))
+        assert client.get_image("retry-id") == "retried"
+        assert len(responses.calls) == 3
+        assert mock_sleep.call_count == 2
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_post_is_not_retried_after_it_may_have_been_processed(self, mock_sleep):
+        """Test that start_chat is not resent on a 500 or a mid-request reset"""
+        url = "https://tourism-api.podtech-ai.com/v1/chat"
+        responses.add(responses.POST, url, status=500)
+        responses.add(
+            responses.POST, url, body=requests.exceptions.ConnectionError("reset")
+        )
+
+        client = TabichanClient("test-key")
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.start_chat("Test query", "user123")
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.start_chat("Test query", "user123")
+
+        assert len(responses.calls) == 2
+        mock_sleep.assert_not_called()
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_post_is_retried_when_rejected_with_retry_after(self, mock_sleep):
+        """Test that a 429 on start_chat is retried after Retry-After"""
+        url = "https://tourism-api.podtech-ai.com/v1/chat"
+        responses.add(responses.POST, url, status=429, headers={"Retry-After": "2"})
+        responses.add(responses.POST, url, json={"task_id": "after-429"})
+
+        client = TabichanClient("test-key")
+        assert client.start_chat("Test query", "user123") == "after-429"
+        mock_sleep.assert_called_once_with(2.0)
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_retry_budget_limits_amplification(self, mock_sleep):
+        """Test that a drained retry budget stops retrying"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=down",
+            status=503,
+        )
+
+        policy = RetryPolicy(max_attempts=5, budget=RetryBudget(ratio=0, reserve=2))
+        client = TabichanClient("test-key", retry_policy=policy)
+        for _ in range(3):
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.poll_chat("down")
+
+        # 3 calls plus the 2 retries the budget allowed
+        assert len(responses.calls) == 5
+
+    def test_is_connect_error(self):
+        """Test that only failures before sending count as connect errors"""
+        from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+        refused = MaxRetryError(
+            None, "/chat", NewConnectionError(None, "Connection refused")
+        )
+        assert is_connect_error(requests.exceptions.ConnectionError(refused))
+        assert is_connect_error(requests.exceptions.ConnectTimeout())
+        assert not is_connect_error(requests.exceptions.ConnectionError("reset"))
+        assert not is_connect_error(requests.exceptions.ReadTimeout())
+
+    @responses.activate
+    @patch("time.sleep")
+    def test_failover_to_alternative_base_url(self, mock_sleep):
+        """Test that a failing primary endpoint fails over immediately"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=fo-task",
+            body=requests.exceptions.ConnectionError("down"),
+        )
+        responses.add(
+            responses.GET,
+            "https://tabichan.podtech-ai.com/v1/chat/poll?task_id=fo-task",
+            json={"status": "running"},
+        )
+
+        client = TabichanClient("test-key", failover=True)
+        assert client.poll_chat("fo-task") == {"status": "running"}
+
+        mock_sleep.assert_not_called()
+        stats = client.endpoint_router.stats()
+        assert stats["https://tourism-api.podtech-ai.com/v1"]["failures"] == 1
+        assert stats["https://tabichan.podtech-ai.com/v1"]["latency"] is not None
+
+    def test_failover_is_opt_in(self):
+        """Test that the client only routes across endpoints when asked to"""
+        assert TabichanClient("test-key").endpoint_router is None
+
+    @responses.activate
+    def test_hedged_poll_uses_faster_alternative(self):
+        """Test that a slow poll is hedged to the alternative endpoint"""
+
+        def slow_primary(request):
+            time.sleep(0.5)
+            return (200, {}, json.dumps({"status": "running", "from": "primary"}))
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=hedge-task",
+            callback=slow_primary,
+        )
+        responses.add(
+            responses.GET,
+            "https://tabichan.podtech-ai.com/v1/chat/poll?task_id=hedge-task",
+            json={"status": "running", "from": "alternative"},
+        )
+
+        hedging = HedgePolicy(initial_delay=0.05)
+        with TabichanClient("test-key", hedging=hedging) as client:
+            assert client.poll_chat("hedge-task")["from"] == "alternative"
+            executor = client._hedge_executor
+        # Let the losing request finish so it is not recorded by the next test.
+        executor.shutdown(wait=True)
+        assert hedging.stats() == {"requests": 1, "hedges_sent": 1, "hedges_won": 1}
+
+    @responses.activate
+    def test_fast_response_is_not_hedged(self):
+        """Test that no hedge is sent when the first request answers in time"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=img&country=japan",
+            json={"base64": "primary"},
+        )
+
+        hedging = HedgePolicy(initial_delay=5.0)
+        with TabichanClient("test-key", hedging=hedging) as client:
+            assert client.get_image("img") == "primary"
+        assert hedging.stats()["hedges_sent"] == 0
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_hedge_failure_falls_back_to_primary(self):
+        """Test that a failing hedge does not fail the call"""
+
+        def slow_primary(request):
+            time.sleep(0.2)
+            return (200, {}, json.dumps({"base64": "primary"}))
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=img&country=japan",
+            callback=slow_primary,
+        )
+        responses.add(
+            responses.GET,
+            "https://tabichan.podtech-ai.com/v1/image?id=img&country=japan",
+            status=404,
+        )
+
+        hedging = HedgePolicy(initial_delay=0.01)
+        with TabichanClient("test-key", hedging=hedging) as client:
+            assert client.get_image("img") == "primary"
+            executor = client._hedge_executor
+        executor.shutdown(wait=True)
+        assert hedging.stats()["hedges_won"] == 0
+
+    @responses.activate
+    def test_get_image_uses_cache(self):
+        """Test that repeated images are served from the cache per country"""
+        for country in ("japan", "france"):
+            responses.add(
+                responses.GET,
+                f"https://tourism-api.podtech-ai.com/v1/image?id=img&country={country}",
+                json={"base64": base64.b64encode(country.encode()).decode()},
+            )
+
+        cache = ImageCache()
+        client = TabichanClient("test-key", image_cache=cache)
+        assert client.get_image("img") == "amFwYW4="
+        assert client.get_image("img", format="bytes") == b"japan"
+        assert client.get_image("img", country="france") == "ZnJhbmNl"
+
+        assert len(responses.calls) == 2
+        assert cache.stats()["hits"] == 1
+
+    @responses.activate
+    def test_get_image_survives_restart_with_disk_cache(self, tmp_path):
+        """Test that a new client reads images downloaded by an earlier one"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=img&country=japan",
+            json={"base64": "aGVsbG8="},
+        )
+
+        first = TabichanClient("test-key", disk_cache=DiskImageCache(tmp_path))
+        assert first.get_image("img") == "aGVsbG8="
+
+        second = TabichanClient(
+            "test-key", image_cache=ImageCache(), disk_cache=DiskImageCache(tmp_path)
+        )
+        assert second.get_image("img") == "aGVsbG8="
+        assert second.get_image("img") == "aGVsbG8="
+        assert len(responses.calls) == 1
+        assert second.image_cache.stats()["hits"] == 1
+
+    @responses.activate
+    def test_get_image_formats(self):
+        """Test that images can be returned decoded, without a base64 str"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=img&country=japan",
+            body=b'{"base64": "aGVsbG8gd29y\\/bGQ="}',
+            content_type="application/json",
+        )
+
+        client = TabichanClient("test-key")
+        assert client.get_image("img") == "aGVsbG8gd29y/bGQ="
+        decoded = base64.b64decode("aGVsbG8gd29y/bGQ=")
+        assert client.get_image("img", format="bytes") == decoded
+        view = client.get_image("img", format="memoryview")
+        assert isinstance(view, memoryview)
+        assert bytes(view) == decoded
+
+        with pytest.raises(ValueError):
+            client.get_image("img", format="png")
+
+    @responses.activate
+    def test_save_image(self, tmp_path):
+        """Test that save_image writes decoded bytes to a path or file object"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=img&country=france",
+            json={"base64": "aGVsbG8="},
+        )
+
+        client = TabichanClient("test-key")
+        path = tmp_path / "img.png"
+        assert client.save_image("img", path, country="france") == 5
+        assert path.read_bytes() == b"hello"
+
+        buffer = io.BytesIO()
+        client.save_image("img", buffer, country="france")
+        assert buffer.getvalue() == b"hello"
+
+    @responses.activate
+    def test_save_image_streams_to_callable(self):
+        """Test that save_image decodes the streamed body chunk by chunk"""
+        image = bytes(range(256)) * 100
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=big&country=japan",
+            json={"base64": base64.b64encode(image).decode()},
+        )
+
+        chunks = []
+        client = TabichanClient("test-key")
+        assert client.save_image("big", chunks.append, chunk_size=1000) == len(image)
+        assert b"".join(chunks) == image
+        assert len(chunks) > 1
+        assert max(len(chunk) for chunk in chunks) <= 1000
+
+    @responses.activate
+    def test_save_image_writes_cached_image(self):
+        """Test that a cached image is written without a download"""
+        client = TabichanClient("test-key", image_cache=ImageCache())
+        client.image_cache.set(("img", "japan"), b"cached")
+        buffer = io.BytesIO()
+        assert client.save_image("img", buffer) == 6
+        assert buffer.getvalue() == b"cached"
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_prefetch_images(self):
+        """Test that every distinct activity image is fetched once"""
+        for id in ("a", "b"):
+            responses.add(
+                responses.GET,
+                f"https://tourism-api.podtech-ai.com/v1/image?id={id}&country=france",
+                json={"base64": base64.b64encode(id.encode()).decode()},
+            )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=missing&country=france",
+            status=404,
+        )
+        result = {
+            "itinerary": {
+                "days": [
+                    {
+                        "activities": [
+                            {"activity": {"id": "a"}},
+                            {"activity": {"id": "b"}},
+                        ]
+                    },
+                    {
+                        "activities": [
+                            {"activity": {"id": "a"}},
+                            {"activity": {"id": "missing"}},
+                        ]
+                    },
+                ]
+            }
+        }
+
+        client = TabichanClient("test-key")
+        images = client.prefetch_images(result, "france", format="bytes")
+        assert images == {"a": b"a", "b": b"b"}
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_coalesce_concurrent_image_requests(self):
+        """Test that concurrent identical get_image calls share one request"""
+
+        release = threading.Event()
+
+        def slow_image(request):
+            release.wait(5)
+            return (200, {}, json.dumps({"base64": "aGVsbG8="}))
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/image?id=popular&country=japan",
+            callback=slow_image,
+        )
+
+        client = TabichanClient("test-key", coalesce=True)
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = [pool.submit(client.get_image, "popular") for _ in range(10)]
+            time.sleep(0.1)
+            release.set()
+            images = [future.result(timeout=5) for future in futures]
+
+        assert images == ["aGVsbG8="] * 10
+        # Callers that arrived while the first request was open shared it.
+        assert len(responses.calls) < 10
+
+    @responses.activate
+    def test_coalesced_poll_keeps_each_callers_deadline(self):
+        """Test that joining another caller's poll does not outlast the deadline"""
+        release = threading.Event()
+
+        def slow_poll(request):
+            release.wait(5)
+            payload = {"status": "completed", "result": {"text": "plan"}}
+            return (200, {}, json.dumps(payload))
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t",
+            callback=slow_poll,
+        )
+        client = TabichanClient("test-key", coalesce=True)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(client.wait_for_chat, "t", deadline=10)
+            while len(client._singleflight) == 0:
+                time.sleep(0.01)
+            started_at = time.monotonic()
+            with pytest.raises(ChatTimeout):
+                client.wait_for_chat("t", deadline=0.2)
+            assert time.monotonic() - started_at < 1
+            release.set()
+            assert leader.result(timeout=5) == {"text": "plan"}
+
+    @responses.activate
+    def test_coalesced_poll_does_not_share_anothers_deadline(self):
+        """Test that a caller with time left polls again after the leader's deadline"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t",
+            json={"status": "running"},
+        )
+        client = TabichanClient("test-key", coalesce=True)
+        release = threading.Event()
+        request_poll = client._request_poll
+
+        def held_poll(task_id, deadline=None, timeout=None):
+            if deadline is not None:
+                release.wait(5)
+            return request_poll(task_id, deadline, timeout)
+
+        with patch.object(client, "_request_poll", side_effect=held_poll):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                leader = pool.submit(client._poll, "t", Deadline(0.05))
+                while len(client._singleflight) == 0:
+                    time.sleep(0.01)
+                follower = pool.submit(client.poll_chat, "t")
+                time.sleep(0.1)
+                release.set()
+                with pytest.raises(DeadlineExceeded):
+                    leader.result(timeout=5)
+                assert follower.result(timeout=5) == {"status": "running"}
+
+    def test_coalescing_is_opt_in(self):
+        """Test that requests are not coalesced unless asked for"""
+        assert TabichanClient("test-key")._singleflight is None
+
+    @responses.activate
+    def test_run_chat_uses_result_cache(self):
+        """Test that an identical request is answered from the result cache"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "cached-task"},
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=cached-task",
+            json={"status": "completed", "result": {"text": "Tokyo plan"}},
+        )
+
+        client = TabichanClient(
+            "test-key", result_cache=ResultCache(include_user_id=False)
+        )
+        first = client.run_chat("Plan a 2-day trip to Tokyo", "alice")
+        second = client.run_chat("Plan a 2-day  trip to Tokyo", "bob")
+
+        assert first == second == {"text": "Tokyo plan"}
+        assert len(responses.calls) == 2
+        assert client.result_cache.stats() == {"hits": 1, "misses": 1}
+
+    @responses.activate
+    def test_custom_codec_encodes_and_decodes(self):
+        """Test that request and response bodies go through the client's codec"""
+
+        class RecordingCodec(JSONCodec):
+            def __init__(self):
+                self.calls = []
+
+            def dumps(self, obj):
+                self.calls.append("dumps")
+                return super().dumps(obj)
+
+            def loads(self, data):
+                self.calls.append(("loads", type(data)))
+                return super().loads(data)
+
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "codec-task"},
+        )
+        codec = RecordingCodec()
+        client = TabichanClient("test-key", codec=codec)
+        assert client.start_chat("query", "user") == "codec-task"
+
+        request = responses.calls[0].request
+        assert request.headers["Content-Type"] == "application/json"
+        assert json.loads(request.body)["user_query"] == "query"
+        assert codec.calls == ["dumps", ("loads", bytes)]
+
+    @responses.activate
+    def test_invalid_poll_json_is_a_poll_error(self):
+        """Test that a malformed poll body still surfaces as PollError"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=bad-json",
+            body=b"<html>oops</html>",
+        )
+        client = TabichanClient("test-key")
+        with pytest.raises(PollError):
+            client.wait_for_chat("bad-json")
+
+    @responses.activate
+    def test_wait_for_chat_typed_result(self):
+        """Test that typed=True wraps the result in a ChatResult"""
+        result = {"itinerary": {"days": [{"activities": [{"activity": {"id": "a1"}}]}]}}
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=typed-task",
+            json={"status": "completed", "result": result},
+        )
+
+        client = TabichanClient("test-key")
+        typed = client.wait_for_chat("typed-task", typed=True)
+        assert isinstance(typed, ChatResult)
+        assert typed.itinerary.activity_ids() == ["a1"]
+        assert typed == result
+
+    @responses.activate
+    def test_start_chat_compresses_large_history(self):
+        """Test that a long history is sent gzipped with Content-Encoding"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "gz-task"},
+        )
+        history = [{"role": "user", "content": "Where should we eat?"}] * 200
+
+        client = TabichanClient("test-key", compression=RequestCompression())
+        assert client.start_chat("query", "user", history=history) == "gz-task"
+
+        request = responses.calls[0].request
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(request.body))["history"] == history
+
+    @responses.activate
+    def test_start_chat_falls_back_when_encoding_is_rejected(self):
+        """Test that a 415 disables compression and resends the body plainly"""
+        responses.add(
+            responses.POST, "https://tourism-api.podtech-ai.com/v1/chat", status=415
+        )
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "plain-task"},
+        )
+        compression = RequestCompression(min_size=0)
+        client = TabichanClient("test-key", compression=compression)
+        assert client.start_chat("query " * 100, "user") == "plain-task"
+
+        assert "Content-Encoding" not in responses.calls[1].request.headers
+        assert json.loads(responses.calls[1].request.body)["user_id"] == "user"
+        assert compression.enabled is False
+
+    def test_accept_encoding_lists_supported_decoders(self):
+        """Test that responses may be compressed with any decoder available"""
+        client = TabichanClient("test-key")
+        assert "gzip" in client.default_header["Accept-Encoding"]
+
+    @responses.activate
+    def test_rate_limiter_gates_each_request_by_endpoint(self):
+        """Test that requests wait on their endpoint's bucket only"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t1",
+            json={"status": "pending"},
+        )
+        limiter = RateLimiter({"/chat/poll": (1, 1)})
+        client = TabichanClient("test-key", rate_limiter=limiter)
+
+        with patch("time.sleep") as sleep:
+            client.poll_chat("t1")
+            sleep.assert_not_called()
+            client.poll_chat("t1")
+        sleep.assert_called_once()
+        assert 0 < sleep.call_args[0][0] <= 1.0
+
+    @responses.activate
+    def test_open_circuit_fails_fast(self):
+        """Test that calls are refused without a request once the circuit opens"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t1",
+            status=503,
+        )
+        breaker = CircuitBreaker(min_calls=2, window=2)
+        client = TabichanClient("test-key", retry_policy=None, circuit_breaker=breaker)
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.poll_chat("t1")
+
+        with pytest.raises(CircuitOpenError) as excinfo:
+            client.poll_chat("t1")
+        assert excinfo.value.endpoint == "/chat/poll"
+        assert excinfo.value.retry_after > 0
+        responses.assert_call_count(
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t1", 2
+        )
+
+    @responses.activate
+    def test_open_circuit_fails_over_to_alternative(self):
+        """Test that the router skips a base URL whose circuit is open"""
+        responses.add(
+            responses.GET,
+            "https://tabichan.podtech-ai.com/v1/chat/poll?task_id=t1",
+            json={"status": "running"},
+        )
+        breaker = CircuitBreaker(min_calls=1, window=1)
+        breaker.record_failure("https://tourism-api.podtech-ai.com/v1", "/chat/poll")
+        client = TabichanClient("test-key", failover=True, circuit_breaker=breaker)
+
+        assert client.poll_chat("t1") == {"status": "running"}
+        responses.assert_call_count(
+            "https://tabichan.podtech-ai.com/v1/chat/poll?task_id=t1", 1
+        )
+        responses.assert_call_count(
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t1", 0
+        )
+        assert breaker.state("https://tabichan.podtech-ai.com/v1", "/chat/poll") != OPEN
+
+    @responses.activate
+    def test_timeouts_are_configurable_per_client_and_call(self):
+        """Test that client timeouts and per-call overrides reach the session"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "t"},
+        )
+        client = TabichanClient("test-key", timeouts=Timeouts(connect=1.0, chat=2.0))
+        client.start_chat("q", "u")
+        client.start_chat("q", "u", timeout=(0.5, 9.0))
+
+        url = "https://tourism-api.podtech-ai.com/v1/chat"
+        timeouts = [
+            call.request.req_kwargs["timeout"]
+            for call in responses.calls
+            if call.request.url == url
+        ]
+        assert timeouts == [(1.0, 2.0), (0.5, 9.0)]
+
+    @responses.activate
+    def test_wait_for_chat_stops_at_the_deadline(self):
+        """Test that no poll is scheduled past the caller's deadline"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=slow",
+            json={"status": "running"},
+        )
+        client = TabichanClient("test-key")
+        started_at = time.monotonic()
+        with pytest.raises(ChatTimeout, match="Deadline exceeded"):
+            client.wait_for_chat(
+                "slow", poll_strategy=FixedPollStrategy(1.0, 30), deadline=0.5
+            )
+
+        assert time.monotonic() - started_at < 0.5
+        url = "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=slow"
+        calls = [call for call in responses.calls if call.request.url == url]
+        assert len(calls) == 1
+        assert max(calls[0].request.req_kwargs["timeout"]) <= 0.5
+
+    @responses.activate
+    def test_timeout_cut_by_deadline_is_not_an_endpoint_failure(self):
+        """Test that running out of the caller's time does not mark endpoints down"""
+
+        def slow_poll(request):
+            read_timeout = request.req_kwargs["timeout"][1]
+            raise requests.exceptions.ReadTimeout(f"read timeout={read_timeout}")
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t",
+            callback=slow_poll,
+        )
+        breaker = CircuitBreaker(min_calls=1, window=1)
+        client = TabichanClient("test-key", failover=True, circuit_breaker=breaker)
+        with pytest.raises(DeadlineExceeded):
+            client._poll("t", Deadline(0.2))
+
+        assert all(stats["failures"] == 0 for stats in breaker.stats().values())
+        assert all(
+            stats["failures"] == 0 for stats in client.endpoint_router.stats().values()
+        )
+
+    @responses.activate
+    def test_coalesced_poll_does_not_share_a_clipped_timeout(self):
+        """Test that a joiner with time left is not failed by the leader's deadline"""
+
+        def one_second_poll(request):
+            read_timeout = request.req_kwargs["timeout"][1]
+            if read_timeout < 1:
+                time.sleep(read_timeout)
+                raise requests.exceptions.ReadTimeout(f"read timeout={read_timeout}")
+            time.sleep(1)
+            return (200, {}, json.dumps({"status": "running"}))
+
+        responses.add_callback(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=t",
+            callback=one_second_poll,
+        )
+        client = TabichanClient("test-key", coalesce=True)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(client._poll, "t", Deadline(0.3))
+            while len(client._singleflight) == 0:
+                time.sleep(0.01)
+            assert client._poll("t", Deadline(30))[0] == {"status": "running"}
+            with pytest.raises(DeadlineExceeded):
+                leader.result(timeout=5)
+
+    @responses.activate
+    def test_deadline_cuts_retries_short(self):
+        """Test that a retry that would end after the deadline is not attempted"""
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=busy",
+            status=503,
+            headers={"Retry-After": "2"},
+        )
+        client = TabichanClient("test-key")
+        started_at = time.monotonic()
+        with pytest.raises(ChatTimeout):
+            client.wait_for_chat("busy", deadline=0.5)
+
+        assert time.monotonic() - started_at < 0.5
+        responses.assert_call_count(
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=busy", 1
+        )
+
+    @responses.activate
+    def test_expired_deadline_sends_nothing(self):
+        """Test that a call whose deadline already passed fails at once"""
+        client = TabichanClient("test-key")
+        with pytest.raises(DeadlineExceeded):
+            client.start_chat("q", "u", deadline=Deadline(0))
+        responses.assert_call_count("https://tourism-api.podtech-ai.com/v1/chat", 0)
+
+    @responses.activate
+    def test_wait_for_chat_cancelled_before_polling(self):
+        """Test that an already set cancel event sends no poll"""
+        cancel = threading.Event()
+        cancel.set()
+        client = TabichanClient("test-key")
+        with pytest.raises(ChatCancelled) as excinfo:
+            client.wait_for_chat("gone", cancel=cancel)
+        assert excinfo.value.task_id == "gone"
+        responses.assert_call_count(
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=gone", 0
+        )
+
+    @responses.activate
+    def test_wait_for_chat_cancel_wakes_the_wait(self):
+        """Test that cancelling interrupts the sleep between polls"""
+        url = "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=long"
+        responses.add(responses.GET, url, json={"status": "running"})
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+
+        client = TabichanClient("test-key")
+        started_at = time.monotonic()
+        with pytest.raises(ChatCancelled):
+            client.wait_for_chat(
+                "long", poll_strategy=FixedPollStrategy(5, 30), cancel=cancel
+            )
+        assert time.monotonic() - started_at < 2
+        responses.assert_call_count(url, 1)
+
+    @responses.activate
+    def test_wait_for_chat_cancel_wakes_a_retry_backoff(self):
+        """Test that cancelling interrupts a poll waiting to be retried"""
+        url = "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=busy"
+        responses.add(responses.GET, url, status=503, headers={"Retry-After": "20"})
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+
+        client = TabichanClient("test-key")
+        started_at = time.monotonic()
+        with pytest.raises(ChatCancelled) as excinfo:
+            client.wait_for_chat("busy", cancel=cancel)
+        assert excinfo.value.task_id == "busy"
+        assert time.monotonic() - started_at < 2
+        responses.assert_call_count(url, 1)
+
+    @responses.activate
+    def test_run_chat_passes_cancel_to_the_wait(self):
+        """Test that run_chat stops polling when cancelled"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "run-task"},
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=run-task",
+            json={"status": "running"},
+        )
+        cancel = threading.Event()
+        threading.Timer(0.1, cancel.set).start()
+
+        client = TabichanClient("test-key", poll_strategy=FixedPollStrategy(5, 30))
+        with pytest.raises(ChatCancelled):
+            client.run_chat("q", "u", cancel=cancel)
+
+    @responses.activate
+    def test_submit_returns_futures_resolved_by_shared_poller(self):
+        """Test that submitted chats resolve through one background poller"""
+        for task_id in ("s1", "s2"):
+            responses.add(
+                responses.POST,
+                "https://tourism-api.podtech-ai.com/v1/chat",
+                json={"task_id": task_id},
+            )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=s1",
+            json={"status": "completed", "result": {"text": "one"}},
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=s2",
+            json={"status": "failed", "error": "Boom"},
+        )
+
+        done = []
+        with TabichanClient(
+            "test-key", poll_strategy=FixedPollStrategy(0.01, 20)
+        ) as client:
+            first = client.submit("one", "user")
+            second = client.submit("two", "user")
+            first.add_done_callback(done.append)
+            assert client._get_poller() is client._get_poller()
+
+            finished = list(as_completed([first, second], timeout=5))
+            assert set(finished) == {first, second}
+            assert first.result() == {"text": "one"}
+            assert isinstance(second.exception(), ChatFailed)
+        assert done == [first]
+
+    @responses.activate
+    def test_submit_raises_submission_errors(self):
+        """Test that a failed start_chat is raised by submit itself"""
+        responses.add(
+            responses.POST, "https://tourism-api.podtech-ai.com/v1/chat", status=400
+        )
+        with TabichanClient("test-key") as client:
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.submit("q", "user")
+            assert client._poller is None
+
+    @responses.activate
+    def test_submit_uses_result_cache(self):
+        """Test that cached results come back as completed futures"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "cached"},
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=cached",
+            json={"status": "completed", "result": {"text": "plan"}},
+        )
+        with TabichanClient(
+            "test-key",
+            result_cache=ResultCache(),
+            poll_strategy=FixedPollStrategy(0.01, 20),
+        ) as client:
+            assert client.submit("q", "u1").result(timeout=5) == {"text": "plan"}
+            again = client.submit("q", "u1")
+            assert again.done()
+            assert again.result() == {"text": "plan"}
+        responses.assert_call_count("https://tourism-api.podtech-ai.com/v1/chat", 1)
+
+    @responses.activate
+    def test_close_cancels_submitted_chats(self):
+        """Test that closing the client cancels chats still being polled"""
+        responses.add(
+            responses.POST,
+            "https://tourism-api.podtech-ai.com/v1/chat",
+            json={"task_id": "slow"},
+        )
+        responses.add(
+            responses.GET,
+            "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id=slow",
+            json={"status": "running"},
+        )
+        client = TabichanClient("test-key", poll_strategy=FixedPollStrategy(5, 30))
+        future = client.submit("q", "user")
+        done, _ = wait([future], timeout=0.1, return_when=FIRST_COMPLETED)
+        assert not done
+        client.close()
+        assert future.cancelled()
@@ -0,0 +1,60 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.codec import JSONCodec, get_codec
+
+ITINERARY = {
+    "itinerary": {
+        "days": [{"activities": [{"activity": {"id": "a1", "name": "浅草寺"}}]}]
+    },
+    "score": 4.5,
+    "tags": None,
+}
+
+
+def available_codecs():
+    names = ["json"]
+    for name in ("orjson", "msgspec"):
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class TestCodec:
+    @pytest.mark.parametrize("name", available_codecs())
+    def test_round_trip_bytes(self, name):
+        """Test that every installed codec encodes to bytes and decodes back"""
+        codec = get_codec(name)
+        data = codec.dumps(ITINERARY)
+        assert isinstance(data, bytes)
+        assert json.loads(data) == ITINERARY
+        assert codec.loads(data) == ITINERARY
+        assert codec.loads(data.decode("utf-8")) == ITINERARY
+
+    @pytest.mark.parametrize("name", available_codecs())
+    def test_invalid_json_raises_value_error(self, name):
+        """Test that every backend reports bad input the same way"""
+        with pytest.raises(ValueError):
+            get_codec(name).loads(b'{"status": ')
+
+    def test_stdlib_output_matches_json_dumps(self):
+        """Test that the fallback produces exactly what json.dumps does"""
+        assert JSONCodec().dumps(ITINERARY) == json.dumps(ITINERARY).encode()
+
+    def test_unknown_codec(self):
+        """Test that an unknown name is rejected"""
+        with pytest.raises(ValueError):
+            get_codec("yaml")
+
+    def test_default_falls_back_to_stdlib(self):
+        """Test that the standard library is used when nothing faster is installed"""
+        with (
+            patch("tabichan.codec.orjson", None),
+            patch("tabichan.codec.msgspec", None),
+        ):
+            assert type(get_codec()) is JSONCodec
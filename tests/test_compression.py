@@ -0,0 +1,55 @@
+import gzip
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.compression import RequestCompression
+
+BODY = b'{"history": [' + b'{"role": "user", "content": "hello"},' * 100 + b"{}]}"
+
+
+class TestRequestCompression:
+    def test_compresses_large_bodies(self):
+        """Test that bodies above the threshold are gzipped"""
+        compression = RequestCompression(min_size=100)
+        payload, encoding = compression.compress(BODY)
+        assert encoding == "gzip"
+        assert gzip.decompress(payload) == BODY
+        assert compression.stats()["bytes_in"] == len(BODY)
+        assert compression.stats()["bytes_out"] == len(payload)
+
+    def test_small_bodies_are_sent_as_is(self):
+        """Test that bodies under the threshold are not compressed"""
+        payload, encoding = RequestCompression(min_size=10_000).compress(BODY)
+        assert (payload, encoding) == (BODY, None)
+
+    def test_incompressible_bodies_are_sent_as_is(self):
+        """Test that compression is skipped when it would not shrink the body"""
+        body = bytes(range(256))
+        payload, encoding = RequestCompression(min_size=0).compress(body)
+        assert (payload, encoding) == (body, None)
+
+    def test_disable(self):
+        """Test that a disabled compressor passes bodies through"""
+        compression = RequestCompression(min_size=0)
+        compression.disable()
+        assert compression.compress(BODY) == (BODY, None)
+        assert compression.stats()["enabled"] is False
+
+    def test_zstd(self):
+        """Test zstd compression when zstandard is installed"""
+        zstandard = pytest.importorskip("zstandard")
+        payload, encoding = RequestCompression("zstd", min_size=0).compress(BODY)
+        assert encoding == "zstd"
+        assert zstandard.ZstdDecompressor().decompress(payload) == BODY
+
+    def test_zstd_requires_zstandard(self):
+        """Test that asking for zstd without zstandard fails early"""
+        with patch("tabichan.compression.zstandard", None):
+            with pytest.raises(ImportError):
+                RequestCompression("zstd")
+
+    def test_unknown_encoding(self):
+        """Test that unsupported encodings are rejected"""
+        with pytest.raises(ValueError):
+            RequestCompression("br")
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.deadline import Deadline, Timeouts
+from tabichan.exceptions import DeadlineExceeded
+
+
+class TestTimeouts:
+    def test_defaults_match_previous_hardcoded_values(self):
+        """Test that the defaults are the SDK's historical timeouts"""
+        timeouts = Timeouts()
+        assert timeouts.resolve("chat") == (3.0, 3.0)
+        assert timeouts.resolve("poll") == (5.0, 5.0)
+        assert timeouts.resolve("image") == (30.0, 30.0)
+
+    def test_connect_timeout_applies_to_every_endpoint(self):
+        """Test that a client-wide connect timeout is paired with each read timeout"""
+        timeouts = Timeouts(connect=1.0, poll=2.0)
+        assert timeouts.resolve("poll") == (1.0, 2.0)
+        assert timeouts.resolve("image") == (1.0, 30.0)
+
+    def test_per_call_override(self):
+        """Test that a per-call timeout replaces the defaults like in requests"""
+        timeouts = Timeouts(connect=1.0)
+        assert timeouts.resolve("chat", 7) == (7, 7)
+        assert timeouts.resolve("chat", (0.5, 9)) == (0.5, 9)
+
+    def test_invalid_timeout(self):
+        """Test that non-positive timeouts are rejected"""
+        with pytest.raises(ValueError, match="poll"):
+            Timeouts(poll=0)
+
+
+class TestDeadline:
+    def test_clip_shortens_timeouts_to_time_left(self):
+        """Test that request timeouts never outlast the deadline"""
+        with patch("time.monotonic", return_value=100.0):
+            deadline = Deadline(4.0)
+        with patch("time.monotonic", return_value=101.0):
+            assert deadline.remaining() == 3.0
+            assert deadline.clip((1.0, 5.0)) == (1.0, 3.0)
+            assert deadline.clip(None) == (3.0, 3.0)
+
+    def test_clip_raises_once_expired(self):
+        """Test that no request is sent after the deadline"""
+        with patch("time.monotonic", return_value=100.0):
+            deadline = Deadline(1.0)
+        with patch("time.monotonic", return_value=101.0):
+            assert deadline.expired
+            assert deadline.remaining() == 0.0
+            with pytest.raises(DeadlineExceeded):
+                deadline.clip((3.0, 3.0))
+
+    def test_allows(self):
+        """Test whether a wait still leaves time for a request"""
+        with patch("time.monotonic", return_value=100.0):
+            deadline = Deadline(5.0)
+            assert deadline.allows(4.0)
+            assert not deadline.allows(5.0)
+
+    def test_coerce(self):
+        """Test that seconds become a Deadline and Deadlines pass through"""
+        deadline = Deadline(10)
+        assert Deadline.coerce(deadline) is deadline
+        assert Deadline.coerce(None) is None
+        assert 0 < Deadline.coerce(2.5).remaining() <= 2.5
+
+    def test_deadline_exceeded_is_a_timeout(self):
+        """Test that callers catching TimeoutError also catch DeadlineExceeded"""
+        assert issubclass(DeadlineExceeded, TimeoutError)
@@ -0,0 +1,63 @@
+import pytest
+
+from tabichan.hedging import HedgePolicy
+
+
+class TestHedgePolicy:
+    def test_initial_delay_until_enough_samples(self):
+        """Test that the configured delay is used before latencies are known"""
+        policy = HedgePolicy(initial_delay=2.0, min_samples=3)
+        policy.record_latency(0.1)
+        policy.record_latency(0.1)
+        assert policy.delay() == 2.0
+
+    def test_delay_follows_percentile(self):
+        """Test that the hedge delay tracks the configured latency percentile"""
+        policy = HedgePolicy(percentile=0.9, min_samples=10)
+        for latency in range(1, 11):
+            policy.record_latency(latency / 10)
+        assert policy.delay() == pytest.approx(0.9)
+
+    def test_delay_has_a_floor(self):
+        """Test that very fast endpoints do not hedge every request"""
+        policy = HedgePolicy(min_samples=1, min_delay=0.05)
+        policy.record_latency(0.001)
+        assert policy.delay() == 0.05
+
+    def test_window_forgets_old_latencies(self):
+        """Test that only the most recent latencies count"""
+        policy = HedgePolicy(min_samples=2, window=2)
+        policy.record_latency(5.0)
+        policy.record_latency(0.2)
+        policy.record_latency(0.2)
+        assert policy.delay() == pytest.approx(0.2)
+
+    def test_extra_load_is_capped(self):
+        """Test that hedges stop once the load budget is spent"""
+        policy = HedgePolicy(max_extra_load=0.5)
+        allowed = 0
+        for _ in range(20):
+            policy.record_request()
+            allowed += policy.allow_hedge()
+        # At most the starting reserve plus half a hedge per request.
+        assert 10 <= allowed <= 5 + 10
+        assert policy.stats() == {
+            "requests": 20,
+            "hedges_sent": allowed,
+            "hedges_won": 0,
+        }
+
+    def test_no_extra_load_keeps_a_single_hedge(self):
+        """Test that max_extra_load=0 never refills the one reserve hedge"""
+        policy = HedgePolicy(max_extra_load=0)
+        policy.record_request()
+        assert policy.allow_hedge()
+        policy.record_request()
+        assert not policy.allow_hedge()
+
+    def test_invalid_settings(self):
+        """Test that out-of-range settings are rejected"""
+        with pytest.raises(ValueError):
+            HedgePolicy(percentile=1.5)
+        with pytest.raises(ValueError):
+            HedgePolicy(max_extra_load=2)
@@ -0,0 +1,188 @@
+import asyncio
+import base64
+import io
+import json
+
+import pytest
+
+from tabichan.images import (
+    Base64FieldDecoder,
+    activity_image_ids,
+    async_image_sink,
+    convert_image,
+    extract_base64,
+    write_image,
+)
+
+
+def decode_in_chunks(body: bytes, size: int) -> bytes:
+    decoder = Base64FieldDecoder()
+    out = b"".join(decoder.feed(body[i : i + size]) for i in range(0, len(body), size))
+    decoder.finish()
+    return out
+
+
+class TestImages:
+    def test_extract_without_parsing(self):
+        """Test that the base64 field is sliced out of the raw body"""
+        body = json.dumps({"base64": "aGVsbG8="}).encode()
+        value = extract_base64(body)
+        assert isinstance(value, memoryview)
+        assert bytes(value) == b"aGVsbG8="
+
+    def test_extract_handles_escaped_slashes(self):
+        """Test that "\\/" escapes are undone"""
+        assert bytes(extract_base64(b'{"base64":"ab\\/c"}')) == b"ab/c"
+
+    def test_extract_falls_back_to_json(self):
+        """Test that unusual bodies still decode through the JSON parser"""
+        body = b'{"base64": "aGVs\\u0062G8="}'
+        assert bytes(extract_base64(body)) == b"aGVsbG8="
+
+    def test_missing_field(self):
+        """Test that a body without the field raises like the JSON path did"""
+        with pytest.raises(KeyError):
+            extract_base64(b'{"error": "not found"}')
+
+    def test_convert_image(self):
+        """Test the three return formats of get_image"""
+        assert convert_image(b"hello", "base64") == "aGVsbG8="
+        assert convert_image(memoryview(b"hello"), "bytes") == b"hello"
+        assert isinstance(convert_image(b"hello", "memoryview"), memoryview)
+
+    def test_write_image(self, tmp_path):
+        """Test writing to a path and to a file object"""
+        assert write_image(b"hello", tmp_path / "a.png") == 5
+        assert (tmp_path / "a.png").read_bytes() == b"hello"
+        buffer = io.BytesIO()
+        write_image(memoryview(b"hello"), buffer)
+        assert buffer.getvalue() == b"hello"
+
+
+class TestBase64FieldDecoder:
+    image = bytes(range(256)) * 40
+
+    def body(self, **extra) -> bytes:
+        payload = {
+            "id": "img",
+            **extra,
+            "base64": base64.b64encode(self.image).decode(),
+        }
+        return json.dumps(payload).encode()
+
+    @pytest.mark.parametrize("size", [1, 3, 4, 7, 64, 4096, 1 << 20])
+    def test_any_chunking_decodes_the_image(self, size):
+        """Test that the result does not depend on where chunks split"""
+        assert decode_in_chunks(self.body(), size) == self.image
+
+    @pytest.mark.parametrize("size", [1, 2, 5])
+    def test_escaped_slashes_across_chunks(self, size):
+        """Test that "\\/" escapes are undone even when split between chunks"""
+        encoded = base64.b64encode(self.image).decode().replace("/", "\\/")
+        body = ('{"base64": "' + encoded + '"}').encode()
+        assert decode_in_chunks(body, size) == self.image
+
+    def test_output_is_incremental(self):
+        """Test that bytes come out before the body ends"""
+        decoder = Base64FieldDecoder()
+        body = self.body()
+        first = decoder.feed(body[: len(body) // 2])
+        assert 0 < len(first) < len(self.image)
+
+    def test_trailing_fields_are_ignored(self):
+        """Test that content after the field does not disturb decoding"""
+        body = self.body()[:-1] + b', "extra": "x"}'
+        assert decode_in_chunks(body, 10) == self.image
+
+    def test_missing_field(self):
+        """Test that a body without the field raises KeyError"""
+        with pytest.raises(KeyError):
+            decode_in_chunks(b'{"error": "not found"}', 4)
+
+    def test_truncated_body(self):
+        """Test that a body cut off inside the field is an error"""
+        with pytest.raises(ValueError):
+            decode_in_chunks(self.body()[:100], 16)
+
+    def test_unsupported_escape(self):
+        """Test that escapes other than "\\/" are rejected"""
+        with pytest.raises(ValueError):
+            decode_in_chunks(b'{"base64": "ab\\ncd"}', 4)
+
+
+class TestAsyncImageSink:
+    def test_awaits_async_writers(self):
+        """Test that coroutine writers are awaited and drain() is called"""
+        written = []
+        drained = []
+
+        class Writer:
+            def write(self, data):
+                written.append(data)
+
+            async def drain(self):
+                drained.append(True)
+
+        async def run():
+            async with async_image_sink(Writer()) as write:
+                await write(b"ab")
+                await write(b"cd")
+
+        asyncio.run(run())
+        assert written == [b"ab", b"cd"]
+        assert len(drained) == 2
+
+    def test_async_callable(self, tmp_path):
+        """Test that async callables and paths are accepted"""
+        chunks = []
+
+        async def sink(data):
+            chunks.append(data)
+
+        async def run():
+            async with async_image_sink(sink) as write:
+                await write(b"ab")
+            async with async_image_sink(tmp_path / "img") as write:
+                await write(b"cd")
+
+        asyncio.run(run())
+        assert chunks == [b"ab"]
+        assert (tmp_path / "img").read_bytes() == b"cd"
+
+
+class TestActivityImageIds:
+    def test_collects_distinct_ids_in_order(self):
+        """Test that ids are gathered across days and deduplicated"""
+        result = {
+            "itinerary": {
+                "days": [
+                    {
+                        "activities": [
+                            {"activity": {"id": "a"}},
+                            {"activity": {"id": "b"}},
+                        ]
+                    },
+                    {
+                        "activities": [
+                            {"activity": {"id": "a"}},
+                            {"activity": {"id": "c"}},
+                        ]
+                    },
+                ]
+            }
+        }
+        assert activity_image_ids(result) == ["a", "b", "c"]
+
+    def test_tolerates_missing_parts(self):
+        """Test that incomplete itineraries do not raise"""
+        assert activity_image_ids({}) == []
+        result = {
+            "itinerary": {
+                "days": [
+                    {},
+                    {"activities": None},
+                    {"activities": [{}, {"activity": {}}, {"activity": {"id": "x"}}]},
+                ]
+            }
+        }
+        assert activity_image_ids(result) == ["x"]
@@ -1,10 +1,199 @@
 """Tests for the main module."""
 
-from tabichan.main import main
+import json
+import os
+from unittest.mock import patch
 
+import pytest
+import responses
 
-def test_main(capsys):
-    """Test the main function."""
-    main()
+from tabichan.main import main, percentile
+
+CHAT_URL = "https://tourism-api.podtech-ai.com/v1/chat"
+POLL_URL = "https://tourism-api.podtech-ai.com/v1/chat/poll"
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def add_chat_api():
+    """Register a stand-in API that completes every task on its first poll"""
+
+    def chat_callback(request):
+        body = json.loads(request.body)
+        if body["user_query"] == "bad":
+            return (503, {}, "")
+        return (200, {}, json.dumps({"task_id": f"task-{body['user_query']}"}))
+
+    def poll_callback(request):
+        task_id = request.params["task_id"]
+        payload = {"status": "completed", "result": {"answer": task_id}}
+        return (200, {}, json.dumps(payload))
+
+    responses.add_callback(responses.POST, CHAT_URL, callback=chat_callback)
+    responses.add_callback(responses.GET, POLL_URL, callback=poll_callback)
+
+
+def test_main_without_command_prints_help(capsys):
+    """Test the main function without a subcommand."""
+    assert main([]) == 2
     captured = capsys.readouterr()
-    assert "Hello from tabichan-python-sdk!" in captured.out
+    assert "batch" in captured.out
+
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+@responses.activate
+@patch.dict(os.environ, {"TABICHAN_API_KEY": "cli-key"})
+@patch("time.sleep")
+def test_batch_writes_results_and_stats(mock_sleep, tmp_path, capsys):
+    """Test that the batch command submits, polls and records every line."""
+    add_chat_api()
+    input_path = tmp_path / "input.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    write_jsonl(
+        input_path,
+        [
+            {"id": "first", "user_query": "a", "user_id": "u1"},
+            {"user_query": "bad", "user_id": "u1"},
+            {"user_query": "c", "user_id": "u2", "country": "france"},
+        ],
+    )
+
+    code = main(
+        ["batch", str(input_path), "-o", str(output_path), "--concurrency", "2"]
+    )
+
+    assert code == 1
+    records = {r["index"]: r for r in read_jsonl(output_path)}
+    assert records[0]["id"] == "first"
+    assert records[0]["result"] == {"answer": "task-a"}
+    assert records[1]["status"] == "error"
+    assert records[2]["status"] == "completed"
+
+    captured = capsys.readouterr()
+    assert "2 completed, 1 failed" in captured.err
+    assert "p50=" in captured.err
+
+
+@responses.activate
+@patch.dict(os.environ, {"TABICHAN_API_KEY": "cli-key"})
+def test_batch_records_malformed_lines(tmp_path):
+    """Test that invalid lines are recorded as errors without stopping the batch."""
+    add_chat_api()
+    input_path = tmp_path / "input.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    checkpoint_path = tmp_path / "run.checkpoint"
+    input_path.write_text(
+        json.dumps({"user_query": "a", "user_id": "u1"})
+        + "\n{not json\n[]\n"
+        + json.dumps({"user_query": "d", "user_id": "u1"})
+        + "\n"
+    )
+
+    code = main(
+        [
+            "batch",
+            str(input_path),
+            "-o",
+            str(output_path),
+            "--checkpoint",
+            str(checkpoint_path),
+        ]
+    )
+
+    assert code == 1
+    records = {r["index"]: r for r in read_jsonl(output_path)}
+    assert records[0]["status"] == "completed"
+    assert records[1]["status"] == "error"
+    assert records[2]["status"] == "error"
+    assert records[3]["status"] == "completed"
+    entries = read_jsonl(checkpoint_path)
+    assert {"index": 0, "task_id": "task-a"} in entries
+    # Retrying cannot fix an invalid line, so it is final.
+    assert {"index": 1, "done": True} in entries
+    assert {"index": 2, "done": True} in entries
+
+    code = main(
+        [
+            "batch",
+            str(input_path),
+            "-o",
+            str(output_path),
+            "--checkpoint",
+            str(checkpoint_path),
+            "--resume",
+        ]
+    )
+    assert code == 0
+    assert sorted(r["index"] for r in read_jsonl(output_path)) == [0, 1, 2, 3]
+
+
+@responses.activate
+@patch.dict(os.environ, {"TABICHAN_API_KEY": "cli-key"})
+def test_batch_resume_from_checkpoint(tmp_path):
+    """Test that --resume skips finished items and re-polls submitted ones."""
+    add_chat_api()
+    input_path = tmp_path / "input.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    checkpoint_path = tmp_path / "run.checkpoint"
+    write_jsonl(
+        input_path,
+        [
+            {"user_query": "a", "user_id": "u1"},
+            {"user_query": "b", "user_id": "u1"},
+            {"user_query": "c", "user_id": "u1"},
+            {"user_query": "d", "user_id": "u1"},
+        ],
+    )
+    output_path.write_text(json.dumps({"index": 0, "status": "completed"}) + "\n")
+    checkpoint_path.write_text(
+        "\n".join(
+            [
+                json.dumps({"index": 0, "task_id": "task-a"}),
+                json.dumps({"index": 0, "done": True}),
+                json.dumps({"index": 1, "task_id": "task-b"}),
+                json.dumps({"index": 2, "task_id": "task-c"}),
+                json.dumps({"index": 2, "done": False}),
+                '{"index": 3, "task',
+            ]
+        )
+    )
+
+    code = main(
+        [
+            "batch",
+            str(input_path),
+            "-o",
+            str(output_path),
+            "--checkpoint",
+            str(checkpoint_path),
+            "--resume",
+        ]
+    )
+
+    assert code == 0
+    submitted = [
+        json.loads(call.request.body)["user_query"]
+        for call in responses.calls
+        if call.request.method == "POST"
+    ]
+    assert sorted(submitted) == ["c", "d"]
+    assert sorted(r["index"] for r in read_jsonl(output_path)) == [0, 1, 2, 3]
+
+
+def test_batch_requires_output(tmp_path):
+    """Test that the batch command needs an output file."""
+    with pytest.raises(SystemExit):
+        main(["batch", str(tmp_path / "input.jsonl")])
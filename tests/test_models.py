@@ -0,0 +1,79 @@
+import json
+import sys
+
+import pytest
+
+from tabichan.models import Activity, ChatResult, Day, Itinerary
+
+RESULT = {
+    "answer": "Here is your trip",
+    "itinerary": {
+        "days": [
+            {
+                "activities": [
+                    {"activity": {"id": "a1", "name": "Senso-ji"}},
+                    {"activity": {"id": "a2", "name": "Ueno Park"}},
+                ]
+            },
+            {"activities": [{"activity": {"id": "a1", "name": "Senso-ji"}}, {}]},
+        ]
+    },
+}
+
+
+class TestModels:
+    def test_typed_access(self):
+        """Test that itinerary sections are reachable as typed objects"""
+        result = ChatResult(RESULT)
+        assert isinstance(result.itinerary, Itinerary)
+        day = result.itinerary.days[0]
+        assert isinstance(day, Day)
+        assert isinstance(day.activities[0], Activity)
+        assert day.activities[0].id == "a1"
+        assert day.activities[1].name == "Ueno Park"
+        assert result.itinerary.activity_ids() == ["a1", "a2"]
+
+    def test_raw_dict_access_still_works(self):
+        """Test that existing dict-walking code keeps working"""
+        result = ChatResult(RESULT)
+        assert result["itinerary"]["days"][0]["activities"][0]["activity"]["id"] == "a1"
+        assert result == RESULT
+        assert dict(result) == RESULT
+        assert result.get("missing") is None
+        assert result.raw is RESULT
+
+    def test_sections_are_built_once_on_first_access(self):
+        """Test that nested models are created lazily and then reused"""
+        result = ChatResult(RESULT)
+        assert result._itinerary is None
+        itinerary = result.itinerary
+        assert result.itinerary is itinerary
+        assert itinerary._days is None
+        assert itinerary.days is itinerary.days
+
+    def test_missing_sections(self):
+        """Test that results without an itinerary are handled"""
+        result = ChatResult({"answer": "No plan"})
+        assert result.itinerary is None
+        assert Itinerary({}).days == ()
+        assert Day({"activities": None}).activities == ()
+        assert Activity({}).id is None
+
+    def test_from_json_decodes_lazily(self):
+        """Test that raw bytes are only parsed on first use"""
+        result = ChatResult.from_json(json.dumps(RESULT).encode())
+        assert result._raw is None
+        assert result.itinerary.days[1].activities[0].id == "a1"
+        assert result._data is None
+        assert result == RESULT
+
+    def test_models_have_no_instance_dict(self):
+        """Test that models stay compact"""
+        for model in (ChatResult(RESULT), Itinerary({}), Day({}), Activity({})):
+            assert not hasattr(model, "__dict__")
+        assert sys.getsizeof(Activity({})) < sys.getsizeof({})
+
+    def test_models_are_read_only(self):
+        """Test that the wrapped data cannot be changed through the model"""
+        with pytest.raises(TypeError):
+            ChatResult(RESULT)["answer"] = "changed"
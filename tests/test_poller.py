@@ -0,0 +1,113 @@
+from concurrent.futures import CancelledError
+
+import pytest
+import responses
+
+from tabichan.client import TabichanClient
+from tabichan.exceptions import ChatFailed, ChatTimeout
+from tabichan.poller import ChatPoller
+from tabichan.polling import FixedPollStrategy
+
+POLL_URL = "https://tourism-api.podtech-ai.com/v1/chat/poll?task_id={}"
+
+
+def fast_poller(client, **kwargs):
+    return ChatPoller(client, poll_strategy=FixedPollStrategy(0.01, 20), **kwargs)
+
+
+class TestChatPoller:
+    @responses.activate
+    def test_tracks_many_tasks(self):
+        """Test that one poller resolves futures for several tasks"""
+        responses.add(
+            responses.GET,
+            POLL_URL.format("task-a"),
+            json={"status": "completed", "result": {"answer": "A"}},
+        )
+        responses.add(
+            responses.GET, POLL_URL.format("task-b"), json={"status": "running"}
+        )
+        responses.add(
+            responses.GET,
+            POLL_URL.format("task-b"),
+            json={"status": "completed", "result": {"answer": "B"}},
+        )
+
+        client = TabichanClient("test-key")
+        with fast_poller(client) as poller:
+            futures = poller.track_many(["task-a", "task-b"])
+            results = {f.result(timeout=5)["answer"] for f in poller.as_completed(5)}
+
+        assert results == {"A", "B"}
+        assert futures[0].result()["answer"] == "A"
+        assert futures[1].result()["answer"] == "B"
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_track_same_task_returns_same_future(self):
+        """Test that tracking a task twice shares one future"""
+        responses.add(responses.GET, POLL_URL.format("dup"), json={"status": "running"})
+
+        client = TabichanClient("test-key")
+        with fast_poller(client) as poller:
+            assert poller.track("dup") is poller.track("dup")
+            assert poller.pending() == 1
+
+    @responses.activate
+    def test_failed_task_sets_exception(self):
+        """Test that a failed task resolves its future with an error"""
+        responses.add(
+            responses.GET,
+            POLL_URL.format("bad"),
+            json={"status": "failed", "error": "Boom"},
+        )
+
+        client = TabichanClient("test-key")
+        with fast_poller(client) as poller:
+            future = poller.track("bad")
+            with pytest.raises(ChatFailed, match="Boom"):
+                future.result(timeout=5)
+
+    @responses.activate
+    def test_exhausted_schedule_times_out(self):
+        """Test that a task outliving its poll schedule times out"""
+        responses.add(
+            responses.GET, POLL_URL.format("slow"), json={"status": "running"}
+        )
+
+        client = TabichanClient("test-key")
+        poller = ChatPoller(client, poll_strategy=FixedPollStrategy(0.01, 3))
+        with poller:
+            with pytest.raises(ChatTimeout):
+                poller.track("slow").result(timeout=5)
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_close_cancels_pending_tasks(self):
+        """Test that closing the poller cancels unfinished futures"""
+        responses.add(
+            responses.GET, POLL_URL.format("open"), json={"status": "running"}
+        )
+
+        client = TabichanClient("test-key")
+        poller = ChatPoller(client, poll_strategy=FixedPollStrategy(60, 2))
+        future = poller.track("open")
+        poller.close()
+
+        with pytest.raises(CancelledError):
+            future.result(timeout=5)
+        with pytest.raises(RuntimeError):
+            poller.track("another")
+
+    @responses.activate
+    def test_cancelled_future_stops_polling(self):
+        """Test that cancelling a future drops the task from the schedule"""
+        responses.add(
+            responses.GET, POLL_URL.format("gone"), json={"status": "running"}
+        )
+
+        client = TabichanClient("test-key")
+        with ChatPoller(client, poll_strategy=FixedPollStrategy(0.2, 20)) as poller:
+            future = poller.track("gone")
+            future.cancel()
+            assert poller.pending() == 0
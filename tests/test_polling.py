@@ -0,0 +1,108 @@
+from email.utils import formatdate
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.polling import (
+    BackoffPollStrategy,
+    FixedPollStrategy,
+    parse_retry_after,
+    poll_hint,
+)
+
+
+class TestFixedPollStrategy:
+    def test_fixed_interval_until_max_attempts(self):
+        """Test that the fixed strategy mirrors the historical 30 x 10s loop"""
+        strategy = FixedPollStrategy()
+        assert strategy.next_delay(1, 0.0) == 10.0
+        assert strategy.next_delay(29, 280.0) == 10.0
+        assert strategy.next_delay(30, 290.0) is None
+
+
+class TestBackoffPollStrategy:
+    def test_exponential_growth_with_cap(self):
+        """Test that delays grow exponentially and stop at max_interval"""
+        strategy = BackoffPollStrategy(
+            initial=0.5, multiplier=2, max_interval=4, jitter=0, deadline=None
+        )
+        delays = [strategy.next_delay(attempt, 0.0) for attempt in range(1, 7)]
+        assert delays == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+    def test_large_attempt_does_not_overflow(self):
+        """Test that very long waits keep returning the capped delay"""
+        strategy = BackoffPollStrategy(jitter=0, deadline=None)
+        assert strategy.next_delay(10_000, 0.0) == strategy.max_interval
+
+    def test_jitter_stays_within_bounds(self):
+        """Test that jitter randomises delays within the configured fraction"""
+        strategy = BackoffPollStrategy(
+            initial=2, multiplier=1, max_interval=10, jitter=0.25, deadline=None
+        )
+        for _ in range(100):
+            assert 1.5 <= strategy.next_delay(1, 0.0) <= 2.5
+
+    def test_deadline_truncates_and_stops(self):
+        """Test that the last delay lands on the deadline and polling then stops"""
+        strategy = BackoffPollStrategy(
+            initial=1, max_interval=10, jitter=0, deadline=20
+        )
+        assert strategy.next_delay(20, 18.0) == 2.0
+        assert strategy.next_delay(21, 20.0) is None
+
+    def test_max_attempts(self):
+        """Test that max_attempts bounds the number of polls"""
+        strategy = BackoffPollStrategy(jitter=0, deadline=None, max_attempts=3)
+        assert strategy.next_delay(2, 0.0) is not None
+        assert strategy.next_delay(3, 0.0) is None
+
+    def test_server_hint(self):
+        """Test that a server hint replaces the computed delay when enabled"""
+        strategy = BackoffPollStrategy(jitter=0, deadline=60)
+        assert strategy.next_delay(1, 0.0, hint=7.5) == 7.5
+        assert strategy.next_delay(1, 55.0, hint=30.0) == 5.0
+
+        ignoring = BackoffPollStrategy(jitter=0, use_server_hint=False)
+        assert ignoring.next_delay(1, 0.0, hint=7.5) == 1.0
+
+    def test_server_hint_is_clamped(self):
+        """Test that hints below initial or above max_interval are bounded"""
+        strategy = BackoffPollStrategy(
+            initial=0.5, max_interval=10.0, jitter=0, deadline=None
+        )
+        assert strategy.next_delay(1, 0.0, hint=0.0) == 0.5
+        assert strategy.next_delay(1, 0.0, hint=-3.0) == 0.5
+        assert strategy.next_delay(1, 0.0, hint=120.0) == 10.0
+
+    def test_invalid_configuration(self):
+        """Test that inconsistent settings are rejected"""
+        with pytest.raises(ValueError):
+            BackoffPollStrategy(initial=5, max_interval=1)
+        with pytest.raises(ValueError):
+            BackoffPollStrategy(jitter=1.5)
+
+
+class TestPollHint:
+    def test_parse_retry_after_seconds(self):
+        """Test Retry-After given in seconds"""
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("-1") == 0.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+    def test_parse_retry_after_http_date(self):
+        """Test Retry-After given as an HTTP date"""
+        with patch("time.time", return_value=1_000_000.0):
+            value = formatdate(1_000_030.0, usegmt=True)
+            assert parse_retry_after(value) == pytest.approx(30.0)
+
+    def test_header_wins_over_payload(self):
+        """Test that the header takes precedence over payload fields"""
+        assert poll_hint({"Retry-After": "4"}, {"eta": 12}) == 4.0
+
+    def test_payload_fields(self):
+        """Test retry_after and eta payload fields"""
+        assert poll_hint({}, {"status": "running", "retry_after": 2}) == 2.0
+        assert poll_hint({}, {"status": "running", "eta": 12.5}) == 12.5
+        assert poll_hint({}, {"status": "running", "eta": "later"}) is None
+        assert poll_hint({}, {"status": "running"}) is None
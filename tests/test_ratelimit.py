@@ -0,0 +1,153 @@
+import multiprocessing
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.ratelimit import RateLimiter, SQLiteTokenBucket, TokenBucket
+
+
+def _reserve_many(path, count, waits):
+    # A slow refill keeps process start-up time from adding tokens.
+    bucket = SQLiteTokenBucket(path, "/chat", rate=0.01, burst=count)
+    for _ in range(count):
+        waits.put(bucket.reserve())
+    bucket.close()
+
+
+class TestTokenBucket:
+    def test_bucket_spaces_requests(self):
+        """Test that the bucket delays requests beyond the burst"""
+        with patch("time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=2)
+            assert bucket.reserve() == 0.0
+            assert bucket.reserve() == 0.0
+            assert bucket.reserve() == pytest.approx(0.5)
+            assert bucket.reserve() == pytest.approx(1.0)
+
+    def test_bucket_refills_over_time(self):
+        """Test that tokens come back at the configured rate"""
+        with patch("time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=1)
+            assert bucket.reserve() == 0.0
+        with patch("time.monotonic", return_value=101.0):
+            assert bucket.reserve() == 0.0
+
+    def test_invalid_rate(self):
+        """Test that a non-positive rate is rejected"""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_acquire_sleeps_for_the_wait(self):
+        """Test that acquire sleeps as long as the reservation requires"""
+        bucket = TokenBucket(rate=4, burst=1)
+        with patch("time.sleep") as sleep:
+            bucket.acquire()
+            sleep.assert_not_called()
+            with patch("time.monotonic", return_value=bucket.updated_at):
+                bucket.acquire()
+        sleep.assert_called_once_with(pytest.approx(0.25))
+
+    @pytest.mark.asyncio
+    async def test_aacquire_waits_without_blocking(self):
+        """Test that the async variant sleeps on the event loop"""
+        bucket = TokenBucket(rate=4, burst=1)
+        with patch("asyncio.sleep") as sleep:
+            await bucket.aacquire()
+            with patch("time.monotonic", return_value=bucket.updated_at):
+                await bucket.aacquire()
+        sleep.assert_called_once_with(pytest.approx(0.25))
+
+
+class TestSQLiteTokenBucket:
+    def test_buckets_on_one_file_share_the_budget(self, tmp_path):
+        """Test that two buckets opened on the same file draw from one budget"""
+        path = tmp_path / "limits.sqlite3"
+        with patch("time.time", return_value=1000.0):
+            first = SQLiteTokenBucket(path, "/chat", rate=1, burst=2)
+            second = SQLiteTokenBucket(path, "/chat", rate=1, burst=2)
+            assert first.reserve() == 0.0
+            assert second.reserve() == 0.0
+            assert first.reserve() == pytest.approx(1.0)
+            assert second.reserve() == pytest.approx(2.0)
+        first.close()
+        second.close()
+
+    def test_endpoints_have_separate_rows(self, tmp_path):
+        """Test that buckets with different names do not share tokens"""
+        path = tmp_path / "limits.sqlite3"
+        with patch("time.time", return_value=1000.0):
+            chat = SQLiteTokenBucket(path, "/chat", rate=1, burst=1)
+            image = SQLiteTokenBucket(path, "/image", rate=1, burst=1)
+            assert chat.reserve() == 0.0
+            assert image.reserve() == 0.0
+
+    def test_bucket_refills_over_time(self, tmp_path):
+        """Test that the shared bucket refills from wall-clock time"""
+        path = tmp_path / "limits.sqlite3"
+        with patch("time.time", return_value=1000.0):
+            bucket = SQLiteTokenBucket(path, "/chat", rate=2, burst=1)
+            assert bucket.reserve() == 0.0
+        with patch("time.time", return_value=1000.5):
+            assert bucket.reserve() == 0.0
+
+    def test_processes_share_the_budget(self, tmp_path):
+        """Test that reservations from several processes are serialised"""
+        path = tmp_path / "limits.sqlite3"
+        context = multiprocessing.get_context("spawn")
+        waits = context.Queue()
+        workers = [
+            context.Process(target=_reserve_many, args=(path, 5, waits))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+            assert worker.exitcode == 0
+
+        results = sorted(waits.get(timeout=5) for _ in range(10))
+        # Only the shared burst of 5 goes out without waiting.
+        assert sum(1 for wait in results if wait == 0.0) == 5
+        assert results[-1] == pytest.approx(500, abs=10)
+
+
+class TestRateLimiter:
+    def test_paths_map_to_endpoint_buckets(self):
+        """Test that request paths find their endpoint's bucket"""
+        limiter = RateLimiter({"/chat": 5, "/chat/poll": (10, 20), "/image": 2})
+        assert limiter.bucket_for("/chat") is limiter.buckets["/chat"]
+        assert (
+            limiter.bucket_for("/chat/poll?task_id=t1") is limiter.buckets["/chat/poll"]
+        )
+        assert limiter.bucket_for("/image?id=a&country=japan").rate == 2
+        assert limiter.buckets["/chat/poll"].capacity == 20
+        assert limiter.bucket_for("/ws/chat/user") is None
+
+    def test_default_rate_covers_unlisted_endpoints(self):
+        """Test that default_rate applies to endpoints without their own rate"""
+        limiter = RateLimiter({"/chat": 1}, default_rate=50)
+        assert limiter.bucket_for("/chat").rate == 1
+        assert limiter.bucket_for("/image").rate == 50
+        assert limiter.bucket_for("/ws/chat/user").rate == 50
+
+    def test_unknown_endpoint_is_rejected(self):
+        """Test that a typo in an endpoint name is reported"""
+        with pytest.raises(ValueError, match="/images"):
+            RateLimiter({"/images": 1})
+
+    def test_unlimited_paths_do_not_wait(self):
+        """Test that acquire returns at once for endpoints without a budget"""
+        limiter = RateLimiter({"/chat": 1})
+        with patch("time.sleep") as sleep:
+            for _ in range(5):
+                limiter.acquire("/image?id=a")
+        sleep.assert_not_called()
+
+    def test_shared_path_uses_sqlite_buckets(self, tmp_path):
+        """Test that shared_path backs every bucket with the SQLite file"""
+        path = tmp_path / "limits.sqlite3"
+        limiter = RateLimiter({"/chat": 1, "/image": 3}, shared_path=path)
+        assert all(
+            isinstance(bucket, SQLiteTokenBucket) for bucket in limiter.buckets.values()
+        )
+        assert path.exists()
@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.result_cache import (
+    DiskResultStore,
+    MemoryResultStore,
+    ResultCache,
+    SQLiteResultStore,
+    result_key,
+)
+
+
+class TestResultKey:
+    def test_formatting_does_not_change_the_key(self):
+        """Test that whitespace and dict order are normalized away"""
+        assert result_key("Plan a 2-day  trip to Tokyo ", "japan") == result_key(
+            "Plan a 2-day trip to Tokyo", "japan", [], {}
+        )
+        assert result_key("q", "japan", None, {"a": 1, "b": 2}) == result_key(
+            "q", "japan", None, {"b": 2, "a": 1}
+        )
+
+    def test_request_fields_change_the_key(self):
+        """Test that every request field takes part in the key"""
+        base = result_key("q", "japan")
+        assert result_key("q", "france") != base
+        assert result_key("other", "japan") != base
+        assert result_key("q", "japan", [{"role": "user", "content": "hi"}]) != base
+        assert result_key("q", "japan", None, {"days": 2}) != base
+        assert result_key("q", "japan", user_id="u1") != base
+
+
+@pytest.fixture(params=["memory", "disk", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryResultStore()
+    if request.param == "disk":
+        return DiskResultStore(tmp_path / "results")
+    return SQLiteResultStore(tmp_path / "results.sqlite3")
+
+
+class TestResultStores:
+    def test_round_trip(self, store):
+        """Test that results are stored and returned"""
+        result = {"itinerary": {"days": [{"activities": []}]}, "text": "東京"}
+        store.set("key", result, ttl=60)
+        assert store.get("key") == result
+        assert store.get("missing") is None
+
+    def test_expiry(self, store):
+        """Test that results older than the TTL are gone"""
+        with patch("time.time", return_value=1000.0):
+            store.set("key", {"a": 1}, ttl=60)
+        with patch("time.time", return_value=1059.0):
+            assert store.get("key") == {"a": 1}
+        with patch("time.time", return_value=1060.0):
+            assert store.get("key") is None
+
+    def test_no_ttl_keeps_results(self, store):
+        """Test that ttl=None never expires"""
+        with patch("time.time", return_value=0.0):
+            store.set("key", {"a": 1}, ttl=None)
+        with patch("time.time", return_value=1e12):
+            assert store.get("key") == {"a": 1}
+
+    def test_delete_and_clear(self, store):
+        """Test that results can be removed"""
+        store.set("a", {"a": 1}, ttl=None)
+        store.set("b", {"b": 1}, ttl=None)
+        store.delete("a")
+        assert store.get("a") is None
+        store.clear()
+        assert store.get("b") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that the disk and SQLite stores survive a restart"""
+        for make in (
+            lambda: DiskResultStore(tmp_path / "results"),
+            lambda: SQLiteResultStore(tmp_path / "results.sqlite3"),
+        ):
+            make().set("key", {"a": 1}, ttl=None)
+            assert make().get("key") == {"a": 1}
+
+    def test_memory_store_evicts_least_recently_used(self):
+        """Test that the memory store is bounded"""
+        store = MemoryResultStore(max_entries=2)
+        store.set("a", {}, ttl=None)
+        store.set("b", {}, ttl=None)
+        store.get("a")
+        store.set("c", {}, ttl=None)
+        assert store.get("b") is None
+        assert store.get("a") == {}
+
+
+class TestResultCache:
+    def test_user_id_is_included_by_default(self):
+        """Test that users only share a key when sharing is enabled"""
+        cache = ResultCache()
+        assert cache.key("q", "alice") != cache.key("q", "bob")
+
+        shared = ResultCache(include_user_id=False)
+        assert shared.key("q", "alice") == shared.key("q", "bob")
+
+    def test_counts_hits_and_misses(self):
+        """Test the hit and miss counters"""
+        cache = ResultCache(ttl=60)
+        key = cache.key("q", "u")
+        assert cache.get(key) is None
+        cache.set(key, {"done": True})
+        assert cache.get(key) == {"done": True}
+        assert cache.stats() == {"hits": 1, "misses": 1}
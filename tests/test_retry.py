@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.retry import RetryBudget, RetryPolicy
+
+
+class TestRetryBudget:
+    def test_withdraw_until_empty_then_refill(self):
+        """Test that retries spend tokens and requests earn them back"""
+        budget = RetryBudget(ratio=0.5, reserve=2)
+        assert budget.withdraw()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+
+        budget.deposit()
+        assert not budget.withdraw()
+        budget.deposit()
+        assert budget.withdraw()
+
+    def test_deposit_is_capped(self):
+        """Test that the balance never exceeds the reserve"""
+        budget = RetryBudget(ratio=1, reserve=3)
+        for _ in range(10):
+            budget.deposit()
+        assert budget.tokens == 3
+
+    def test_invalid_budget(self):
+        """Test that negative settings are rejected"""
+        with pytest.raises(ValueError):
+            RetryBudget(ratio=-1)
+
+
+class TestRetryPolicy:
+    def policy(self, **kwargs):
+        kwargs.setdefault("budget", RetryBudget(reserve=100))
+        return RetryPolicy(**kwargs)
+
+    def test_idempotent_retries_transient_statuses(self):
+        """Test that GETs are retried on 429/5xx but not on other errors"""
+        policy = self.policy()
+        with patch("random.uniform", side_effect=lambda low, high: high):
+            assert policy.next_delay(1, 0.0, idempotent=True, status=502) == 0.5
+            assert policy.next_delay(2, 0.0, idempotent=True, status=504) == 1.0
+        assert policy.next_delay(1, 0.0, idempotent=True, status=404) is None
+        assert policy.next_delay(3, 0.0, idempotent=True, status=503) is None
+
+    def test_non_idempotent_only_retries_unprocessed_requests(self):
+        """Test that POSTs are only retried when the server did not process them"""
+        policy = self.policy()
+        assert policy.next_delay(1, 0.0, idempotent=False, status=500) is None
+        assert policy.next_delay(1, 0.0, idempotent=False, status=502) is None
+        assert policy.next_delay(1, 0.0, idempotent=False, status=429) is not None
+        assert policy.next_delay(1, 0.0, idempotent=False, status=503) is not None
+        assert policy.next_delay(1, 0.0, idempotent=False, sent=True) is None
+        assert policy.next_delay(1, 0.0, idempotent=False, sent=False) is not None
+
+    def test_retry_after_and_deadline(self):
+        """Test that Retry-After is honoured within the per-call deadline"""
+        policy = self.policy(deadline=10)
+        assert (
+            policy.next_delay(1, 0.0, idempotent=True, status=429, retry_after=4) == 4
+        )
+        assert (
+            policy.next_delay(1, 8.0, idempotent=True, status=429, retry_after=4)
+            is None
+        )
+
+    def test_backoff_is_capped(self):
+        """Test that the jittered backoff never exceeds backoff_max"""
+        policy = self.policy(backoff_base=1, backoff_max=3)
+        for attempt in range(1, 50):
+            assert 0 <= policy.backoff(attempt) <= 3
+
+    def test_budget_stops_retries(self):
+        """Test that an empty budget turns retries off"""
+        policy = RetryPolicy(max_attempts=10, budget=RetryBudget(ratio=0, reserve=1))
+        assert policy.next_delay(1, 0.0, idempotent=True, status=503) is not None
+        assert policy.next_delay(2, 0.0, idempotent=True, status=503) is None
+
+    def test_invalid_policy(self):
+        """Test that max_attempts must be positive"""
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
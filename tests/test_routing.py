@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import pytest
+
+from tabichan.routing import EndpointRouter
+
+PRIMARY = "https://primary.example/v1"
+SECONDARY = "https://secondary.example/v1"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("time.monotonic", fake):
+        yield fake
+
+
+class TestEndpointRouter:
+    def test_prefers_primary_until_measured(self, clock):
+        """Test that the first endpoint wins while latencies are unknown"""
+        router = EndpointRouter([PRIMARY, SECONDARY])
+        assert router.choose() == PRIMARY
+
+    def test_routes_to_lowest_ewma_latency(self, clock):
+        """Test that the faster endpoint is chosen once both are measured"""
+        router = EndpointRouter([PRIMARY, SECONDARY], alpha=0.5)
+        router.record_success(PRIMARY, 0.4)
+        router.record_success(SECONDARY, 0.1)
+        assert router.choose() == SECONDARY
+
+        router.record_success(SECONDARY, 0.9)  # EWMA 0.5
+        router.record_success(SECONDARY, 0.9)  # EWMA 0.7
+        assert router.stats()[SECONDARY]["latency"] == pytest.approx(0.7)
+        assert router.choose() == PRIMARY
+
+    def test_fails_over_and_probes_back(self, clock):
+        """Test that an endpoint is skipped after failures and probed after cooldown"""
+        router = EndpointRouter(
+            [PRIMARY, SECONDARY], failure_threshold=2, cooldown=10, probe_interval=999
+        )
+        router.record_failure(PRIMARY)
+        assert router.choose() == PRIMARY
+        router.record_failure(PRIMARY)
+        assert router.choose() == SECONDARY
+        assert not router.stats()[PRIMARY]["healthy"]
+
+        clock.now += 10
+        assert router.choose() == PRIMARY  # half-open probe
+        assert router.choose() == SECONDARY  # only one probe at a time
+
+        router.record_success(PRIMARY, 0.05)
+        assert router.stats()[PRIMARY]["healthy"]
+
+    def test_exclude_skips_endpoints_failed_in_this_call(self, clock):
+        """Test that a call fails over to an endpoint it has not tried"""
+        router = EndpointRouter([PRIMARY, SECONDARY])
+        assert router.choose(exclude=[PRIMARY]) == SECONDARY
+        assert router.has_alternative([PRIMARY])
+        assert not router.has_alternative([PRIMARY, SECONDARY])
+        assert router.choose(exclude=[PRIMARY, SECONDARY]) in (PRIMARY, SECONDARY)
+
+    def test_idle_endpoint_is_probed_for_latency(self, clock):
+        """Test that an unused healthy endpoint gets traffic after probe_interval"""
+        router = EndpointRouter([PRIMARY, SECONDARY], probe_interval=60)
+        router.record_success(PRIMARY, 0.1)
+        clock.now += 30
+        assert router.choose() == PRIMARY
+
+        clock.now += 30
+        assert router.choose() == SECONDARY
+        assert router.choose() == PRIMARY
+
+    def test_invalid_configuration(self):
+        """Test that bad settings are rejected"""
+        with pytest.raises(ValueError):
+            EndpointRouter([])
+        with pytest.raises(ValueError):
+            EndpointRouter([PRIMARY], alpha=0)
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from tabichan.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        """Test that callers arriving during a call wait for it instead"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {"status": "running"}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(flight.do, "task", fetch) for _ in range(8)]
+            while len(flight) == 0:
+                pass
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        assert len(calls) < 8
+        assert all(result is results[0] for result in results)
+        assert len(flight) == 0
+
+    def test_error_is_shared_and_forgotten(self):
+        """Test that waiters see the leader's error and the key is released"""
+        flight = SingleFlight()
+        with pytest.raises(RuntimeError):
+            flight.do("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+        assert flight.do("key", lambda: "ok") == "ok"
+
+    def test_different_keys_run_separately(self):
+        """Test that only identical keys are coalesced"""
+        flight = SingleFlight()
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+    def test_waiter_gives_up_after_timeout(self):
+        """Test that a waiter stops waiting for a slow call after its timeout"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(flight.do, "key", lambda: release.wait(5))
+            while len(flight) == 0:
+                pass
+            with pytest.raises(FutureTimeoutError):
+                flight.do("key", lambda: False, timeout=0.05)
+            release.set()
+            assert leader.result(timeout=5) is True
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        """Test that concurrent coroutines share one call"""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "image"
+
+        async def run():
+            return await asyncio.gather(*(flight.do("img", fetch) for _ in range(10)))
+
+        assert asyncio.run(run()) == ["image"] * 10
+        assert len(calls) == 1
+        assert len(flight) == 0
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the shared call survives one waiter being cancelled"""
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("key", fetch))
+            second = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == "done"
+
+    def test_last_cancelled_caller_cancels_the_call(self):
+        """Test that the shared call stops once nobody waits for it"""
+        flight = AsyncSingleFlight()
+        cancelled = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run():
+            waiter = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert cancelled == [True]
+        assert len(flight) == 0
+
+    def test_error_is_shared(self):
+        """Test that every waiter gets the error of the shared call"""
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError("bad")
+
+        async def run():
+            return await asyncio.gather(
+                flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+            )
+
+        errors = asyncio.run(run())
+        assert all(isinstance(error, ValueError) for error in errors)
+
+    def test_waiter_timeout_keeps_the_call_for_others(self):
+        """Test that one waiter timing out does not cancel the shared call"""
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def run():
+            patient = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0)
+            with pytest.raises(asyncio.TimeoutError):
+                await flight.do("key", fetch, timeout=0.01)
+            return await patient
+
+        assert asyncio.run(run()) == "done"
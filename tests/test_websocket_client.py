@@ -2,6 +2,7 @@ import pytest
 import json
 import asyncio
 from unittest.mock import Mock, AsyncMock, patch
+from tabichan.ratelimit import RateLimiter
 from tabichan.websocket_client import TabichanWebSocket
 
 
@@ -469,3 +470,41 @@ class TestTabichanWebSocket:
         assert client.is_connected is False
         assert client.current_question_id is None
         assert client.connection_task is None
+
+    @pytest.mark.asyncio
+    async def test_message_handler_reports_invalid_json(self):
+        """Test that an unparsable frame emits an error and later frames still arrive"""
+        client = TabichanWebSocket("test_user", "test_api_key")
+        error_handler = Mock()
+        message_handler = Mock()
+        client.on("error", error_handler)
+        client.on("message", message_handler)
+
+        class FakeWebSocket:
+            def __aiter__(self):
+                async def frames():
+                    yield "not json"
+                    yield b'{"type": "complete"}'
+
+                return frames()
+
+        client.ws = FakeWebSocket()
+        await client._message_handler()
+
+        assert "Failed to parse message" in str(error_handler.call_args[0][0])
+        message_handler.assert_called_once_with({"type": "complete"})
+
+    @pytest.mark.asyncio
+    async def test_send_message_respects_rate_limiter(self):
+        """Test that sends spend from the limiter's WebSocket budget"""
+        limiter = RateLimiter({"/ws/chat": (1, 1)})
+        client = TabichanWebSocket("test_user", "test_api_key", rate_limiter=limiter)
+        client.ws = AsyncMock()
+        client.ws.closed = False
+
+        with patch("asyncio.sleep") as sleep:
+            await client.send_message({"type": "test"})
+            sleep.assert_not_called()
+            await client.send_message({"type": "test"})
+        sleep.assert_called_once()
+        assert client.ws.send.call_count == 2